@@ -10,173 +10,828 @@
 # TCP keepalive, login ('T'), parameters ('P'), extended version ('v'), memory usage ('m')
 # Exponential backoff retry on connect
 
+import contextlib
 import socket
 import struct
 import threading
 import time
+import collections
 import logging
-import random
-from typing import Optional, Callable, Dict, List
+from typing import Optional, Callable, Dict, List, Tuple
+
+from .ax25 import PID_NO_L3, build_ui
+from .codec import HEADER_LEN, encode_header, encode_frame, encode_many, decode_many, strip_callsign, pad_callsign
+from .decoder import FrameDecoder
+from .dispatch import DispatchExecutor, InlineExecutor
+from .filters import FrameFilter
+from .flow import DEFAULT_HIGH_WATER, DEFAULT_PACLEN, OutstandingTracker, iter_chunks, link_key
+from .heard import parse_heard_list
+from .scheduler import SCHEDULED_KINDS
+from .session import AX25Session
+from .transport import TCPTransport, Transport
+from .metrics import ClientMetrics
+from .supervisor import (OFFLINE_BUFFER, OFFLINE_DROP, OFFLINE_POLICIES, OFFLINE_REJECT, SESSION_KINDS,
+                         SessionState, backoff_delay)
 
 logger = logging.getLogger('AGWPE')
 
 AGWPE_DEFAULT_PORT = 8000
 
+# One-byte data kind objects indexed by the header's DataKind byte
+_KIND_BYTES = [bytes((i,)) for i in range(256)]
+_EMPTY_HEADER = bytes(HEADER_LEN)
+_U32 = struct.Struct('<I')
+_perf_counter = time.perf_counter
+_LINK_OUTSTANDING = ord('y')
+_DISCONNECT = ord('D')
+
+# Size at which a corked/buffered transmit queue is flushed when no tx_buffer_bytes is set
+TX_BATCH_BYTES = 65536
+# Most buffers passed to a single sendmsg() call (POSIX IOV_MAX is at least 1024 on common platforms)
+_IOV_MAX = 1024
+
+
+def _sendmsg_all(sock: socket.socket, parts: List[bytes]):
+    """Write every buffer in ``parts`` using scatter/gather sendmsg, handling partial writes."""
+    if not hasattr(sock, 'sendmsg'):
+        sock.sendall(b''.join(parts))
+        return
+    i = 0
+    while i < len(parts):
+        sent = sock.sendmsg(parts[i:i + _IOV_MAX])
+        while sent:
+            n = len(parts[i])
+            if sent >= n:
+                sent -= n
+                i += 1
+            else:
+                parts[i] = memoryview(parts[i])[sent:]
+                sent = 0
+
 class AGWPEFrame:
-    """AGWPE frame structure."""
-    def __init__(self):
-        self.port: int = 0
-        self.data_kind: bytes = b''
-        self.call_from: bytes = b''
-        self.call_to: bytes = b''
-        self.data_len: int = 0
-        self.data: bytes = b''
-
-class AGWPEClient:
+    """
+    AGWPE frame structure.
+
+    Immutable, slotted view over one wire frame (36-byte header + payload).
+    The only per-frame storage is the raw frame bytes; ``port``, ``data_kind``,
+    ``call_from``, ``call_to``, ``data_len`` and ``data`` are decoded from it
+    when accessed.
+    """
+    __slots__ = ('_raw',)
+
+    def __init__(self, raw: bytes = _EMPTY_HEADER):
+        if len(raw) < HEADER_LEN:
+            raise ValueError(f"AGWPE frame needs at least {HEADER_LEN} bytes, got {len(raw)}")
+        object.__setattr__(self, '_raw', bytes(raw))
+
+    @classmethod
+    def build(cls, data_kind: bytes, port: int = 0, call_from: bytes = b'', call_to: bytes = b'', data: bytes = b'') -> 'AGWPEFrame':
+        """Create a frame from its fields."""
+        return cls(encode_frame(data_kind, port, call_from, call_to, data))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("AGWPEFrame is immutable")
+
+    def __reduce__(self):
+        # Rebuild through __init__; the default slot-state restore would hit __setattr__
+        return (type(self), (self._raw,))
+
+    @property
+    def raw(self) -> bytes:
+        """Complete wire frame (header + payload)."""
+        return self._raw
+
+    @property
+    def port(self) -> int:
+        return _U32.unpack_from(self._raw, 4)[0]
+
+    @property
+    def data_kind(self) -> bytes:
+        return _KIND_BYTES[self._raw[0]]
+
+    @property
+    def call_from(self) -> bytes:
+        return strip_callsign(self._raw[8:18])
+
+    @property
+    def call_to(self) -> bytes:
+        return strip_callsign(self._raw[18:28])
+
+    @property
+    def data_len(self) -> int:
+        return _U32.unpack_from(self._raw, 28)[0]
+
+    @property
+    def user(self) -> int:
+        """Reserved header field; a tagging DuplicateFilter stores the repeat number here."""
+        return _U32.unpack_from(self._raw, 32)[0]
+
+    @property
+    def data(self) -> bytes:
+        return self._raw[HEADER_LEN:]
+
+    def __eq__(self, other):
+        if isinstance(other, AGWPEFrame):
+            return self._raw == other._raw
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._raw)
+
+    def __repr__(self):
+        return (f"AGWPEFrame(kind={self.data_kind!r}, port={self.port}, "
+                f"from={self.call_from!r}, to={self.call_to!r}, len={self.data_len})")
+
+def _kind_index(kind) -> int:
+    """Table index for a data kind given as b'X', 'X' or an int."""
+    if isinstance(kind, int):
+        index = kind
+    elif len(kind) == 1:
+        index = ord(kind)
+    else:
+        raise ValueError(f"Data kind must be a single byte, got {kind!r}")
+    if not 0 <= index < 256:
+        raise ValueError(f"Data kind out of range: {kind!r}")
+    return index
+
+class FrameDispatcher:
+    """
+    Receive-side frame handling shared by the thread and asyncio clients.
+    Owns the incremental decoder and the user callbacks, and turns decoded
+    frames into callback invocations run through ``executor``.
+    """
+    def __init__(self, executor: Optional[DispatchExecutor] = None):
+        self.executor: DispatchExecutor = executor or InlineExecutor()
+        self.on_frame: Optional[Callable[[AGWPEFrame], None]] = None
+        self.on_connected_data: Optional[Callable[[int, str, bytes], None]] = None
+        self.on_outstanding: Optional[Callable[[int, int], None]] = None
+        self.on_heard_stations: Optional[Callable[[int, List[Dict]], None]] = None
+        self.on_extended_version: Optional[Callable[[str], None]] = None
+        self.on_memory_usage: Optional[Callable[[Dict[str, int]], None]] = None
+        # Called with a new session when a remote station connects; unset, inbound links stay unmanaged
+        self.on_session: Optional[Callable] = None
+        # Connected sessions keyed by (port, local call, remote call) as stripped bytes
+        self._sessions: Dict[tuple, object] = {}
+        self._decoder = FrameDecoder()
+        # Optional pre-parse filter, called with (buffer, header offset) for each complete frame
+        self.frame_filter: Optional[FrameFilter] = None
+        self.metrics = ClientMetrics()
+        # Latest 'Y'/'y' counts, used by send_stream() flow control
+        self.outstanding = OutstandingTracker()
+        # 256-entry tables indexed by the DataKind byte: built-in handler and extra subscribers
+        self._handlers: List[Optional[Callable]] = [None] * 256
+        for kind, name in self._BUILTIN_HANDLERS.items():
+            self._handlers[kind[0]] = getattr(self, name)
+        self._subscribers: List[tuple] = [()] * 256
+        # Raw-frame taps (recorders, capture writers) called on the receive path
+        self._taps: tuple = ()
+        # Passive heard list, set by HeardIndex.attach(); also fed by 'H' replies
+        self.heard_index = None
+        # Repeat suppression between the taps and dispatch, set by DuplicateFilter.attach()
+        self.duplicate_filter = None
+
+    def _process_pending(self):
+        """Decode and dispatch every complete frame currently buffered in the decoder."""
+        consumed, _ = self._dispatch_buffer(self._decoder.pending())
+        self._decoder.consume(consumed)
+
+    def _dispatch_buffer(self, view: memoryview, now: Optional[float] = None) -> Tuple[int, int]:
+        """
+        Receive path for the complete frames at the start of ``view``: frame
+        filter, taps, duplicate filter (at time ``now``, default the current
+        time), then dispatch. Returns (bytes consumed, frames dispatched).
+        """
+        accept = self.frame_filter
+        if accept is not None and self._sessions:
+            accept = self._accept_with_sessions
+        frames, consumed = decode_many(view, accept=accept)
+        for tap in self._taps:
+            tap(view, frames)
+        dedup = self.duplicate_filter
+        dispatched = 0
+        for decoded in frames:
+            start = decoded[6]
+            raw = view[start:start + HEADER_LEN + len(decoded[5])]
+            if dedup is not None:
+                raw = dedup.screen(decoded, raw, now)
+                if raw is None:
+                    continue
+            self._dispatch(decoded, raw)
+            dispatched += 1
+        return consumed, dispatched
+
+    def _accept_with_sessions(self, buf, pos: int) -> bool:
+        """Frame filter that always passes a 'D' from the remote end of an open session (its disconnect notice)."""
+        if buf[pos] == _DISCONNECT:
+            key = (_U32.unpack_from(buf, pos + 4)[0], strip_callsign(bytes(buf[pos + 18:pos + 28])),
+                   strip_callsign(bytes(buf[pos + 8:pos + 18])))
+            if key in self._sessions:
+                return True
+        return self.frame_filter(buf, pos)
+
+    def _emit_frame(self, key, raw: memoryview):
+        """Deliver a monitored/connection frame to ``on_frame``."""
+        if self.on_frame:
+            self.executor.submit(key, self.on_frame, AGWPEFrame(raw))
+
+    def _dispatch(self, decoded: tuple, raw: memoryview):
+        """Invoke the handlers for one decoded (kind, port, from, to, user, payload, offset) tuple.
+
+        ``raw`` is the complete frame in the receive buffer; an AGWPEFrame is
+        only built from it when a frame consumer is installed.
+        """
+        start = _perf_counter()
+        kind = decoded[0]
+        self.metrics.record_in(kind, decoded[1], HEADER_LEN + len(decoded[5]))
+        handler = self._handlers[kind]
+        if handler is not None:
+            handler(decoded, raw)
+        subscribers = self._subscribers[kind]
+        if subscribers:
+            frame = AGWPEFrame(raw)
+            key = (decoded[1], decoded[2])
+            for fn in subscribers:
+                self.executor.submit(key, fn, frame)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[AGWPE] Received {chr(kind)} frame from {strip_callsign(decoded[2]).decode('ascii', errors='ignore')} to {strip_callsign(decoded[3]).decode('ascii', errors='ignore')}")
+        self.metrics.dispatch_latency.observe(_perf_counter() - start)
+
+    def stats(self) -> dict:
+        """Snapshot of the client metrics plus current queue depths."""
+        snapshot = self.metrics.snapshot()
+        snapshot["dispatch_dropped"] = self.executor.dropped
+        if self.frame_filter is not None:
+            snapshot["filter_hits"] = self.frame_filter.hits
+            snapshot["filter_misses"] = self.frame_filter.misses
+        if self.duplicate_filter is not None:
+            snapshot["duplicates"] = self.duplicate_filter.duplicates
+        snapshot["queues"] = self._queue_depths()
+        return snapshot
+
+    def _queue_depths(self) -> Dict[str, int]:
+        return {
+            "rx_buffered_bytes": len(self._decoder),
+            "dispatch_queue_depth": self.executor.pending,
+        }
+
+    def register_handler(self, kind, fn: Callable[[AGWPEFrame], None]):
+        """
+        Subscribe ``fn(frame)`` to every received frame of data kind ``kind``
+        (b'X', 'X' or an int). Several handlers may share a kind; they run in
+        registration order, after the built-in callback for that kind.
+        """
+        index = _kind_index(kind)
+        self._subscribers[index] = self._subscribers[index] + (fn,)
+
+    def add_tap(self, fn: Callable[[memoryview, list], None]):
+        """
+        Call ``fn(buffer, frames)`` on the receive thread once per read, before
+        dispatch, with the receive buffer and the decoded frame tuples (only
+        frames ``frame_filter`` accepted; rejected ones are never decoded); frame
+        ``i`` occupies ``buffer[frames[i][6]:frames[i][6] + HEADER_LEN + len(frames[i][5])]``.
+        The buffer is only valid during the call; copy what you keep.
+        """
+        self._taps = self._taps + (fn,)
+
+    def remove_tap(self, fn: Callable[[memoryview, list], None]):
+        """Remove a tap added with ``add_tap``."""
+        taps = list(self._taps)
+        taps.remove(fn)
+        self._taps = tuple(taps)
+
+    def unregister_handler(self, kind, fn: Callable[[AGWPEFrame], None]):
+        """Remove a handler added with ``register_handler``."""
+        index = _kind_index(kind)
+        handlers = list(self._subscribers[index])
+        handlers.remove(fn)
+        self._subscribers[index] = tuple(handlers)
+
+    def _local_call(self, src: Optional[str]) -> bytes:
+        return self.callsign if src is None else pad_callsign(src)
+
+    @property
+    def sessions(self) -> List:
+        """Open connected-mode sessions."""
+        return list(self._sessions.values())
+
+    def _session_for(self, decoded: tuple):
+        """Session for a frame from the remote station (CallFrom) to us (CallTo), if one exists."""
+        return self._sessions.get((decoded[1], strip_callsign(decoded[3]), strip_callsign(decoded[2])))
+
+    def _new_session(self, port: int, local: bytes, remote: bytes):
+        """Session object for an inbound link; None (the default) leaves the link unmanaged."""
+        return None
+
+    def _drop_sessions(self):
+        """Mark every session disconnected after the AGWPE connection is lost."""
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            session._on_disconnect()
+
+    def _accept_session(self, session):
+        self.executor.submit((session.port, session.key[2]), self.on_session, session)
+
+    # Built-in handlers, one per data kind (see _BUILTIN_HANDLERS)
+
+    def _handle_frame(self, decoded: tuple, raw: memoryview):
+        self._emit_frame((decoded[1], decoded[2]), raw)
+
+    def _handle_connect(self, decoded: tuple, raw: memoryview):
+        if self._sessions or self.on_session is not None:
+            session = self._session_for(decoded)
+            if session is not None:
+                session._on_connect()
+            elif self.on_session is not None:
+                session = self._new_session(decoded[1], strip_callsign(decoded[3]), strip_callsign(decoded[2]))
+                if session is not None:
+                    self._sessions[session.key] = session
+                    session._on_connect()
+                    self._accept_session(session)
+        self._emit_frame((decoded[1], decoded[2]), raw)
+
+    def _handle_disconnect(self, decoded: tuple, raw: memoryview):
+        if self._sessions:
+            session = self._session_for(decoded)
+            if session is not None:
+                del self._sessions[session.key]
+                session._on_disconnect()
+        self._emit_frame((decoded[1], decoded[2]), raw)
+
+    def _handle_connected_data(self, decoded: tuple, raw: memoryview):
+        if self._sessions:
+            session = self._session_for(decoded)
+            if session is not None:
+                session._on_data(bytes(decoded[5]))
+                return
+        if self.on_connected_data:
+            port, raw_from, view = decoded[1], decoded[2], decoded[5]
+            call_from = strip_callsign(raw_from).decode('ascii', errors='ignore')
+            self.executor.submit((port, raw_from), self.on_connected_data, port, call_from, bytes(view))
+
+    def _handle_outstanding(self, decoded: tuple, raw: memoryview):
+        port, view = decoded[1], decoded[5]
+        if len(view) >= 4:
+            count = _U32.unpack_from(view)[0]
+            if decoded[0] == _LINK_OUTSTANDING:
+                self.outstanding.update(link_key(port, decoded[2], decoded[3]), count)
+            else:
+                self.outstanding.update(port, count)
+            if self.on_outstanding:
+                self.executor.submit(port, self.on_outstanding, port, count)
+
+    def _handle_heard_stations(self, decoded: tuple, raw: memoryview):
+        port = decoded[1]
+        entries = parse_heard_list(decoded[5])
+        if self.heard_index is not None:
+            self.heard_index.record_heard_list(port, entries)
+        if self.on_heard_stations:
+            heard_list = [{"callsign": call, "last_heard": timestamp} for call, timestamp in entries]
+            self.executor.submit(port, self.on_heard_stations, port, heard_list)
+
+    def _handle_extended_version(self, decoded: tuple, raw: memoryview):
+        port, view = decoded[1], decoded[5]
+        if view:
+            version_str = bytes(view).decode('ascii', errors='ignore').strip()
+        else:
+            version_str = "Unknown"
+        if self.on_extended_version:
+            self.executor.submit(port, self.on_extended_version, version_str)
+
+    def _handle_memory_usage(self, decoded: tuple, raw: memoryview):
+        port, view = decoded[1], decoded[5]
+        if len(view) >= 8:
+            free_mem, used_mem = struct.unpack_from('<II', view)
+            mem_info = {"free_kb": free_mem // 1024, "used_kb": used_mem // 1024}
+        else:
+            mem_info = {"free_kb": 0, "used_kb": 0}
+        if self.on_memory_usage:
+            self.executor.submit(port, self.on_memory_usage, mem_info)
+
+    _BUILTIN_HANDLERS = {
+        b'D': '_handle_disconnect',
+        b'K': '_handle_frame',
+        b'C': '_handle_connect',
+        b'c': '_handle_frame',
+        b'd': '_handle_connected_data',
+        b'Y': '_handle_outstanding',
+        b'y': '_handle_outstanding',
+        b'H': '_handle_heard_stations',
+        b'v': '_handle_extended_version',
+        b'm': '_handle_memory_usage',
+    }
+
+
+class AGWPEClient(FrameDispatcher):
     """
     Full AGWPE TCP/IP API client.
     Supports unproto, connected mode, raw frames, outstanding queries, login, parameters, extended version, memory usage.
+
+    With ``auto_reconnect`` the receive thread reconnects after a lost
+    connection (exponential backoff capped at ``reconnect_max_delay``) and
+    replays the recorded ``session`` state. ``offline_policy`` decides what
+    happens to frames sent while offline: 'drop', 'buffer' (up to
+    ``offline_buffer`` frames, sent after the replay) or 'reject' (raise
+    ConnectionError). ``transport`` replaces the TCP connection to
+    ``host``:``port``, e.g. a ``transport.UnixTransport`` or a KISS TNC.
     """
-    def __init__(self, host: str = "127.0.0.1", port: int = AGWPE_DEFAULT_PORT, callsign: str = "NOCALL"):
+    def __init__(self, host: str = "127.0.0.1", port: int = AGWPE_DEFAULT_PORT, callsign: str = "NOCALL",
+                 tx_buffer_bytes: int = 0, tx_buffer_delay: float = 0.005,
+                 executor: Optional[DispatchExecutor] = None, auto_reconnect: bool = False,
+                 offline_policy: str = OFFLINE_DROP, offline_buffer: int = 1000, reconnect_max_delay: float = 60.0,
+                 transport: Optional[Transport] = None):
+        super().__init__(executor)
+        if offline_policy not in OFFLINE_POLICIES:
+            raise ValueError(f"Unknown offline policy: {offline_policy!r}")
         self.host = host
         self.port = port
+        # Opens the stream for each (re)connect; host and port only apply to the default TCP transport
+        self.transport: Transport = transport or TCPTransport(host, port)
         self.callsign = callsign.ljust(10)[:10].upper().encode()
         self.sock: Optional[socket.socket] = None
         self.connected = False
-        self.on_frame: Optional[Callable[[AGWPEFrame], None]] = None
-        self.on_connected_data: Optional[Callable[[int, str, bytes], None]] = None
-        self.on_outstanding: Optional[Callable[[int, int], None]] = None
-        self.on_heard_stations: Optional[Callable[[int, List[Dict]], None]] = None
-        self.on_extended_version: Optional[Callable[[str], None]] = None
-        self.on_memory_usage: Optional[Callable[[Dict[str, int]], None]] = None
         self.thread: Optional[threading.Thread] = None
         self.lock = threading.RLock()
-        self._buffer = b''
+        # Buffered transmit: 0 sends every frame immediately
+        self.tx_buffer_bytes = tx_buffer_bytes
+        self.tx_buffer_delay = tx_buffer_delay
+        self._tx_parts: List[bytes] = []
+        self._tx_pending = 0
+        self._tx_since = 0.0
+        self._tx_cork = 0
+        self._tx_ready = threading.Condition(self.lock)
+        self._tx_thread: Optional[threading.Thread] = None
+        # Priority/airtime scheduler for on-air frames, set by TxScheduler.attach()
+        self.tx_scheduler = None
+        # Reconnect supervision
+        self.auto_reconnect = auto_reconnect
+        self.offline_policy = offline_policy
+        self.reconnect_max_delay = reconnect_max_delay
+        self.session = SessionState()
+        self.session.record(b'R', 0, self.callsign, b'')
+        self.offline_dropped = 0
+        self._offline: collections.deque = collections.deque(maxlen=offline_buffer)
+        self._base_delay = 1.0
+        self._closing = threading.Event()
 
     def connect(self, max_retries: int = 10, base_delay: float = 1.0) -> bool:
         """Connect with exponential backoff retry logic."""
+        self._closing.clear()
+        self._base_delay = base_delay
         attempt = 0
         while attempt <= max_retries:
             try:
-                self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                
-                # Enable TCP keepalive
-                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-                
-                # Platform-specific tuning
-                if hasattr(socket, 'TCP_KEEPIDLE'):
-                    self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 60)
-                if hasattr(socket, 'TCP_KEEPINTVL'):
-                    self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
-                if hasattr(socket, 'TCP_KEEPCNT'):
-                    self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 5)
+                self._open()
                 
-                self.sock.connect((self.host, self.port))
-                
-                # Register callsign
-                self._send_frame(data_kind=b'R', call_from=self.callsign)
-                
-                self.connected = True
                 self.thread = threading.Thread(target=self._receive_loop, daemon=True)
                 self.thread.start()
                 
-                logger.info(f"[AGWPE] Connected to {self.host}:{self.port} as {self.callsign.decode()} (attempt {attempt + 1})")
+                logger.info(f"[AGWPE] Connected to {self.transport} as {self.callsign.decode()} (attempt {attempt + 1})")
                 return True
                 
             except Exception as e:
-                if self.sock:
-                    self.sock.close()
-                    self.sock = None
-                
+                self.metrics.connect_failures += 1
                 attempt += 1
                 if attempt > max_retries:
                     logger.error(f"[AGWPE] Connection failed after {max_retries} retries: {e}")
                     return False
                 
                 # Exponential backoff with jitter
-                delay = base_delay * (2 ** (attempt - 1)) + random.uniform(0, base_delay)
+                delay = backoff_delay(attempt, base_delay)
                 logger.warning(f"[AGWPE] Connection attempt {attempt} failed: {e}. Retrying in {delay:.2f}s...")
                 time.sleep(delay)
 
-    def _send_frame(self, data_kind: bytes, port: int = 0, call_from: bytes = b'', call_to: bytes = b'', data: bytes = b''):
-        """Send raw AGWPE frame."""
+    def _open(self):
+        """Open the transport, then replay the session state (login and registrations first) and any frames buffered while offline."""
+        sock = self.transport.open()
+
+        with self.lock:
+            self.sock = sock
+            self._decoder.clear()
+            self.connected = True
+            frames = self.session.replay_frames() + list(self._offline)
+            self._offline.clear()
+            self._write_frames(frames)
+            if not self.connected:
+                # Don't leak the stream; the caller retries with a fresh one
+                sock.close()
+                raise ConnectionError("Session replay failed")
+        self.metrics.record_connect()
+
+    def _reconnect(self) -> bool:
+        """Reconnect from the receive thread until it succeeds or close() is called."""
+        if self.sock:
+            self.sock.close()
+        attempt = 0
+        while not self._closing.is_set():
+            attempt += 1
+            delay = backoff_delay(attempt, self._base_delay, self.reconnect_max_delay)
+            logger.warning(f"[AGWPE] Connection lost, reconnecting in {delay:.2f}s (attempt {attempt})")
+            if self._closing.wait(delay):
+                break
+            try:
+                self._open()
+            except Exception as e:
+                self.metrics.connect_failures += 1
+                logger.warning(f"[AGWPE] Reconnect attempt {attempt} failed: {e}")
+                continue
+            if self._closing.is_set():
+                self.sock.close()
+                break
+            logger.info(f"[AGWPE] Reconnected to {self.transport} (attempt {attempt})")
+            return True
+        return False
+
+    def _send_offline(self, frame: tuple):
+        """Apply the offline policy to a frame sent while disconnected. Session frames are replayed instead."""
+        if frame[0] in SESSION_KINDS:
+            return
+        if self.offline_policy == OFFLINE_REJECT:
+            raise ConnectionError(f"Not connected to {self.transport}")
+        if self.offline_policy == OFFLINE_BUFFER:
+            with self.lock:
+                if len(self._offline) == self._offline.maxlen:
+                    self.offline_dropped += 1
+                self._offline.append(frame)
+        else:
+            self.offline_dropped += 1
+
+    def _send_frame(self, data_kind: bytes, port: int = 0, call_from: bytes = b'', call_to: bytes = b'', data: bytes = b'',
+                    priority: Optional[int] = None):
+        """Send raw AGWPE frame; on-air frames go through the TX scheduler when one is attached."""
+        scheduler = self.tx_scheduler
+        if scheduler is not None and data_kind in SCHEDULED_KINDS:
+            scheduler.submit(data_kind, port, call_from, call_to, data, priority)
+            return
+        self._send_direct(data_kind, port, call_from, call_to, data)
+
+    def _send_direct(self, data_kind: bytes, port: int, call_from: bytes, call_to: bytes, data: bytes):
+        """Send one frame now, bypassing the TX scheduler."""
+        if data_kind in SESSION_KINDS:
+            self.session.record(data_kind, port, call_from, data)
         if not self.connected or not self.sock:
+            self._send_offline((data_kind, port, call_from, call_to, data))
             return
         
+        wait_start = _perf_counter()
         with self.lock:
+            self.metrics.send_lock_wait.observe(_perf_counter() - wait_start)
+            if self._tx_cork or self.tx_buffer_bytes:
+                self._queue_frame(data_kind, port, call_from, call_to, data)
+                return
             try:
-                # Header (36 bytes)
-                header = bytearray(36)
-                header[0:1] = data_kind
-                struct.pack_into('<I', header, 4, port)
-                header[8:18] = call_from.ljust(10, b' ')[:10]
-                header[18:28] = call_to.ljust(10, b' ')[:10]
-                struct.pack_into('<I', header, 28, len(data))
+                self.sock.sendall(encode_frame(data_kind, port, call_from, call_to, data))
+                self.metrics.record_out(data_kind[0], port, HEADER_LEN + len(data))
                 
-                self.sock.sendall(header + data)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"[AGWPE] Sent {data_kind.decode()} frame on port {port}")
                 
-                logger.debug(f"[AGWPE] Sent {data_kind.decode()} frame on port {port}")
+            except Exception as e:
+                logger.error(f"[AGWPE] Send failed: {e}")
+                self.metrics.send_errors += 1
+                self.connected = False
+
+    def _queue_frame(self, data_kind: bytes, port: int, call_from: bytes, call_to: bytes, data: bytes):
+        """Append a frame to the transmit buffer (header and payload kept as separate buffers). Caller holds the lock."""
+        if not self._tx_parts:
+            self._tx_since = time.monotonic()
+        self._tx_parts.append(encode_header(data_kind, port, call_from, call_to, len(data)))
+        if data:
+            self._tx_parts.append(data)
+        self._tx_pending += HEADER_LEN + len(data)
+        self.metrics.record_out(data_kind[0], port, HEADER_LEN + len(data))
+
+        if self._tx_pending >= (self.tx_buffer_bytes or TX_BATCH_BYTES):
+            self._flush_locked()
+        elif self.tx_buffer_bytes and not self._tx_cork:
+            if self._tx_thread is None or not self._tx_thread.is_alive():
+                self._tx_thread = threading.Thread(target=self._tx_flush_loop, daemon=True)
+                self._tx_thread.start()
+            self._tx_ready.notify()
+
+    def _queue_depths(self) -> Dict[str, int]:
+        depths = super()._queue_depths()
+        depths["tx_pending_bytes"] = self._tx_pending
+        if self.tx_scheduler is not None:
+            depths["tx_scheduled_frames"] = self.tx_scheduler.pending()
+        return depths
+
+    def _flush_locked(self):
+        """Write out the transmit buffer. Caller holds the lock."""
+        parts = self._tx_parts
+        if not parts:
+            return
+        count = self._tx_pending
+        self._tx_parts = []
+        self._tx_pending = 0
+        if not self.connected or not self.sock:
+            return
+        try:
+            _sendmsg_all(self.sock, parts)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"[AGWPE] Flushed {count} bytes in {len(parts)} buffers")
+
+        except Exception as e:
+            logger.error(f"[AGWPE] Send failed: {e}")
+            self.metrics.send_errors += 1
+            self.connected = False
+
+    def _tx_flush_loop(self):
+        """Flush the transmit buffer once its oldest frame has waited tx_buffer_delay seconds."""
+        with self._tx_ready:
+            while self.connected and self.tx_buffer_bytes:
+                if not self._tx_parts or self._tx_cork:
+                    self._tx_ready.wait(self.tx_buffer_delay or None)
+                    continue
+                remaining = self._tx_since + self.tx_buffer_delay - time.monotonic()
+                if remaining > 0:
+                    self._tx_ready.wait(remaining)
+                    continue
+                self._flush_locked()
+
+    def flush(self):
+        """Send any buffered frames now."""
+        with self.lock:
+            self._flush_locked()
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Cork the transmit path: frames sent inside the block are coalesced and
+        written with as few sendmsg() calls as possible when the block exits.
+        Blocks may be nested; the outermost one flushes.
+        """
+        with self.lock:
+            self._tx_cork += 1
+        try:
+            yield self
+        finally:
+            with self.lock:
+                self._tx_cork -= 1
+                if not self._tx_cork:
+                    self._flush_locked()
+
+    def _write_frames(self, frames: List[tuple]):
+        """
+        Write frames as one encode_many() buffer with one sendall(), bypassing
+        session recording and the offline policy (the session replay on connect).
+        """
+        if not frames:
+            return
+        wait_start = _perf_counter()
+        with self.lock:
+            self.metrics.send_lock_wait.observe(_perf_counter() - wait_start)
+            try:
+                self.sock.sendall(encode_many(frames))
+                for data_kind, port, _call_from, _call_to, data in frames:
+                    self.metrics.record_out(data_kind[0], port, HEADER_LEN + len(data))
+                
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"[AGWPE] Sent batch of {len(frames)} frames")
                 
             except Exception as e:
                 logger.error(f"[AGWPE] Send failed: {e}")
+                self.metrics.send_errors += 1
                 self.connected = False
 
-    def send_ui(self, port: int, dest: str, src: str, pid: int, info: bytes = b''):
-        """Send unproto UI frame (most common for PACSAT)."""
+    def send_ui(self, port: int, dest: str, src: str, pid: int, info: bytes = b'', priority: Optional[int] = None):
+        """Send unproto UI frame (most common for PACSAT). ``priority`` is a TX scheduler class (scheduler.PRIORITY_*)."""
         self._send_frame(
             data_kind=b'D',
             port=port,
-            call_from=src.upper().ljust(10)[:10].encode(),
-            call_to=dest.upper().ljust(10)[:10].encode(),
-            data=bytes([pid]) + info
+            call_from=pad_callsign(src),
+            call_to=pad_callsign(dest),
+            data=bytes([pid]) + info,
+            priority=priority
         )
 
-    def send_raw_unproto(self, port: int, dest: str, src: str, data: bytes):
+    def send_raw_unproto(self, port: int, dest: str, src: str, data: bytes, priority: Optional[int] = None):
         """Send raw unproto frame ('K')."""
         self._send_frame(
             data_kind=b'K',
             port=port,
-            call_from=src.upper().ljust(10)[:10].encode(),
-            call_to=dest.upper().ljust(10)[:10].encode(),
-            data=data
+            call_from=pad_callsign(src),
+            call_to=pad_callsign(dest),
+            data=data,
+            priority=priority
         )
 
+    def send_raw_ui(self, port: int, dest: str, src: str, info: bytes = b'', pid: int = PID_NO_L3, path=(),
+                    priority: Optional[int] = None):
+        """Build an AX.25 UI frame with ``ax25.build_ui`` and send it raw ('K')."""
+        self.send_raw_unproto(port, dest, src, build_ui(dest, src, info, pid, tuple(path)), priority)
+
     def send_monitor(self, port: int):
         """Request monitored frames on port ('M')."""
         self._send_frame(data_kind=b'M', port=port)
 
+    def send_raw_enable(self):
+        """Toggle reception of raw AX.25 frames ('k')."""
+        self._send_frame(data_kind=b'k')
+
     def request_outstanding(self, port: int = 0):
         """Request outstanding frames report ('Y')."""
         self._send_frame(data_kind=b'Y', port=port)
 
-    def send_connect(self, port: int, dest: str):
+    def request_link_outstanding(self, port: int, dest: str, src: Optional[str] = None):
+        """Request outstanding frames for the connection to ``dest`` ('y')."""
+        self._send_frame(
+            data_kind=b'y',
+            port=port,
+            call_from=self._local_call(src),
+            call_to=pad_callsign(dest)
+        )
+
+    def send_connect(self, port: int, dest: str, src: Optional[str] = None):
         """Send connect request ('C')."""
         self._send_frame(
             data_kind=b'C',
             port=port,
-            call_from=self.callsign,
-            call_to=dest.upper().ljust(10)[:10].encode()
+            call_from=self._local_call(src),
+            call_to=pad_callsign(dest)
         )
 
-    def send_disconnect(self, port: int, dest: str):
+    def send_disconnect(self, port: int, dest: str, src: Optional[str] = None):
         """Send disconnect request ('D')."""
         self._send_frame(
             data_kind=b'D',
             port=port,
-            call_from=self.callsign,
-            call_to=dest.upper().ljust(10)[:10].encode()
+            call_from=self._local_call(src),
+            call_to=pad_callsign(dest)
         )
 
-    def send_connected_data(self, port: int, dest: str, data: bytes):
+    def send_connected_data(self, port: int, dest: str, data: bytes, src: Optional[str] = None):
         """Send connected data ('d')."""
         self._send_frame(
             data_kind=b'd',
             port=port,
-            call_from=self.callsign,
-            call_to=dest.upper().ljust(10)[:10].encode(),
+            call_from=self._local_call(src),
+            call_to=pad_callsign(dest),
             data=data
         )
 
+    def send_stream(self, port: int, dest: str, source, paclen: int = DEFAULT_PACLEN,
+                    high_water: int = DEFAULT_HIGH_WATER, per_link: bool = True,
+                    poll_interval: float = 0.5, timeout: Optional[float] = None, src: Optional[str] = None) -> int:
+        """
+        Send ``source`` (bytes, a binary file or an iterable of bytes) to a
+        connected station in ``paclen``-byte 'd' frames, blocking whenever
+        ``high_water`` frames may be outstanding until a 'y' (or, with
+        ``per_link=False``, 'Y') reply shows the TNC has room. ``src``
+        selects another registered callsign as the local end of the link.
+        Returns the number of payload bytes sent.
+        """
+        key = link_key(port, self._local_call(src), dest.encode()) if per_link else port
+        deadline = None if timeout is None else time.monotonic() + timeout
+        in_flight = self.outstanding.get(key) or 0
+        sent = 0
+        for chunk in iter_chunks(source, paclen):
+            while in_flight >= high_water:
+                if not self.connected:
+                    raise ConnectionError(f"Not connected to {self.transport}")
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"Outstanding frames to {dest} stayed at {in_flight}")
+                seq = self.outstanding.seq(key)
+                if per_link:
+                    self.request_link_outstanding(port, dest, src)
+                else:
+                    self.request_outstanding(port)
+                self.flush()
+                count = self.outstanding.wait(key, seq, poll_interval)
+                if count is None:
+                    continue
+                in_flight = count
+                if in_flight >= high_water:
+                    # Still full: give the TNC time to drain before polling again
+                    self.outstanding.wait(key, seq + 1, poll_interval)
+            self.send_connected_data(port, dest, chunk, src)
+            self.outstanding.sent(key)
+            in_flight += 1
+            sent += len(chunk)
+        return sent
+
+    def _new_session(self, port: int, local: bytes, remote: bytes) -> AX25Session:
+        return AX25Session(self, port, local, remote)
+
+    def open_session(self, port: int, dest: str, src: Optional[str] = None, timeout: Optional[float] = 30.0) -> AX25Session:
+        """Connect to ``dest`` and return the session once the link is up (ConnectionError if refused)."""
+        session = self._new_session(port, self._local_call(src).rstrip(), dest.upper().encode())
+        if session.key in self._sessions:
+            raise ConnectionError(f"Already connected to {dest} on port {port}")
+        self._sessions[session.key] = session
+        self.send_connect(port, dest, src)
+        try:
+            connected = session.wait_connected(timeout)
+        except TimeoutError:
+            self._sessions.pop(session.key, None)
+            raise
+        if not connected:
+            self._sessions.pop(session.key, None)
+            raise ConnectionError(f"Connect to {dest} on port {port} failed")
+        return session
+
     def request_heard_stations(self, port: int = 0):
         """Request heard stations list ('H')."""
         self._send_frame(data_kind=b'H', port=port)
@@ -200,96 +855,61 @@ class AGWPEClient:
         self._send_frame(data_kind=b'm')
 
     def _receive_loop(self):
-        """Receive and parse AGWPE frames."""
-        buffer = b''
-        while self.connected:
-            try:
-                data = self.sock.recv(4096)
-                if not data:
-                    logger.warning("[AGWPE] Connection closed by server")
-                    self.connected = False
+        """Receive and parse AGWPE frames, reconnecting when ``auto_reconnect`` is set."""
+        while True:
+            while self.connected:
+                if not self._receive_once():
                     break
-                
-                buffer += data
-                
-                while len(buffer) >= 36:
-                    header = buffer[:36]
-                    data_kind = header[0:1]
-                    port = struct.unpack('<I', header[4:8])[0]
-                    call_from = header[8:18].decode('ascii', errors='ignore').strip()
-                    call_to = header[18:28].decode('ascii', errors='ignore').strip()
-                    data_len = struct.unpack('<I', header[28:32])[0]
-                    
-                    if len(buffer) < 36 + data_len:
-                        break
-                    
-                    payload = buffer[36:36 + data_len]
-                    buffer = buffer[36 + data_len:]
-                    
-                    frame = AGWPEFrame()
-                    frame.port = port
-                    frame.data_kind = data_kind
-                    frame.call_from = call_from.encode()
-                    frame.call_to = call_to.encode()
-                    frame.data_len = data_len
-                    frame.data = payload
-                    
-                    # Dispatch
-                    if data_kind in [b'D', b'K']:
-                        if self.on_frame:
-                            self.on_frame(frame)
-                    elif data_kind == b'd':
-                        if self.on_connected_data:
-                            self.on_connected_data(port, call_from, payload)
-                    elif data_kind == b'Y':
-                        if payload and len(payload) >= 4:
-                            count = struct.unpack('<I', payload[:4])[0]
-                            if self.on_outstanding:
-                                self.on_outstanding(port, count)
-                    elif data_kind == b'H':
-                        heard_list = []
-                        for i in range(20):
-                            if len(payload) >= (i+1)*14:
-                                call = payload[i*14:i*14+10].decode('ascii', errors='ignore').strip()
-                                timestamp = struct.unpack('<I', payload[i*14+10:i*14+14])[0]
-                                if call:
-                                    heard_list.append({"callsign": call, "last_heard": timestamp})
-                        if self.on_heard_stations:
-                            self.on_heard_stations(port, heard_list)
-                    elif data_kind == b'v':
-                        if payload:
-                            version_str = payload.decode('ascii', errors='ignore').strip()
-                        else:
-                            version_str = "Unknown"
-                        if self.on_extended_version:
-                            self.on_extended_version(version_str)
-                    elif data_kind == b'm':
-                        if len(payload) >= 8:
-                            free_mem = struct.unpack('<I', payload[0:4])[0]
-                            used_mem = struct.unpack('<I', payload[4:8])[0]
-                            mem_info = {"free_kb": free_mem // 1024, "used_kb": used_mem // 1024}
-                        else:
-                            mem_info = {"free_kb": 0, "used_kb": 0}
-                        if self.on_memory_usage:
-                            self.on_memory_usage(mem_info)
-                    elif data_kind in [b'C', b'c', b'D']:
-                        if self.on_frame:
-                            self.on_frame(frame)
-                    
-                    logger.debug(f"[AGWPE] Received {data_kind.decode()} frame from {call_from} to {call_to}")
-                    
-            except Exception as e:
-                logger.error(f"[AGWPE] Receive error: {e}")
-                self.connected = False
+            self._drop_sessions()
+            if not self.auto_reconnect or self._closing.is_set() or not self._reconnect():
                 break
 
+    def _receive_once(self) -> bool:
+        """Perform one socket read and dispatch every complete frame. Returns False once disconnected."""
+        try:
+            n = self._decoder.recv_into(self.sock)
+        except Exception as e:
+            # close() shuts the socket down under this read; that is not an error
+            if not self._closing.is_set():
+                logger.error(f"[AGWPE] Receive error: {e}")
+            if isinstance(e, ValueError):
+                # Malformed header from the peer (e.g. DataLen over max_frame): the stream is unusable
+                self.metrics.decode_errors += 1
+            self.connected = False
+            return False
+
+        if not n:
+            if not self._closing.is_set():
+                logger.warning("[AGWPE] Connection closed by server")
+            self.connected = False
+            return False
+
+        try:
+            self._process_pending()
+            return True
+
+        except Exception as e:
+            logger.error(f"[AGWPE] Receive error: {e}")
+            self.metrics.decode_errors += 1
+            self.connected = False
+            return False
+
     def close(self):
         """Close connection."""
-        self.connected = False
+        self._closing.set()
+        with self.lock:
+            self._flush_locked()
+            self.connected = False
+            self._tx_ready.notify_all()
         if self.sock:
+            # shutdown() wakes a receive thread blocked in recv_into(); close() alone does not
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             self.sock.close()
         logger.info("[AGWPE] Disconnected")
 
 # DOC: Full AGWPE TCP client with unproto, connected mode, raw frames, outstanding queries
 # DOC: Supports all implemented frame types from current project
-# DOC: Single application only - multiple app support requires further research
+# DOC: One application per connection; proxy.AGWPEProxy shares one connection between several
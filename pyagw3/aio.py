@@ -0,0 +1,403 @@
+# pyagw3/aio.py
+
+# PyAGW3/aio.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# asyncio-native AGWPE TCP/IP API client
+# Same request methods as AGWPEClient, exposed as coroutines
+# Receives with asyncio.BufferedProtocol straight into the FrameDecoder buffer,
+# no thread per connection; exponential backoff uses asyncio.sleep
+
+import asyncio
+import socket
+import struct
+import logging
+import time
+from typing import AsyncIterator, Optional, Tuple
+
+from .agwpe import AGWPE_DEFAULT_PORT, AGWPEFrame, FrameDispatcher
+from .ax25 import PID_NO_L3, build_ui
+from .codec import HEADER_LEN, encode_frame, pad_callsign
+from .dispatch import DispatchExecutor
+from .flow import DEFAULT_HIGH_WATER, DEFAULT_PACLEN, iter_chunks, link_key
+from .session import AsyncAX25Session
+from .supervisor import backoff_delay
+
+logger = logging.getLogger('AGWPE')
+
+
+class _AGWPEProtocol(asyncio.BufferedProtocol):
+    """Feeds socket reads directly into the client's decoder buffer."""
+    def __init__(self, client: 'AsyncAGWPEClient'):
+        self._client = client
+        self._transport: Optional[asyncio.Transport] = None
+
+    def connection_made(self, transport):
+        self._transport = transport
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        return self._client._decoder.writable(max(sizehint, 4096))
+
+    def buffer_updated(self, nbytes: int):
+        self._client._decoder.commit(nbytes)
+        try:
+            self._client._process_pending()
+        except Exception as e:
+            logger.error(f"[AGWPE] Receive error: {e}")
+            self._client.metrics.decode_errors += 1
+            self._transport.close()
+
+    def eof_received(self):
+        logger.warning("[AGWPE] Connection closed by server")
+        return False
+
+    def connection_lost(self, exc):
+        self._client._connection_lost(exc)
+
+    def pause_writing(self):
+        self._client._can_write.clear()
+
+    def resume_writing(self):
+        self._client._can_write.set()
+
+
+async def _aiter_chunks(source, size: int) -> AsyncIterator[bytes]:
+    """``iter_chunks`` that also accepts async iterables of bytes."""
+    if not hasattr(source, '__aiter__'):
+        for chunk in iter_chunks(source, size):
+            yield chunk
+        return
+    pending = bytearray()
+    async for piece in source:
+        pending += piece
+        while len(pending) >= size:
+            yield bytes(pending[:size])
+            del pending[:size]
+    if pending:
+        yield bytes(pending)
+
+
+class AsyncAGWPEClient(FrameDispatcher):
+    """
+    asyncio AGWPE TCP/IP API client.
+    Mirrors AGWPEClient: the same callbacks are invoked from the event loop,
+    request methods are coroutines, and incoming monitor/connection frames
+    can also be consumed with ``async for frame in client``.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = AGWPE_DEFAULT_PORT, callsign: str = "NOCALL",
+                 frame_queue_size: int = 10000, executor: Optional[DispatchExecutor] = None):
+        super().__init__(executor)
+        self.host = host
+        self.port = port
+        self.callsign = callsign.ljust(10)[:10].upper().encode()
+        self.connected = False
+        self.frames_dropped = 0
+        self._frame_queue_size = frame_queue_size
+        self._frames: Optional[asyncio.Queue] = None
+        self._transport: Optional[asyncio.Transport] = None
+        self._can_write: Optional[asyncio.Event] = None
+        self._closed: Optional[asyncio.Event] = None
+
+    async def __aenter__(self) -> 'AsyncAGWPEClient':
+        if not await self.connect():
+            raise ConnectionError(f"Could not connect to {self.host}:{self.port}")
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def connect(self, max_retries: int = 10, base_delay: float = 1.0) -> bool:
+        """Connect with exponential backoff retry logic (non-blocking)."""
+        loop = asyncio.get_running_loop()
+        self._can_write = asyncio.Event()
+        self._can_write.set()
+        attempt = 0
+        while attempt <= max_retries:
+            try:
+                self._decoder.clear()
+                transport, _ = await loop.create_connection(lambda: _AGWPEProtocol(self), self.host, self.port)
+
+                sock = transport.get_extra_info('socket')
+                if sock is not None:
+                    # Enable TCP keepalive
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+
+                    # Platform-specific tuning
+                    if hasattr(socket, 'TCP_KEEPIDLE'):
+                        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 60)
+                    if hasattr(socket, 'TCP_KEEPINTVL'):
+                        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
+                    if hasattr(socket, 'TCP_KEEPCNT'):
+                        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 5)
+
+                self._transport = transport
+                self._closed = asyncio.Event()
+                self.connected = True
+
+                # Register callsign
+                await self._send_frame(data_kind=b'R', call_from=self.callsign)
+                self.metrics.record_connect()
+
+                logger.info(f"[AGWPE] Connected to {self.host}:{self.port} as {self.callsign.decode()} (attempt {attempt + 1})")
+                return True
+
+            except Exception as e:
+                self.metrics.connect_failures += 1
+                attempt += 1
+                if attempt > max_retries:
+                    logger.error(f"[AGWPE] Connection failed after {max_retries} retries: {e}")
+                    return False
+
+                # Exponential backoff with jitter
+                delay = backoff_delay(attempt, base_delay)
+                logger.warning(f"[AGWPE] Connection attempt {attempt} failed: {e}. Retrying in {delay:.2f}s...")
+                await asyncio.sleep(delay)
+        return False
+
+    def _connection_lost(self, exc: Optional[Exception]):
+        if exc is not None:
+            logger.error(f"[AGWPE] Receive error: {exc}")
+        self.connected = False
+        self._transport = None
+        self._drop_sessions()
+        if self._can_write is not None:
+            self._can_write.set()
+        if self._closed is not None:
+            self._closed.set()
+        if self._frames is not None:
+            self._put_frame(None)
+
+    def _put_frame(self, frame: Optional[AGWPEFrame]):
+        """Queue a frame for ``frames()``, dropping the oldest when the queue is full."""
+        queue = self._frames
+        while True:
+            try:
+                queue.put_nowait(frame)
+                return
+            except asyncio.QueueFull:
+                queue.get_nowait()
+                self.frames_dropped += 1
+
+    def _emit_frame(self, key, raw: memoryview):
+        """Deliver a monitored/connection frame to ``on_frame`` and the async iterator."""
+        if self.on_frame is None and self._frames is None:
+            return
+        frame = AGWPEFrame(raw)
+        if self.on_frame:
+            self.executor.submit(key, self.on_frame, frame)
+        if self._frames is not None:
+            self._put_frame(frame)
+
+    def frames(self) -> AsyncIterator[AGWPEFrame]:
+        """
+        Iterate incoming monitor/connection frames until the connection closes.
+        Frames are queued from the first call onwards; once more than
+        ``frame_queue_size`` are waiting the oldest are dropped.
+        """
+        if self._frames is None:
+            self._frames = asyncio.Queue(self._frame_queue_size)
+        return self._iter_frames(self._frames)
+
+    async def _iter_frames(self, queue: asyncio.Queue) -> AsyncIterator[AGWPEFrame]:
+        while True:
+            if self._closed is not None and self._closed.is_set() and queue.empty():
+                return
+            frame = await queue.get()
+            if frame is None:
+                return
+            yield frame
+
+    def __aiter__(self) -> AsyncIterator[AGWPEFrame]:
+        return self.frames()
+
+    async def _send_frame(self, data_kind: bytes, port: int = 0, call_from: bytes = b'', call_to: bytes = b'', data: bytes = b''):
+        """Send raw AGWPE frame, waiting while the transport's write buffer is full."""
+        if not self.connected or self._transport is None:
+            return
+
+        try:
+            self._transport.write(encode_frame(data_kind, port, call_from, call_to, data))
+            self.metrics.record_out(data_kind[0], port, HEADER_LEN + len(data))
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"[AGWPE] Sent {data_kind.decode()} frame on port {port}")
+
+        except Exception as e:
+            logger.error(f"[AGWPE] Send failed: {e}")
+            self.metrics.send_errors += 1
+            self.connected = False
+            return
+
+        if not self._can_write.is_set():
+            await self._can_write.wait()
+
+    async def send_ui(self, port: int, dest: str, src: str, pid: int, info: bytes = b''):
+        """Send unproto UI frame (most common for PACSAT)."""
+        await self._send_frame(
+            data_kind=b'D',
+            port=port,
+            call_from=pad_callsign(src),
+            call_to=pad_callsign(dest),
+            data=bytes([pid]) + info
+        )
+
+    async def send_raw_unproto(self, port: int, dest: str, src: str, data: bytes):
+        """Send raw unproto frame ('K')."""
+        await self._send_frame(
+            data_kind=b'K',
+            port=port,
+            call_from=pad_callsign(src),
+            call_to=pad_callsign(dest),
+            data=data
+        )
+
+    async def send_raw_ui(self, port: int, dest: str, src: str, info: bytes = b'', pid: int = PID_NO_L3, path=()):
+        """Build an AX.25 UI frame with ``ax25.build_ui`` and send it raw ('K')."""
+        await self.send_raw_unproto(port, dest, src, build_ui(dest, src, info, pid, tuple(path)))
+
+    async def send_monitor(self, port: int):
+        """Request monitored frames on port ('M')."""
+        await self._send_frame(data_kind=b'M', port=port)
+
+    async def send_raw_enable(self):
+        """Toggle reception of raw AX.25 frames ('k')."""
+        await self._send_frame(data_kind=b'k')
+
+    async def request_outstanding(self, port: int = 0):
+        """Request outstanding frames report ('Y')."""
+        await self._send_frame(data_kind=b'Y', port=port)
+
+    async def request_link_outstanding(self, port: int, dest: str, src: Optional[str] = None):
+        """Request outstanding frames for the connection to ``dest`` ('y')."""
+        await self._send_frame(
+            data_kind=b'y',
+            port=port,
+            call_from=self._local_call(src),
+            call_to=pad_callsign(dest)
+        )
+
+    async def send_connect(self, port: int, dest: str, src: Optional[str] = None):
+        """Send connect request ('C')."""
+        await self._send_frame(
+            data_kind=b'C',
+            port=port,
+            call_from=self._local_call(src),
+            call_to=pad_callsign(dest)
+        )
+
+    async def send_disconnect(self, port: int, dest: str, src: Optional[str] = None):
+        """Send disconnect request ('D')."""
+        await self._send_frame(
+            data_kind=b'D',
+            port=port,
+            call_from=self._local_call(src),
+            call_to=pad_callsign(dest)
+        )
+
+    async def send_connected_data(self, port: int, dest: str, data: bytes, src: Optional[str] = None):
+        """Send connected data ('d')."""
+        await self._send_frame(
+            data_kind=b'd',
+            port=port,
+            call_from=self._local_call(src),
+            call_to=pad_callsign(dest),
+            data=data
+        )
+
+    async def send_stream(self, port: int, dest: str, source, paclen: int = DEFAULT_PACLEN,
+                          high_water: int = DEFAULT_HIGH_WATER, per_link: bool = True,
+                          poll_interval: float = 0.5, timeout: Optional[float] = None, src: Optional[str] = None) -> int:
+        """Awaitable version of ``AGWPEClient.send_stream``; ``source`` may also be an async iterable."""
+        key = link_key(port, self._local_call(src), dest.encode()) if per_link else port
+        deadline = None if timeout is None else time.monotonic() + timeout
+        in_flight = self.outstanding.get(key) or 0
+        sent = 0
+        async for chunk in _aiter_chunks(source, paclen):
+            while in_flight >= high_water:
+                if not self.connected:
+                    raise ConnectionError(f"Not connected to {self.host}:{self.port}")
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError(f"Outstanding frames to {dest} stayed at {in_flight}")
+                seq = self.outstanding.seq(key)
+                if per_link:
+                    await self.request_link_outstanding(port, dest, src)
+                else:
+                    await self.request_outstanding(port)
+                count = await self.outstanding.wait_async(key, seq, poll_interval)
+                if count is None:
+                    continue
+                in_flight = count
+                if in_flight >= high_water:
+                    # Still full: give the TNC time to drain before polling again
+                    await self.outstanding.wait_async(key, seq + 1, poll_interval)
+            await self.send_connected_data(port, dest, chunk, src)
+            self.outstanding.sent(key)
+            in_flight += 1
+            sent += len(chunk)
+        return sent
+
+    def _new_session(self, port: int, local: bytes, remote: bytes) -> AsyncAX25Session:
+        return AsyncAX25Session(self, port, local, remote)
+
+    def _accept_session(self, session: AsyncAX25Session):
+        result = self.on_session(session.reader, session.writer)
+        if asyncio.iscoroutine(result):
+            asyncio.get_running_loop().create_task(result)
+
+    async def open_connection(self, port: int, dest: str, src: Optional[str] = None,
+                              timeout: Optional[float] = 30.0) -> Tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """
+        Connect to ``dest`` and return a (StreamReader, StreamWriter) pair for the link,
+        like ``asyncio.open_connection``. Inbound links are passed to ``on_session(reader, writer)``.
+        """
+        session = self._new_session(port, self._local_call(src).rstrip(), dest.upper().encode())
+        if session.key in self._sessions:
+            raise ConnectionError(f"Already connected to {dest} on port {port}")
+        self._sessions[session.key] = session
+        await self.send_connect(port, dest, src)
+        try:
+            connected = await session.wait_connected(timeout)
+        except asyncio.TimeoutError:
+            self._sessions.pop(session.key, None)
+            raise
+        if not connected:
+            self._sessions.pop(session.key, None)
+            raise ConnectionError(f"Connect to {dest} on port {port} failed")
+        return session.reader, session.writer
+
+    async def request_heard_stations(self, port: int = 0):
+        """Request heard stations list ('H')."""
+        await self._send_frame(data_kind=b'H', port=port)
+
+    async def send_login(self, username: str, password: str):
+        """Send login frame ('T')."""
+        payload = f"{username}\0{password}\0".encode('ascii')
+        await self._send_frame(data_kind=b'T', data=payload)
+
+    async def set_parameter(self, port: int, param_id: int, value: int):
+        """Set parameter ('P')."""
+        payload = struct.pack('<BI', param_id, value)
+        await self._send_frame(data_kind=b'P', port=port, data=payload)
+
+    async def request_extended_version(self):
+        """Request extended version ('v')."""
+        await self._send_frame(data_kind=b'v')
+
+    async def request_memory_usage(self):
+        """Request memory usage ('m')."""
+        await self._send_frame(data_kind=b'm')
+
+    async def wait_closed(self):
+        """Wait until the connection is lost or closed."""
+        if self._closed is not None:
+            await self._closed.wait()
+
+    async def close(self):
+        """Close connection."""
+        self.connected = False
+        if self._transport is not None:
+            self._transport.close()
+            await self.wait_closed()
+        logger.info("[AGWPE] Disconnected")
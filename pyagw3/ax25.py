@@ -0,0 +1,279 @@
+# pyagw3/ax25.py
+
+# PyAGW3/ax25.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# AX.25 frame decoding for raw ('K') payloads
+# Address fields are unshifted a whole field at a time with bytes.translate
+# instead of per-byte Python, and decoded fields are cached by their wire
+# bytes since a channel carries few distinct stations. address_columns()
+# unshifts the destination and source of many frames in one translate call
+# (or as NumPy arrays when NumPy is installed) for bulk analysis.
+# Encoding caches whole shifted address blocks per (dest, src, path), so
+# building a UI/I/S frame is one join of the cached prefix, control/PID and
+# info
+
+import functools
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+try:
+    import numpy
+except ImportError:  # optional, only used by address_columns()
+    numpy = None
+
+ADDRESS_LEN = 7
+MAX_DIGIPEATERS = 8
+
+FRAME_I = 'I'
+FRAME_S = 'S'
+FRAME_U = 'U'
+
+# Callsign characters are stored shifted left one bit; SSID sits in bits 1-4 of the seventh byte
+_UNSHIFT = bytes(b >> 1 for b in range(256))
+_SSID = bytes((b >> 1) & 0x0F for b in range(256))
+_S_NAMES = {0x01: 'RR', 0x05: 'RNR', 0x09: 'REJ', 0x0D: 'SREJ'}
+_S_CODES = {name: code for code, name in _S_NAMES.items()}
+_U_NAMES = {0x03: 'UI', 0x0F: 'DM', 0x2F: 'SABM', 0x43: 'DISC', 0x63: 'UA', 0x6F: 'SABME', 0x87: 'FRMR',
+            0xAF: 'XID', 0xE3: 'TEST'}
+
+
+class AX25Frame(NamedTuple):
+    """
+    One decoded AX.25 frame. Callsigns are 'CALL-SSID' strings (no suffix for
+    SSID 0); digipeaters that have already repeated the frame carry a '*'.
+    Control is the modulo-8 control byte; ``pid`` is None for frames without
+    one (S frames and U frames other than UI).
+    """
+    dest: str
+    src: str
+    digipeaters: Tuple[str, ...]
+    control: int
+    pid: Optional[int]
+    info: bytes
+
+    @property
+    def frame_type(self) -> str:
+        if not self.control & 0x01:
+            return FRAME_I
+        return FRAME_S if self.control & 0x03 == 0x01 else FRAME_U
+
+    @property
+    def name(self) -> str:
+        """'I', 'RR', 'UI', 'SABM', ... ('U?' / 'S?' for unknown encodings)."""
+        kind = self.frame_type
+        if kind == FRAME_I:
+            return FRAME_I
+        if kind == FRAME_S:
+            return _S_NAMES.get(self.control & 0x0F, 'S?')
+        return _U_NAMES.get(self.control & 0xEF, 'U?')
+
+    @property
+    def path(self) -> str:
+        """TNC2-style 'SRC>DEST,DIGI*,DIGI' header."""
+        return ','.join((f"{self.src}>{self.dest}",) + self.digipeaters)
+
+
+def address_end(data, start: int = 1) -> int:
+    """Offset just past the address field starting at ``start``, or -1 if it is malformed."""
+    end = start + 2 * ADDRESS_LEN - 1
+    last = start + (2 + MAX_DIGIPEATERS) * ADDRESS_LEN
+    n = len(data)
+    while end < n and end < last:
+        if data[end] & 0x01:
+            return end + 1
+        end += ADDRESS_LEN
+    return -1
+
+
+def _call(calls: bytes, address: bytes, pos: int) -> str:
+    call = calls[pos:pos + 6].rstrip().decode('ascii', 'replace')
+    ssid = _SSID[address[pos + 6]]
+    return f"{call}-{ssid}" if ssid else call
+
+
+# Decoded address fields keyed by their 7 wire bytes; busy channels repeat a handful of stations
+_CALL_CACHE: Dict[bytes, str] = {}
+_CALL_CACHE_SIZE = 4096
+
+
+def _cached_call(field: bytes) -> str:
+    name = _CALL_CACHE.get(field)
+    if name is None:
+        if len(_CALL_CACHE) >= _CALL_CACHE_SIZE:
+            _CALL_CACHE.clear()
+        name = _CALL_CACHE[field] = _call(field.translate(_UNSHIFT), field, 0)
+    return name
+
+
+def _decode_at(data: bytes, start: int, end: int) -> AX25Frame:
+    if end >= len(data):
+        raise ValueError("AX.25 frame has no control field")
+    cache = _CALL_CACHE
+    dest = cache.get(data[start:start + ADDRESS_LEN]) or _cached_call(data[start:start + ADDRESS_LEN])
+    pos = start + ADDRESS_LEN
+    src = cache.get(data[pos:pos + ADDRESS_LEN]) or _cached_call(data[pos:pos + ADDRESS_LEN])
+    digipeaters = ()
+    if end - start > 2 * ADDRESS_LEN:
+        digipeaters = tuple(_cached_call(data[pos:pos + ADDRESS_LEN]) + ('*' if data[pos + 6] & 0x80 else '')
+                            for pos in range(start + 2 * ADDRESS_LEN, end, ADDRESS_LEN))
+    control = data[end]
+    if not control & 0x01 or control & 0xEF == 0x03:
+        pid = data[end + 1] if end + 1 < len(data) else None
+        info = data[end + 2:]
+    else:
+        pid = None
+        info = data[end + 1:]
+    return AX25Frame(dest, src, digipeaters, control, pid, info)
+
+
+def decode(data, kiss: bool = True) -> AX25Frame:
+    """
+    Decode one AX.25 frame. With ``kiss`` (the default) ``data`` is a 'K'
+    payload and its leading KISS byte is skipped. Raises ValueError if the
+    frame is malformed.
+    """
+    data = bytes(data)
+    start = 1 if kiss else 0
+    end = address_end(data, start)
+    if end < 0:
+        raise ValueError("Malformed AX.25 address field")
+    return _decode_at(data, start, end)
+
+
+def decode_batch(payloads: Iterable, kiss: bool = True) -> List[Optional[AX25Frame]]:
+    """
+    Decode many frames at once (e.g. ``frame.data`` of a recording's 'K'
+    frames). Malformed frames decode to None instead of raising.
+
+    Address fields are decoded once per distinct address block in the
+    batch: a frame whose leading bytes repeat the previous frame's block
+    (or any block seen earlier) reuses its callsigns and path, so only
+    control, PID and info are sliced per frame.
+    """
+    start = 1 if kiss else 0
+    blocks: Dict[bytes, tuple] = {}
+    frames: List[Optional[AX25Frame]] = []
+    append = frames.append
+    new = tuple.__new__
+    last_block = None
+    last_addresses = None
+    last_end = 0
+    for data in payloads:
+        data = bytes(data)
+        n = len(data)
+        if last_block is not None and n > last_end and data[start:last_end] == last_block:
+            # Same address block as the previous frame; its final byte carries the end-of-address bit
+            end = last_end
+            addresses = last_addresses
+        else:
+            end = address_end(data, start)
+            if not 0 < end < n:
+                append(None)
+                continue
+            block = data[start:end]
+            addresses = blocks.get(block)
+            if addresses is None:
+                frame = _decode_at(data, start, end)
+                addresses = blocks[block] = frame[:3]
+            last_block, last_addresses, last_end = block, addresses, end
+        control = data[end]
+        if not control & 0x01 or control & 0xEF == 0x03:
+            fields = (control, data[end + 1] if end + 1 < n else None, data[end + 2:])
+        else:
+            fields = (control, None, data[end + 1:])
+        append(new(AX25Frame, addresses + fields))
+    return frames
+
+
+def address_columns(payloads: Iterable, kiss: bool = True, use_numpy: Optional[bool] = None) -> Dict[str, object]:
+    """
+    Destination and source of every frame as columns for bulk analysis:
+    ``dest``/``src`` callsigns (bytes, padding stripped) and
+    ``dest_ssid``/``src_ssid``. With NumPy (used when installed unless
+    ``use_numpy`` is False) the columns are arrays; otherwise lists. Frames
+    shorter than two addresses give empty callsigns.
+    """
+    if use_numpy is None:
+        use_numpy = numpy is not None
+    elif use_numpy and numpy is None:
+        raise ImportError("address_columns(use_numpy=True) requires NumPy")
+    start = 1 if kiss else 0
+    stop = start + 2 * ADDRESS_LEN
+    blank = b'\x40' * 6 + b'\x00'
+    heads = b''.join(bytes(data[start:stop]) if len(data) >= stop else blank * 2 for data in payloads)
+    if use_numpy:
+        table = numpy.frombuffer(heads, dtype=numpy.uint8).reshape(-1, 2 * ADDRESS_LEN)
+        shifted = table >> 1
+        columns = {}
+        for name, pos in (('dest', 0), ('src', ADDRESS_LEN)):
+            calls = numpy.ascontiguousarray(shifted[:, pos:pos + 6]).view('S6').ravel()
+            columns[name] = numpy.char.rstrip(calls)
+            columns[name + '_ssid'] = (table[:, pos + 6] >> 1) & 0x0F
+        return columns
+    calls = heads.translate(_UNSHIFT)
+    ssids = heads[6::ADDRESS_LEN].translate(_SSID)
+    size = 2 * ADDRESS_LEN
+    return {
+        'dest': [calls[pos:pos + 6].rstrip() for pos in range(0, len(calls), size)],
+        'dest_ssid': list(ssids[0::2]),
+        'src': [calls[pos:pos + 6].rstrip() for pos in range(ADDRESS_LEN, len(calls), size)],
+        'src_ssid': list(ssids[1::2]),
+    }
+
+
+# Encoding
+
+PID_NO_L3 = 0xF0
+_SHIFT = bytes((b << 1) & 0xFF for b in range(256))
+_KISS_BYTES = [bytes([port << 4]) for port in range(16)]
+_UI_CONTROL = [bytes([0x03, pid]) for pid in range(256)]
+
+
+def encode_address(call: str, last: bool = False, high_bit: bool = False) -> bytes:
+    """
+    One shifted 7-byte address field for 'CALL' or 'CALL-SSID'. ``high_bit``
+    is the C bit of destination/source or the H (has-been-repeated) bit of a
+    digipeater; ``last`` marks the end of the address field.
+    """
+    base, _, ssid = call.upper().partition('-')
+    ssid = int(ssid) if ssid else 0
+    if not 1 <= len(base) <= 6 or not 0 <= ssid <= 15:
+        raise ValueError(f"Invalid AX.25 callsign {call!r}")
+    return (base.ljust(6).encode('ascii').translate(_SHIFT)
+            + bytes([0x60 | (0x80 if high_bit else 0) | ssid << 1 | (0x01 if last else 0)]))
+
+
+@functools.lru_cache(maxsize=1024)
+def address_block(dest: str, src: str, path: Tuple[str, ...] = (), command: bool = True) -> bytes:
+    """
+    Complete shifted address field, cached per argument tuple. Digipeaters
+    ending in '*' get the H bit. ``command`` sets the AX.25 v2 command/
+    response bits (destination C for commands, source C for responses).
+    """
+    parts = [encode_address(dest, high_bit=command), encode_address(src, last=not path, high_bit=not command)]
+    for i, digi in enumerate(path):
+        repeated = digi.endswith('*')
+        parts.append(encode_address(digi.rstrip('*'), last=i == len(path) - 1, high_bit=repeated))
+    return b''.join(parts)
+
+
+def build_ui(dest: str, src: str, info: bytes = b'', pid: int = PID_NO_L3, path: Tuple[str, ...] = (),
+             kiss_port: int = 0) -> bytes:
+    """'K' payload (KISS byte + AX.25 UI frame) for ``send_raw_unproto``."""
+    return b''.join((_KISS_BYTES[kiss_port], address_block(dest, src, tuple(path)), _UI_CONTROL[pid], info))
+
+
+def build_i(dest: str, src: str, ns: int, nr: int, info: bytes = b'', pid: int = PID_NO_L3,
+            poll: bool = False, path: Tuple[str, ...] = (), kiss_port: int = 0) -> bytes:
+    """'K' payload for a modulo-8 I frame."""
+    control = (nr & 0x07) << 5 | (0x10 if poll else 0) | (ns & 0x07) << 1
+    return b''.join((_KISS_BYTES[kiss_port], address_block(dest, src, tuple(path)), bytes([control, pid]), info))
+
+
+def build_s(dest: str, src: str, kind: str, nr: int, poll_final: bool = False, command: bool = False,
+            path: Tuple[str, ...] = (), kiss_port: int = 0) -> bytes:
+    """'K' payload for a modulo-8 S frame (``kind`` is 'RR', 'RNR', 'REJ' or 'SREJ')."""
+    control = (nr & 0x07) << 5 | (0x10 if poll_final else 0) | _S_CODES[kind]
+    return b''.join((_KISS_BYTES[kiss_port], address_block(dest, src, tuple(path), command), bytes([control])))
@@ -0,0 +1,297 @@
+# pyagw3/bench.py
+
+# PyAGW3/bench.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# Benchmark suite
+# Header codec encode/decode (original hand-built path vs pyagw3.codec),
+# receive-path frames/sec by payload size and read split pattern, and
+# round-trip latency against the server emulator over loopback TCP, and
+# AX.25 address decoding (per-byte Python vs translate-based batch)
+# Run with: python -m pyagw3.bench [--quick] [--output results.json]
+
+import argparse
+import json
+import platform
+import socket
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from . import __version__
+from .agwpe import AGWPEClient
+from .ax25 import address_columns, decode, decode_batch
+from .codec import encode_frame, encode_many, decode_many, strip_callsign
+from .server import AGWPEServer
+
+PAYLOAD_SIZES = (0, 64, 256, 2048)
+# Read sizes used to slice the byte stream before it reaches the decoder
+SPLIT_PATTERNS = {"bulk": 65536, "mtu": 1448, "tiny": 17}
+
+
+def _legacy_encode(data_kind: bytes, port: int, call_from: bytes, call_to: bytes, data: bytes) -> bytes:
+    """Header construction as done by _send_frame before the codec existed."""
+    header = bytearray(36)
+    header[0:1] = data_kind
+    struct.pack_into('<I', header, 4, port)
+    header[8:18] = call_from.ljust(10, b' ')[:10]
+    header[18:28] = call_to.ljust(10, b' ')[:10]
+    struct.pack_into('<I', header, 28, len(data))
+    return header + data
+
+
+def _legacy_decode(buffer: bytes) -> int:
+    """Header parsing and buffer re-slicing as done by _receive_loop before the codec existed."""
+    count = 0
+    while len(buffer) >= 36:
+        header = buffer[:36]
+        data_kind = header[0:1]
+        port = struct.unpack('<I', header[4:8])[0]
+        call_from = header[8:18].decode('ascii', errors='ignore').strip()
+        call_to = header[18:28].decode('ascii', errors='ignore').strip()
+        data_len = struct.unpack('<I', header[28:32])[0]
+        if len(buffer) < 36 + data_len:
+            break
+        payload = buffer[36:36 + data_len]
+        buffer = buffer[36 + data_len:]
+        call_from.encode(), call_to.encode(), data_kind, port, payload
+        count += 1
+    return count
+
+
+def _codec_decode(buffer: bytes) -> int:
+    frames, _ = decode_many(buffer)
+    for kind, port, call_from, call_to, user, payload, offset in frames:
+        strip_callsign(call_from), strip_callsign(call_to), bytes(payload)
+    return len(frames)
+
+
+def _rate(fn: Callable[[], int], repeat: int = 5) -> float:
+    """Best frames/sec over ``repeat`` runs of ``fn`` (which returns the frame count it handled)."""
+    best = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        n = fn()
+        elapsed = time.perf_counter() - start
+        if elapsed > 0:
+            best = max(best, n / elapsed)
+    return best
+
+
+def bench_header_codec(count: int = 20000, payload_size: int = 64) -> List[tuple]:
+    """Return (name, legacy fps, codec fps) rows for encode, batch encode and batch decode."""
+    frames = [(b'D', 0, b'N0CALL-1', b'BEACON', bytes(payload_size)) for _ in range(count)]
+    stream = bytes(encode_many(frames))
+
+    def legacy_encode() -> int:
+        for f in frames:
+            _legacy_encode(*f)
+        return count
+
+    def codec_encode() -> int:
+        for f in frames:
+            encode_frame(*f)
+        return count
+
+    def legacy_batch() -> int:
+        b''.join([bytes(_legacy_encode(*f)) for f in frames])
+        return count
+
+    def codec_batch() -> int:
+        encode_many(frames)
+        return count
+
+    return [
+        ("encode", _rate(legacy_encode), _rate(codec_encode)),
+        ("encode batch", _rate(legacy_batch), _rate(codec_batch)),
+        ("decode batch", _rate(lambda: _legacy_decode(stream)), _rate(lambda: _codec_decode(stream))),
+    ]
+
+
+def _legacy_ax25(data: bytes) -> tuple:
+    """Per-byte address unshifting as applications did it before pyagw3.ax25."""
+    calls = []
+    pos = 1
+    while True:
+        call = ''.join(chr(b >> 1) for b in data[pos:pos + 6]).strip()
+        ssid = (data[pos + 6] >> 1) & 0x0F
+        calls.append(f"{call}-{ssid}" if ssid else call)
+        if data[pos + 6] & 0x01:
+            break
+        pos += 7
+    pos += 7
+    return calls, data[pos], data[pos + 1], data[pos + 2:]
+
+
+def bench_ax25_decode(count: int = 20000) -> List[tuple]:
+    """Return (name, frames/sec) rows for decoding raw UI frames with a two-hop path."""
+    shift = lambda call, ssid, last: bytes(b << 1 for b in call.ljust(6).encode()) + bytes([0x60 | ssid << 1 | last])
+    payload = (b'\x00' + shift('APRS', 0, 0) + shift('N0CALL', 9, 0) + shift('WIDE1', 1, 0) + shift('WIDE2', 2, 1)
+               + b'\x03\xf0' + bytes(40))
+    payloads = [payload] * count
+
+    def legacy() -> int:
+        for p in payloads:
+            _legacy_ax25(p)
+        return count
+
+    def single() -> int:
+        for p in payloads:
+            decode(p)
+        return count
+
+    return [
+        ("per-byte", _rate(legacy)),
+        ("decode", _rate(single)),
+        ("decode_batch", _rate(lambda: len(decode_batch(payloads)))),
+        ("address_columns", _rate(lambda: len(address_columns(payloads)['src']))),
+    ]
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def bench_receive_path(count: int = 20000, payload_sizes=PAYLOAD_SIZES, splits: Optional[Dict[str, int]] = None) -> List[dict]:
+    """
+    Frames/sec through the client receive path (decoder, decode_many, dispatch
+    and AGWPEFrame construction) with the stream delivered in fixed-size reads.
+    """
+    splits = SPLIT_PATTERNS if splits is None else splits
+    rows = []
+    for size in payload_sizes:
+        stream = encode_many([(b'D', 0, b'N0CALL-1', b'BEACON', bytes(size))] * count)
+        for name, chunk in splits.items():
+            client = AGWPEClient()
+            received = [0]
+            client.on_frame = lambda f: received.__setitem__(0, received[0] + 1)
+            view = memoryview(stream)
+            start = time.perf_counter()
+            for pos in range(0, len(stream), chunk):
+                client._decoder.feed(view[pos:pos + chunk])
+                client._process_pending()
+            elapsed = time.perf_counter() - start
+            assert received[0] == count
+            rows.append({"payload": size, "split": name, "read_size": chunk,
+                         "frames_per_sec": count / elapsed, "mbytes_per_sec": len(stream) / elapsed / 1e6})
+    return rows
+
+
+def bench_socket_receive(count: int = 20000, payload_sizes=PAYLOAD_SIZES) -> List[dict]:
+    """Frames/sec through _receive_once() reading a real socket pair."""
+    rows = []
+    for size in payload_sizes:
+        stream = encode_many([(b'D', 0, b'N0CALL-1', b'BEACON', bytes(size))] * count)
+        a, b = socket.socketpair()
+        client = AGWPEClient()
+        client.sock = b
+        client.connected = True
+        received = [0]
+        client.on_frame = lambda f: received.__setitem__(0, received[0] + 1)
+        writer = threading.Thread(target=a.sendall, args=(stream,), daemon=True)
+        start = time.perf_counter()
+        writer.start()
+        while received[0] < count and client._receive_once():
+            pass
+        elapsed = time.perf_counter() - start
+        writer.join()
+        client.close()
+        a.close()
+        rows.append({"payload": size, "frames_per_sec": count / elapsed, "mbytes_per_sec": len(stream) / elapsed / 1e6})
+    return rows
+
+
+def bench_round_trip(count: int = 2000) -> dict:
+    """p50/p99 latency of a request/reply ('v' query) against the emulator over loopback TCP."""
+    with AGWPEServer() as server:
+        client = AGWPEClient(port=server.port, callsign="BENCH")
+        if not client.connect(max_retries=0):
+            raise RuntimeError("Could not connect to the emulator")
+        client.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        reply = threading.Event()
+        client.on_extended_version = lambda version: reply.set()
+        samples = []
+        try:
+            for _ in range(count):
+                reply.clear()
+                start = time.perf_counter()
+                client.request_extended_version()
+                if not reply.wait(5):
+                    raise RuntimeError("No reply from the emulator")
+                samples.append(time.perf_counter() - start)
+        finally:
+            client.close()
+    return {
+        "count": count,
+        "p50_us": _percentile(samples, 50) * 1e6,
+        "p99_us": _percentile(samples, 99) * 1e6,
+        "max_us": max(samples) * 1e6,
+    }
+
+
+def run(quick: bool = False) -> dict:
+    """Run every benchmark and return the results as a JSON-serialisable dict."""
+    scale = 10 if quick else 1
+    codec = [{"benchmark": name, "before_fps": before, "after_fps": after}
+             for name, before, after in bench_header_codec(count=20000 // scale)]
+    return {
+        "meta": {
+            "pyagw3": __version__,
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "quick": quick,
+        },
+        "header_codec": codec,
+        "receive_path": bench_receive_path(count=20000 // scale),
+        "socket_receive": bench_socket_receive(count=20000 // scale),
+        "round_trip": bench_round_trip(count=2000 // scale),
+        "ax25_decode": [{"benchmark": name, "frames_per_sec": fps} for name, fps in bench_ax25_decode(count=20000 // scale)],
+    }
+
+
+def _print_report(results: dict):
+    print(f"{'header codec':<16} {'before fps':>14} {'after fps':>14} {'speedup':>8}")
+    for row in results["header_codec"]:
+        print(f"{row['benchmark']:<16} {row['before_fps']:>14,.0f} {row['after_fps']:>14,.0f} "
+              f"{row['after_fps'] / row['before_fps']:>7.1f}x")
+    print(f"\n{'receive path':<16} {'split':>8} {'frames/s':>14} {'MB/s':>10}")
+    for row in results["receive_path"]:
+        print(f"{str(row['payload']) + ' B':<16} {row['split']:>8} {row['frames_per_sec']:>14,.0f} {row['mbytes_per_sec']:>10.1f}")
+    print(f"\n{'socket receive':<16} {'':>8} {'frames/s':>14} {'MB/s':>10}")
+    for row in results["socket_receive"]:
+        print(f"{str(row['payload']) + ' B':<16} {'':>8} {row['frames_per_sec']:>14,.0f} {row['mbytes_per_sec']:>10.1f}")
+    rt = results["round_trip"]
+    print(f"\nround trip ({rt['count']} x 'v'): p50 {rt['p50_us']:.0f} us, p99 {rt['p99_us']:.0f} us, max {rt['max_us']:.0f} us")
+    print(f"\n{'ax25 decode':<16} {'':>8} {'frames/s':>14}")
+    for row in results["ax25_decode"]:
+        print(f"{row['benchmark']:<16} {'':>8} {row['frames_per_sec']:>14,.0f}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m pyagw3.bench", description="PyAGW3 throughput and latency benchmarks")
+    parser.add_argument("--quick", action="store_true", help="run with 10x fewer iterations")
+    parser.add_argument("--output", "-o", help="write JSON results to this file ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    results = run(quick=args.quick)
+    if args.output == "-":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+        return
+    _print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
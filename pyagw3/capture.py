@@ -0,0 +1,387 @@
+# pyagw3/capture.py
+
+# PyAGW3/capture.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# Capture-to-disk recorder
+# Appends raw AGWPE wire frames with a nanosecond receive timestamp to
+# segmented files. The receive thread only copies the frame into a memory
+# buffer; a writer thread does large sequential writes, rotates segments and
+# writes a sidecar index (time -> offset, callsign -> offsets) per segment.
+#
+# Segment (.agwcap):  FILE_HEADER, then records of RECORD_HEADER + wire frame
+# Index   (.agwidx):  INDEX_HEADER, time entries (u64 ns, u32 offset),
+#                     then per callsign: u8 length, callsign, u32 count, u32 offsets
+
+import array
+import logging
+import os
+import re
+import struct
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from .codec import HEADER_LEN, strip_callsign
+from .filters import MONITOR_KINDS, _kind_table
+
+logger = logging.getLogger('AGWPE')
+
+SEGMENT_MAGIC = b'AGWCAP1\0'
+INDEX_MAGIC = b'AGWIDX1\0'
+SEGMENT_SUFFIX = '.agwcap'
+INDEX_SUFFIX = '.agwidx'
+
+# magic, segment creation time (ns)
+FILE_HEADER = struct.Struct('<8sQ')
+# receive time (ns since the epoch), wire frame length
+RECORD_HEADER = struct.Struct('<QI')
+# magic, record count, time entry count, callsign count, first and last receive time (ns)
+INDEX_HEADER = struct.Struct('<8sIIIQQ')
+_TIME_ENTRY = struct.Struct('<QI')
+_U32 = struct.Struct('<I')
+
+DEFAULT_SEGMENT_BYTES = 256 * 1024 * 1024
+DEFAULT_BUFFER_BYTES = 1024 * 1024
+
+
+class SegmentIndex(NamedTuple):
+    """Parsed sidecar index of one segment."""
+    records: int
+    first_ns: int
+    last_ns: int
+    times: array.array        # receive times (ns) of the indexed records
+    offsets: array.array      # file offsets matching ``times``
+    callsigns: Dict[bytes, array.array]
+
+
+def index_path(segment_path: str) -> str:
+    return segment_path[:-len(SEGMENT_SUFFIX)] + INDEX_SUFFIX if segment_path.endswith(SEGMENT_SUFFIX) else segment_path + INDEX_SUFFIX
+
+
+def _numbered_segments(directory: str, prefix: str) -> List[tuple]:
+    pattern = re.compile(re.escape(prefix) + r'-(\d+)' + re.escape(SEGMENT_SUFFIX) + '$')
+    found = []
+    for name in os.listdir(directory):
+        m = pattern.match(name)
+        if m:
+            found.append((int(m.group(1)), os.path.join(directory, name)))
+    return sorted(found)
+
+
+def list_segments(directory: str, prefix: str = "capture") -> List[str]:
+    """Segment paths for ``prefix`` in ``directory``, oldest first."""
+    return [path for _, path in _numbered_segments(directory, prefix)]
+
+
+def read_index(path: str) -> SegmentIndex:
+    """Load a segment's sidecar index (``path`` may be the segment or the index file)."""
+    if path.endswith(SEGMENT_SUFFIX):
+        path = index_path(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, records, time_count, call_count, first_ns, last_ns = INDEX_HEADER.unpack_from(data)
+    if magic != INDEX_MAGIC:
+        raise ValueError(f"{path} is not a capture index")
+    pos = INDEX_HEADER.size
+    times = array.array('Q')
+    offsets = array.array('I')
+    for ts, offset in _TIME_ENTRY.iter_unpack(data[pos:pos + time_count * _TIME_ENTRY.size]):
+        times.append(ts)
+        offsets.append(offset)
+    pos += time_count * _TIME_ENTRY.size
+    callsigns = {}
+    for _ in range(call_count):
+        length = data[pos]
+        call = data[pos + 1:pos + 1 + length]
+        count = _U32.unpack_from(data, pos + 1 + length)[0]
+        pos += 5 + length
+        callsigns[call] = array.array('I', data[pos:pos + 4 * count])
+        pos += 4 * count
+    return SegmentIndex(records, first_ns, last_ns, times, offsets, callsigns)
+
+
+class _SegmentIndexBuilder:
+    """Accumulates the index of the segment being written."""
+    def __init__(self, interval_ns: int):
+        self.interval_ns = interval_ns
+        self.records = 0
+        self.first_ns = 0
+        self.last_ns = 0
+        self.next_ns = 0
+        self.times = array.array('Q')
+        self.offsets = array.array('I')
+        # Keyed by the raw 10-byte header field; padding is stripped once, in to_bytes()
+        self._fields: Dict[bytes, array.array] = {}
+
+    def add_chunk(self, data: bytes, base: int) -> int:
+        """Index every record in ``data``, which starts at file offset ``base``. Returns the record count."""
+        unpack_from = RECORD_HEADER.unpack_from
+        header = RECORD_HEADER.size
+        fields = self._fields
+        next_ns = self.next_ns
+        pos = 0
+        end = len(data)
+        count = 0
+        ts = 0
+        while pos < end:
+            ts, n = unpack_from(data, pos)
+            offset = base + pos
+            if ts >= next_ns:
+                if not self.records and not count:
+                    self.first_ns = ts
+                self.times.append(ts)
+                self.offsets.append(offset)
+                next_ns = ts + self.interval_ns
+            frame = pos + header
+            for field in (data[frame + 8:frame + 18], data[frame + 18:frame + 28]):
+                offsets = fields.get(field)
+                if offsets is None:
+                    offsets = fields[field] = array.array('I')
+                if not offsets or offsets[-1] != offset:
+                    offsets.append(offset)
+            pos = frame + n
+            count += 1
+        if count:
+            self.last_ns = ts
+        self.next_ns = next_ns
+        self.records += count
+        return count
+
+    @property
+    def callsigns(self) -> Dict[bytes, array.array]:
+        merged: Dict[bytes, array.array] = {}
+        for field, offsets in self._fields.items():
+            call = strip_callsign(field)
+            if not call:
+                continue
+            if call in merged:
+                merged[call] = array.array('I', sorted(set(merged[call]) | set(offsets)))
+            else:
+                merged[call] = offsets
+        return merged
+
+    def to_bytes(self) -> bytes:
+        callsigns = self.callsigns
+        parts = [INDEX_HEADER.pack(INDEX_MAGIC, self.records, len(self.times), len(callsigns), self.first_ns, self.last_ns)]
+        parts += [_TIME_ENTRY.pack(ts, offset) for ts, offset in zip(self.times, self.offsets)]
+        for call, offsets in callsigns.items():
+            parts.append(bytes((len(call),)) + call + _U32.pack(len(offsets)))
+            parts.append(offsets.tobytes())
+        return b''.join(parts)
+
+
+class CaptureWriter:
+    """
+    Segmented append-only frame recorder.
+
+    Attach it to a client (``attach``, or ``client.add_tap(writer)``) or
+    feed wire frames to ``record``. Only frames whose data kind is in ``kinds``
+    are kept (monitored traffic by default; None keeps everything). Segments
+    are rotated after ``segment_bytes`` or ``segment_seconds``; each gets an
+    index written when it is closed. If the writer falls more than
+    ``max_pending_bytes`` behind, new frames are dropped and counted in
+    ``dropped`` rather than blocking the receive thread. A write error stops
+    recording: it is kept in ``error`` and raised by ``flush`` and ``close``.
+
+    As a tap it sees what the client's ``frame_filter`` accepted; frames the
+    filter rejects are never decoded and so never captured.
+    """
+    def __init__(self, directory: str, prefix: str = "capture", segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+                 segment_seconds: Optional[float] = None, buffer_bytes: int = DEFAULT_BUFFER_BYTES,
+                 flush_interval: float = 0.5, max_pending_bytes: int = 64 * 1024 * 1024,
+                 kinds=MONITOR_KINDS, index_interval: float = 1.0):
+        # Writes are split so every record starts below segment_bytes, whatever the buffering
+        if segment_bytes >= 2 ** 32:
+            raise ValueError("segment_bytes must be below 4 GiB (index offsets are 32-bit)")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.prefix = prefix
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.buffer_bytes = buffer_bytes
+        self.flush_interval = flush_interval
+        self.max_pending_bytes = max_pending_bytes
+        self.index_interval_ns = int(index_interval * 1e9)
+        self.frames = 0
+        self.bytes = 0
+        self.dropped = 0
+        self.error: Optional[Exception] = None
+        self.segments: List[str] = []
+        self._kinds = _kind_table(kinds) if kinds is not None else bytearray(b'\x01' * 256)
+        self._pending = bytearray()
+        self._cond = threading.Condition(threading.Lock())
+        self._closing = False
+        self._flush_requested = 0
+        self._flushed = 0
+        existing = _numbered_segments(directory, prefix)
+        self._next_segment = existing[-1][0] + 1 if existing else 0
+        self._file = None
+        self._path: Optional[str] = None
+        self._size = 0
+        self._opened = 0.0
+        self._index: Optional[_SegmentIndexBuilder] = None
+        self._clients: list = []
+        self._thread = threading.Thread(target=self._writer_loop, name="agwpe-capture", daemon=True)
+        self._thread.start()
+
+    def __enter__(self) -> 'CaptureWriter':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def attach(self, client):
+        """Record every frame ``client`` receives."""
+        client.add_tap(self)
+        self._clients.append(client)
+
+    def detach(self, client):
+        client.remove_tap(self)
+        self._clients.remove(client)
+
+    def __call__(self, buffer, frames: list):
+        """Client tap: queue the read's frames with one timestamp and one lock acquisition."""
+        kinds = self._kinds
+        pack = RECORD_HEADER.pack
+        ts = time.time_ns()
+        with self._cond:
+            pending = self._pending
+            if len(pending) > self.max_pending_bytes or self._closing:
+                self.dropped += sum(1 for decoded in frames if kinds[decoded[0]])
+                return
+            for decoded in frames:
+                if kinds[decoded[0]]:
+                    start = decoded[6]
+                    n = HEADER_LEN + len(decoded[5])
+                    pending += pack(ts, n)
+                    pending += buffer[start:start + n]
+            if len(pending) >= self.buffer_bytes:
+                self._cond.notify()
+
+    def record(self, raw, timestamp_ns: Optional[int] = None):
+        """Queue one wire frame (header and payload)."""
+        if not self._kinds[raw[0]]:
+            return
+        n = len(raw)
+        with self._cond:
+            if len(self._pending) + n > self.max_pending_bytes or self._closing:
+                self.dropped += 1
+                return
+            self._pending += RECORD_HEADER.pack(timestamp_ns or time.time_ns(), n)
+            self._pending += raw
+            if len(self._pending) >= self.buffer_bytes:
+                self._cond.notify()
+
+    def flush(self, timeout: Optional[float] = None):
+        """Wait until everything queued so far is written to the current segment."""
+        with self._cond:
+            self._flush_requested += 1
+            target = self._flush_requested
+            self._cond.notify_all()
+            self._cond.wait_for(lambda: self._flushed >= target or not self._thread.is_alive(), timeout)
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        """Detach from clients, write out the buffer and close the last segment with its index."""
+        for client in list(self._clients):
+            self.detach(client)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+
+    # Writer thread
+
+    def _writer_loop(self):
+        try:
+            self._write_until_closed()
+        except Exception as e:
+            logger.error(f"[AGWPE] Capture to {self.directory} stopped: {e}")
+            with self._cond:
+                # Later frames are counted as dropped; flush() and close() raise the error
+                self.error = e
+                self._closing = True
+                self._pending = bytearray()
+                self._cond.notify_all()
+
+    def _write_until_closed(self):
+        while True:
+            with self._cond:
+                if not self._pending and not self._closing and self._flushed >= self._flush_requested:
+                    self._cond.wait(self.flush_interval)
+                buf = self._pending
+                self._pending = bytearray()
+                closing = self._closing
+                flush_target = self._flush_requested
+            if buf:
+                self._write(buf)
+            elif self._file is not None and self.segment_seconds and time.monotonic() - self._opened >= self.segment_seconds:
+                self._close_segment()
+            if self._file is not None:
+                self._file.flush()
+            with self._cond:
+                self._flushed = flush_target
+                self._cond.notify_all()
+                if closing and not self._pending:
+                    break
+        self._close_segment()
+
+    def _open_segment(self):
+        self._path = os.path.join(self.directory, f"{self.prefix}-{self._next_segment:06d}{SEGMENT_SUFFIX}")
+        self._next_segment += 1
+        # Buffered: BufferedWriter.write() takes every byte (or raises), where a raw FileIO may write short.
+        # The writer loop flushes after each batch and _close_segment flushes on close
+        self._file = open(self._path, 'xb')
+        self._file.write(FILE_HEADER.pack(SEGMENT_MAGIC, time.time_ns()))
+        self._size = FILE_HEADER.size
+        self._opened = time.monotonic()
+        self._index = _SegmentIndexBuilder(self.index_interval_ns)
+        self.segments.append(self._path)
+
+    def _close_segment(self):
+        if self._file is None:
+            return
+        self._file.close()
+        self._file = None
+        tmp = index_path(self._path) + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(self._index.to_bytes())
+        os.replace(tmp, index_path(self._path))
+
+    def _write(self, buf: bytearray):
+        data = bytes(buf)
+        pos = 0
+        while pos < len(data):
+            if self._file is not None and (self._size >= self.segment_bytes or
+                                           (self.segment_seconds and time.monotonic() - self._opened >= self.segment_seconds)):
+                self._close_segment()
+            if self._file is None:
+                self._open_segment()
+            # Only records starting inside the segment go into it, so index offsets stay below segment_bytes
+            end = _records_before(data, pos, self.segment_bytes - self._size)
+            self._append(data if end - pos == len(data) else data[pos:end])
+            pos = end
+
+    def _append(self, data: bytes):
+        count = self._index.add_chunk(data, self._size)
+        self._file.write(data)
+        self._size += len(data)
+        self.frames += count
+        self.bytes += len(data)
+
+
+def _records_before(data: bytes, pos: int, limit: int) -> int:
+    """End of the records in ``data[pos:]`` that start less than ``limit`` bytes after ``pos`` (at least one)."""
+    unpack_from = RECORD_HEADER.unpack_from
+    header = RECORD_HEADER.size
+    end = len(data)
+    next_pos = pos
+    while next_pos < end and (next_pos == pos or next_pos - pos < limit):
+        next_pos += header + unpack_from(data, next_pos)[1]
+    return next_pos
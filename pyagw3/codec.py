@@ -0,0 +1,108 @@
+# pyagw3/codec.py
+
+# PyAGW3/codec.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# AGWPE 36-byte header codec
+# One precompiled struct.Struct for the whole header, single and batch
+# encode/decode helpers shared by the client send and receive paths
+
+import functools
+import struct
+from typing import Callable, Iterable, List, Optional, Tuple
+
+# DataKind, 3 reserved, Port, CallFrom, CallTo, DataLen, User
+HEADER = struct.Struct('<BxxxI10s10sII')
+HEADER_LEN = HEADER.size
+_DATA_LEN = struct.Struct('<I')
+
+# Frame tuple accepted by encode_many(): (data_kind, port, call_from, call_to, data)
+OutFrame = Tuple[bytes, int, bytes, bytes, bytes]
+# Tuple produced by decode_many(): (data_kind, port, call_from, call_to, user, payload, offset)
+InFrame = Tuple[int, int, bytes, bytes, int, memoryview, int]
+
+_unpack_from = HEADER.unpack_from
+
+
+def strip_callsign(raw: bytes) -> bytes:
+    """Trim NUL and space padding from a raw 10-byte callsign field."""
+    return raw.split(b'\0', 1)[0].strip()
+
+
+@functools.lru_cache(maxsize=256)
+def pad_callsign(call: str) -> bytes:
+    """Upper-case ``call`` and pad/truncate it to the 10-byte header field (cached; applications reuse a few calls)."""
+    return call.upper().ljust(10)[:10].encode()
+
+
+def encode_header(data_kind: bytes, port: int = 0, call_from: bytes = b'', call_to: bytes = b'',
+                  data_len: int = 0, user: int = 0) -> bytes:
+    """Encode one 36-byte header."""
+    return HEADER.pack(data_kind[0], port, call_from.ljust(10, b' '), call_to.ljust(10, b' '), data_len, user)
+
+
+def encode_frame(data_kind: bytes, port: int = 0, call_from: bytes = b'', call_to: bytes = b'',
+                 data: bytes = b'') -> bytes:
+    """Encode one complete frame (header + data)."""
+    return HEADER.pack(data_kind[0], port, call_from.ljust(10, b' '), call_to.ljust(10, b' '), len(data), 0) + data
+
+
+def encode_many(frames: Iterable[OutFrame]) -> bytes:
+    """Encode a batch of (data_kind, port, call_from, call_to, data) tuples into one contiguous buffer."""
+    parts = []
+    append = parts.append
+    pack = HEADER.pack
+    for data_kind, port, call_from, call_to, data in frames:
+        append(pack(data_kind[0], port, call_from.ljust(10, b' '), call_to.ljust(10, b' '), len(data), 0))
+        append(data)
+    return b''.join(parts)
+
+
+def decode_header(buffer, offset: int = 0) -> Tuple[int, int, bytes, bytes, int, int]:
+    """Decode one header: (data_kind, port, call_from, call_to, data_len, user). Callsigns are raw."""
+    return _unpack_from(buffer, offset)
+
+
+def decode_many(buffer, offset: int = 0, accept: Optional[Callable] = None) -> Tuple[List[InFrame], int]:
+    """
+    Decode every complete frame in ``buffer`` starting at ``offset``.
+
+    Returns ``(frames, consumed)`` where each frame is
+    ``(data_kind, port, call_from, call_to, user, payload, offset)``; callsigns
+    are the raw 10-byte fields, ``payload`` is a memoryview into ``buffer`` and
+    ``offset`` is where the frame's header starts in ``buffer``.
+    ``consumed`` is the number of bytes covered by the complete frames; any
+    trailing partial frame is left for the next call.
+
+    If ``accept(buffer, pos)`` is given it is called with the position of each
+    complete frame's header before anything is decoded; frames it rejects are
+    skipped (but still consumed).
+    """
+    view = buffer if isinstance(buffer, memoryview) else memoryview(buffer)
+    end = len(view)
+    pos = offset
+    out = []
+    append = out.append
+    if accept is None:
+        while end - pos >= HEADER_LEN:
+            kind, port, call_from, call_to, data_len, user = _unpack_from(view, pos)
+            stop = pos + HEADER_LEN + data_len
+            if stop > end:
+                break
+            append((kind, port, call_from, call_to, user, view[pos + HEADER_LEN:stop], pos))
+            pos = stop
+        return out, pos - offset
+
+    # Filtered: read only DataLen until the frame has been accepted
+    data_len_from = _DATA_LEN.unpack_from
+    while end - pos >= HEADER_LEN:
+        stop = pos + HEADER_LEN + data_len_from(view, pos + 28)[0]
+        if stop > end:
+            break
+        if accept(view, pos):
+            kind, port, call_from, call_to, _data_len, user = _unpack_from(view, pos)
+            append((kind, port, call_from, call_to, user, view[pos + HEADER_LEN:stop], pos))
+        pos = stop
+    return out, pos - offset
@@ -0,0 +1,138 @@
+# pyagw3/decoder.py
+
+# PyAGW3/decoder.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# Incremental AGWPE frame decoder
+# Preallocated growable bytearray, filled in place with recv_into()
+# Frames are yielded as memoryview slices; the unread tail is only moved
+# when the buffer runs out of free space, never once per frame
+
+import struct
+from typing import Iterator
+
+from .codec import HEADER_LEN
+
+DEFAULT_BUFFER_SIZE = 65536
+DEFAULT_MAX_FRAME = 1 << 20
+
+_DATA_LEN = struct.Struct('<I')
+_DATA_LEN_OFFSET = 28
+
+
+class FrameDecoder:
+    """
+    Incremental decoder for a stream of AGWPE frames.
+
+    Bytes are read straight into a preallocated buffer (``recv_into`` or
+    ``feed``) and complete frames are returned by ``frames()`` as memoryview
+    slices of that buffer. A yielded view is only valid until the next
+    ``recv_into``/``feed`` call; copy it if it has to outlive that.
+
+    A header announcing more than ``max_frame`` payload bytes raises
+    ``ValueError`` instead of growing the buffer to fit it.
+    """
+    def __init__(self, size: int = DEFAULT_BUFFER_SIZE, max_frame: int = DEFAULT_MAX_FRAME):
+        self.max_frame = max_frame
+        self._buf = bytearray(max(size, HEADER_LEN))
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+
+    def __len__(self) -> int:
+        """Number of buffered bytes not yet returned as frames."""
+        return self._end - self._start
+
+    @property
+    def capacity(self) -> int:
+        return len(self._buf)
+
+    def _reserve(self, need: int):
+        """Make room for at least ``need`` bytes after the write cursor."""
+        if len(self._buf) - self._end >= need:
+            return
+        pending = self._end - self._start
+        size = len(self._buf)
+        while size - pending < need:
+            size *= 2
+        if size == len(self._buf):
+            # Enough room once the consumed head is dropped: shift the tail down.
+            # The slice copy is a memcpy, so overlapping source and target go through a temporary
+            tail = self._view[self._start:self._end]
+            self._buf[0:pending] = tail if self._start >= pending else bytes(tail)
+        else:
+            # Grow into a fresh buffer so views handed out earlier stay intact
+            buf = bytearray(size)
+            buf[0:pending] = self._view[self._start:self._end]
+            self._buf = buf
+            self._view = memoryview(buf)
+        self._start = 0
+        self._end = pending
+
+    def _wanted(self) -> int:
+        """Bytes still missing for the frame at the read cursor (minimum 1)."""
+        pending = self._end - self._start
+        if pending < HEADER_LEN:
+            return HEADER_LEN - pending
+        data_len = _DATA_LEN.unpack_from(self._buf, self._start + _DATA_LEN_OFFSET)[0]
+        if data_len > self.max_frame:
+            raise ValueError(f"AGWPE frame of {data_len} bytes exceeds max_frame {self.max_frame}")
+        return max(HEADER_LEN + data_len - pending, 1)
+
+    def writable(self, min_free: int = 4096) -> memoryview:
+        """Free space after the write cursor, at least ``min_free`` bytes. Call ``commit`` after filling it."""
+        self._reserve(max(min_free, self._wanted()))
+        return self._view[self._end:]
+
+    def commit(self, n: int):
+        """Mark ``n`` bytes written into the ``writable()`` view as received."""
+        self._end += n
+
+    def recv_into(self, sock, min_free: int = 4096) -> int:
+        """Read from ``sock`` directly into the buffer. Returns bytes read (0 on EOF)."""
+        n = sock.recv_into(self.writable(min_free))
+        self._end += n
+        return n
+
+    def feed(self, data: bytes) -> int:
+        """Append ``data`` (for sources that hand out bytes instead of sockets)."""
+        n = len(data)
+        self._wanted()
+        self._reserve(n)
+        self._buf[self._end:self._end + n] = data
+        self._end += n
+        return n
+
+    def frames(self) -> Iterator[memoryview]:
+        """Yield each complete frame (header + payload) and advance the cursor past it."""
+        buf = self._buf
+        view = self._view
+        while self._end - self._start >= HEADER_LEN:
+            start = self._start
+            data_len = _DATA_LEN.unpack_from(buf, start + _DATA_LEN_OFFSET)[0]
+            stop = start + HEADER_LEN + data_len
+            if stop > self._end:
+                break
+            self._start = stop
+            yield view[start:stop]
+        if self._start == self._end:
+            # Fully drained: rewind for free instead of waiting for the next shift
+            self._start = self._end = 0
+
+    __iter__ = frames
+
+    def pending(self) -> memoryview:
+        """View of the buffered bytes not yet consumed (valid until the next fill)."""
+        return self._view[self._start:self._end]
+
+    def consume(self, n: int):
+        """Advance the read cursor by ``n`` bytes, e.g. after ``codec.decode_many(pending())``."""
+        self._start += n
+        if self._start >= self._end:
+            self._start = self._end = 0
+
+    def clear(self):
+        """Drop any buffered bytes."""
+        self._start = self._end = 0
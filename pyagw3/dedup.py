@@ -0,0 +1,171 @@
+# pyagw3/dedup.py
+
+# PyAGW3/dedup.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# Duplicate suppression for digipeated monitor frames
+# A frame heard directly and again through each digipeater reaches the
+# application several times. Each monitored frame is hashed (CRC-32 over
+# slices of the receive buffer: port, source, destination and payload, with
+# the digipeater path and monitor timestamp left out) into a fixed-size
+# table of (hash, time) slots; a hit within the window is a repeat. Repeats
+# are dropped before any AGWPEFrame is built, or tagged and delivered.
+
+import array
+import collections
+import re
+import threading
+import time
+import zlib
+from typing import Dict, Optional
+
+from .ax25 import ADDRESS_LEN, _cached_call, address_end
+from .codec import strip_callsign
+from .filters import _kind_table
+
+DEDUP_DROP = 'drop'
+DEDUP_TAG = 'tag'
+# Monitored kinds checked for repeats: UI/I monitor text and raw frames
+DEDUP_KINDS = b'UIK'
+
+_RAW = ord('K')
+_MONITOR_TEXT = frozenset(b'UIS')
+# "<UI pid=F0 Len=5 >" and the end of the monitor header line; the Via path and [time] before it vary per copy
+_FRAME_INFO = re.compile(rb'(<[^>]*>)[^\r]*\r')
+_BYTES = [bytes([n]) for n in range(256)]
+_USER = slice(32, 36)
+
+
+def frame_hash(decoded: tuple) -> int:
+    """CRC-32 identifying a decoded frame's content independently of the digipeater path."""
+    kind, port, raw_from, raw_to, _user, payload, _offset = decoded
+    # The port is part of the identity: the same frame heard on two radio ports arrived over
+    # different channels, and per-port monitoring should see it on each
+    crc = zlib.crc32(_BYTES[port & 0xFF])
+    if kind == _RAW:
+        end = address_end(payload)
+        if end > 0:
+            # Destination and source addresses (the source's end-of-address bit depends on the path),
+            # then control, PID and info
+            src_ssid = 2 * ADDRESS_LEN
+            crc = zlib.crc32(payload[1:src_ssid], crc)
+            crc = zlib.crc32(_BYTES[payload[src_ssid] & 0xFE], crc)
+            return zlib.crc32(payload[end:], crc)
+        return zlib.crc32(payload, crc)
+    crc = zlib.crc32(raw_to, zlib.crc32(raw_from, crc))
+    if kind in _MONITOR_TEXT:
+        m = _FRAME_INFO.search(payload)
+        if m is not None:
+            crc = zlib.crc32(payload[m.start(1):m.end(1)], crc)
+            return zlib.crc32(payload[m.end():], crc)
+    return zlib.crc32(payload, crc)
+
+
+class DuplicateFilter:
+    """
+    Receive-path repeat suppression installed with ``attach(client)``.
+
+    A monitored frame whose content was seen less than ``window`` seconds
+    ago is a repeat. With ``mode='drop'`` repeats skip dispatch entirely;
+    with ``mode='tag'`` they are delivered with the repeat number (1 for the
+    first repeat) in the reserved ``user`` header field, ``AGWPEFrame.user``.
+    ``slots`` (a power of two) bounds memory: a slot reused within the
+    window just lets that frame's later copies through. Taps such as
+    capture writers and the heard index still see every copy.
+    """
+    def __init__(self, window: float = 30.0, slots: int = 4096, mode: str = DEDUP_DROP,
+                 kinds=DEDUP_KINDS, max_sources: int = 1024):
+        if mode not in (DEDUP_DROP, DEDUP_TAG):
+            raise ValueError(f"mode must be {DEDUP_DROP!r} or {DEDUP_TAG!r}, got {mode!r}")
+        if slots <= 0 or slots & (slots - 1):
+            raise ValueError(f"slots must be a power of two, got {slots}")
+        self.window = window
+        self.mode = mode
+        self.max_sources = max_sources
+        self._kinds = _kind_table(kinds)
+        self._mask = slots - 1
+        self._hashes = array.array('I', bytes(4 * slots))
+        self._times = array.array('d', [float('-inf')]) * slots
+        self._repeats = array.array('I', bytes(4 * slots))
+        # Repeats per source callsign, least recently repeated first
+        self._sources: 'collections.OrderedDict[str, int]' = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.duplicates = 0
+
+    def attach(self, client):
+        """Screen every monitored frame ``client`` receives from now on."""
+        client.duplicate_filter = self
+
+    def detach(self, client):
+        if client.duplicate_filter is self:
+            client.duplicate_filter = None
+
+    def repeat(self, decoded: tuple, now: Optional[float] = None) -> int:
+        """
+        Record one decoded frame; returns 0 for a first copy, else its repeat
+        number. ``now`` is the frame's receive time in seconds (default
+        ``time.monotonic()``); replays pass the recorded time.
+        """
+        h = frame_hash(decoded)
+        if now is None:
+            now = time.monotonic()
+        i = h & self._mask
+        with self._lock:
+            self.checked += 1
+            if self._hashes[i] == h and now - self._times[i] < self.window:
+                # The window runs from the first copy so a steady stream of repeats can't keep it open
+                n = self._repeats[i] = self._repeats[i] + 1
+                self.duplicates += 1
+                self._count_source(decoded)
+                return n
+            self._hashes[i] = h
+            self._times[i] = now
+            self._repeats[i] = 0
+            return 0
+
+    def screen(self, decoded: tuple, raw, now: Optional[float] = None):
+        """Dispatcher hook: the raw frame to deliver (tagged if a repeat), or None to drop it."""
+        if not self._kinds[decoded[0]]:
+            return raw
+        n = self.repeat(decoded, now)
+        if not n:
+            return raw
+        if self.mode == DEDUP_DROP:
+            return None
+        tagged = bytearray(raw)
+        tagged[_USER] = n.to_bytes(4, 'little')
+        return tagged
+
+    def _count_source(self, decoded: tuple):
+        """Caller holds the lock."""
+        if decoded[0] == _RAW:
+            payload = decoded[5]
+            source = _cached_call(bytes(payload[1 + ADDRESS_LEN:1 + 2 * ADDRESS_LEN])) if len(payload) > 2 * ADDRESS_LEN else ''
+        else:
+            source = strip_callsign(decoded[2]).decode('ascii', errors='ignore')
+        sources = self._sources
+        sources[source] = sources.get(source, 0) + 1
+        sources.move_to_end(source)
+        if len(sources) > self.max_sources:
+            sources.popitem(last=False)
+
+    def source_counts(self) -> Dict[str, int]:
+        """Repeats seen per source callsign (at most ``max_sources`` most recent sources)."""
+        with self._lock:
+            return dict(self._sources)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"checked": self.checked, "duplicates": self.duplicates, "sources": dict(self._sources)}
+
+    def clear(self):
+        with self._lock:
+            self._hashes = array.array('I', bytes(4 * len(self._hashes)))
+            self._times = array.array('d', [float('-inf')]) * len(self._times)
+            self._repeats = array.array('I', bytes(4 * len(self._repeats)))
+            self._sources.clear()
+            self.checked = 0
+            self.duplicates = 0
@@ -0,0 +1,152 @@
+# pyagw3/dispatch.py
+
+# PyAGW3/dispatch.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# Callback dispatch executors
+# Decide where user callbacks run so a slow handler cannot stall socket reads:
+# inline on the receive thread, on an ordered bounded thread pool, or on an
+# asyncio event loop. Bounded queues use a block or drop overflow policy.
+
+import asyncio
+import logging
+import queue
+import threading
+from typing import Callable, List
+
+logger = logging.getLogger('AGWPE')
+
+OVERFLOW_BLOCK = 'block'
+OVERFLOW_DROP = 'drop'
+
+
+class DispatchExecutor:
+    """Base class: runs ``fn(*args)`` for a frame belonging to ordering ``key``."""
+    def __init__(self, queue_depth: int = 0, overflow: str = OVERFLOW_BLOCK):
+        if overflow not in (OVERFLOW_BLOCK, OVERFLOW_DROP):
+            raise ValueError(f"Unknown overflow policy: {overflow!r}")
+        self.queue_depth = queue_depth
+        self.overflow = overflow
+        self.dropped = 0
+        self._count_lock = threading.Lock()
+
+    def submit(self, key, fn: Callable, *args) -> bool:
+        """Schedule ``fn(*args)``. Returns False if the call was dropped."""
+        raise NotImplementedError
+
+    @property
+    def pending(self) -> int:
+        """Callbacks queued but not yet run."""
+        return 0
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and release worker resources."""
+
+    def _drop(self) -> bool:
+        with self._count_lock:
+            self.dropped += 1
+        return False
+
+
+class InlineExecutor(DispatchExecutor):
+    """Run callbacks directly on the receive thread (the default)."""
+    def submit(self, key, fn: Callable, *args) -> bool:
+        fn(*args)
+        return True
+
+
+class OrderedThreadPoolExecutor(DispatchExecutor):
+    """
+    Run callbacks on a fixed pool of worker threads.
+    Each ordering key is pinned to one worker, so callbacks for the same key
+    (e.g. one AX.25 link) run in arrival order while different keys run in
+    parallel. Each worker has a queue of ``queue_depth`` entries.
+    """
+    def __init__(self, workers: int = 4, queue_depth: int = 1024, overflow: str = OVERFLOW_BLOCK):
+        super().__init__(queue_depth, overflow)
+        self._queues: List[queue.Queue] = [queue.Queue(queue_depth) for _ in range(max(workers, 1))]
+        self._threads = []
+        for i, q in enumerate(self._queues):
+            t = threading.Thread(target=self._worker, args=(q,), name=f"agwpe-dispatch-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, key, fn: Callable, *args) -> bool:
+        q = self._queues[hash(key) % len(self._queues)]
+        if self.overflow == OVERFLOW_BLOCK:
+            q.put((fn, args))
+            return True
+        try:
+            q.put_nowait((fn, args))
+            return True
+        except queue.Full:
+            return self._drop()
+
+    @property
+    def pending(self) -> int:
+        return sum(q.qsize() for q in self._queues)
+
+    def _worker(self, q: queue.Queue):
+        while True:
+            item = q.get()
+            if item is None:
+                break
+            fn, args = item
+            try:
+                fn(*args)
+            except Exception as e:
+                logger.error(f"[AGWPE] Callback error: {e}")
+
+    def shutdown(self, wait: bool = True):
+        for q in self._queues:
+            q.put(None)
+        if wait:
+            for t in self._threads:
+                t.join()
+
+
+class AsyncioExecutor(DispatchExecutor):
+    """
+    Hand callbacks to an asyncio event loop with ``call_soon_threadsafe``.
+    Coroutine callbacks are scheduled as tasks. At most ``queue_depth``
+    callbacks may be waiting on the loop; the block policy only applies when
+    submitting from another thread (from the loop itself it drops instead).
+    """
+    def __init__(self, loop: asyncio.AbstractEventLoop, queue_depth: int = 1024, overflow: str = OVERFLOW_BLOCK):
+        super().__init__(queue_depth, overflow)
+        self._loop = loop
+        self._slots = threading.BoundedSemaphore(queue_depth)
+        self._pending = 0
+
+    def _on_loop(self) -> bool:
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    def submit(self, key, fn: Callable, *args) -> bool:
+        block = self.overflow == OVERFLOW_BLOCK and not self._on_loop()
+        if not self._slots.acquire(block):
+            return self._drop()
+        with self._count_lock:
+            self._pending += 1
+        self._loop.call_soon_threadsafe(self._run, fn, args)
+        return True
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _run(self, fn: Callable, args: tuple):
+        with self._count_lock:
+            self._pending -= 1
+        try:
+            result = fn(*args)
+            if asyncio.iscoroutine(result):
+                self._loop.create_task(result)
+        except Exception as e:
+            logger.error(f"[AGWPE] Callback error: {e}")
+        finally:
+            self._slots.release()
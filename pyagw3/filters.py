@@ -0,0 +1,106 @@
+# pyagw3/filters.py
+
+# PyAGW3/filters.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# Pre-parse subscription filter
+# Evaluated against the raw 36-byte header while frames are still in the
+# receive buffer, so frames nobody subscribed to are skipped before any
+# header tuple, AGWPEFrame or payload copy is created
+
+import re
+import struct
+from typing import Iterable, Optional
+
+# Data kinds carrying monitored traffic; other kinds (query replies, connected data) always pass
+MONITOR_KINDS = b'DKUIST'
+
+_U32 = struct.Struct('<I')
+
+
+def _kind_table(kinds) -> bytearray:
+    table = bytearray(256)
+    for kind in kinds:
+        table[kind if isinstance(kind, int) else ord(kind)] = 1
+    return table
+
+
+def _compile_callsigns(patterns: Iterable[str]):
+    """
+    Compile callsign patterns into one regex that fully matches a 10-byte header field.
+    '*' matches any run of callsign characters, '?' exactly one. A pattern
+    without '-SSID' matches every SSID; 'CALL-7' or 'CALL-*' constrain it.
+    """
+    alternatives = []
+    for pattern in patterns:
+        base, _, ssid = pattern.upper().partition('-')
+        rx = re.escape(base).replace(r'\*', '[^-\\s\\x00]*').replace(r'\?', '[^-\\s\\x00]')
+        if not ssid:
+            rx += r'(?:-(\d{1,2}))?'
+        elif ssid == '*':
+            rx += r'-(\d{1,2})'
+        else:
+            rx += '-(' + re.escape(ssid) + ')'
+        alternatives.append(rx)
+    return re.compile(('(?:' + '|'.join(alternatives) + ')[ \\x00]*').encode('ascii'), re.IGNORECASE)
+
+
+class FrameFilter:
+    """
+    Declarative subscription for monitored frames.
+
+    ``ports``      radio ports to accept (None = all)
+    ``kinds``      monitor data kinds to accept, e.g. b'UK' (None = all)
+    ``callsigns``  callsign patterns such as 'N0CALL', 'KE4*', 'W?XYZ-*' (None = all)
+    ``ssids``      SSIDs to accept for matched callsigns, e.g. range(0, 8) (None = all)
+    ``fields``     which header callsigns are tested: 'from', 'to' or 'either'
+
+    Only frames whose kind is in ``scope`` (monitored traffic by default) are
+    filtered; query replies and connected-mode frames always pass. The
+    ``hits``/``misses`` counters record accepted and skipped frames in scope.
+    """
+    def __init__(self, ports: Optional[Iterable[int]] = None, kinds=None, callsigns: Optional[Iterable[str]] = None,
+                 ssids: Optional[Iterable[int]] = None, fields: str = 'either', scope=MONITOR_KINDS):
+        if fields not in ('from', 'to', 'either'):
+            raise ValueError(f"fields must be 'from', 'to' or 'either', got {fields!r}")
+        self.ports = frozenset(ports) if ports is not None else None
+        self._scope = _kind_table(scope)
+        self._kinds = _kind_table(kinds) if kinds is not None else None
+        self._calls = _compile_callsigns(callsigns) if callsigns else None
+        self.ssids = frozenset(ssids) if ssids is not None else None
+        self._offsets = {'from': (8,), 'to': (18,), 'either': (8, 18)}[fields]
+        self.hits = 0
+        self.misses = 0
+
+    def _call_matches(self, buf, pos: int) -> bool:
+        fullmatch = self._calls.fullmatch
+        for field in self._offsets:
+            start = pos + field
+            m = fullmatch(buf, start, start + 10)
+            if m is None:
+                continue
+            if self.ssids is None:
+                return True
+            ssid = m.group(m.lastindex) if m.lastindex else None
+            if (int(ssid) if ssid else 0) in self.ssids:
+                return True
+        return False
+
+    def __call__(self, buf, pos: int = 0) -> bool:
+        """Return True if the frame whose header starts at ``buf[pos]`` should be decoded."""
+        kind = buf[pos]
+        if not self._scope[kind]:
+            return True
+        if ((self._kinds is not None and not self._kinds[kind])
+                or (self.ports is not None and _U32.unpack_from(buf, pos + 4)[0] not in self.ports)
+                or (self._calls is not None and not self._call_matches(buf, pos))):
+            self.misses += 1
+            return False
+        self.hits += 1
+        return True
+
+    def reset_counters(self):
+        self.hits = 0
+        self.misses = 0
@@ -0,0 +1,112 @@
+# pyagw3/flow.py
+
+# PyAGW3/flow.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# Connected-mode flow control
+# Tracks the outstanding-frame counts reported by 'Y' (per port) and 'y'
+# (per callsign pair) replies, and splits outgoing streams into PACLEN-sized
+# chunks so send_stream() can keep the TNC queue below a high-water mark
+
+import asyncio
+import threading
+import time
+from typing import Dict, Iterator, Optional
+
+# Default AX.25 I-frame payload size
+DEFAULT_PACLEN = 256
+# Default number of frames allowed to wait in the TNC before send_stream() polls and waits
+DEFAULT_HIGH_WATER = 4
+
+
+def link_key(port: int, call_from: bytes, call_to: bytes) -> tuple:
+    """Tracker key for a 'y' count: (port, stripped call_from, stripped call_to)."""
+    return (port, call_from.strip(b' \0').upper(), call_to.strip(b' \0').upper())
+
+
+def iter_chunks(source, size: int = DEFAULT_PACLEN) -> Iterator[bytes]:
+    """
+    Yield ``source`` as chunks of at most ``size`` bytes.
+    ``source`` is a bytes-like object, a binary file (anything with ``read``)
+    or an iterable of bytes-like pieces; small pieces are coalesced.
+    """
+    if size <= 0:
+        raise ValueError("Chunk size must be positive")
+    if hasattr(source, 'read'):
+        while True:
+            chunk = source.read(size)
+            if not chunk:
+                return
+            yield bytes(chunk)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        view = memoryview(source).cast('B')
+        for pos in range(0, len(view), size):
+            yield bytes(view[pos:pos + size])
+        return
+    pending = bytearray()
+    for piece in source:
+        pending += piece
+        while len(pending) >= size:
+            yield bytes(pending[:size])
+            del pending[:size]
+    if pending:
+        yield bytes(pending)
+
+
+class OutstandingTracker:
+    """
+    Latest outstanding-frame count per key (``port`` for 'Y' replies,
+    ``link_key(...)`` for 'y' replies), with waiters woken on each update.
+    Updated from the receive path; ``wait`` is for threads, ``wait_async``
+    for coroutines running on the client's event loop.
+    """
+    def __init__(self):
+        self._counts: Dict[object, int] = {}
+        self._seq: Dict[object, int] = {}
+        self._cond = threading.Condition()
+        self._events: Dict[object, asyncio.Event] = {}
+
+    def update(self, key, count: int):
+        with self._cond:
+            self._counts[key] = count
+            self._seq[key] = self._seq.get(key, 0) + 1
+            self._cond.notify_all()
+        event = self._events.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def sent(self, key, frames: int = 1):
+        """Count frames handed to the TNC since the last report, until the next reply replaces the estimate."""
+        with self._cond:
+            self._counts[key] = self._counts.get(key, 0) + frames
+
+    def get(self, key) -> Optional[int]:
+        """Last reported count for ``key`` plus frames sent since, or None if nothing is known."""
+        return self._counts.get(key)
+
+    def seq(self, key) -> int:
+        """Number of updates received for ``key``; pass to ``wait`` to wait for the next one."""
+        return self._seq.get(key, 0)
+
+    def wait(self, key, seq: int, timeout: Optional[float] = None) -> Optional[int]:
+        """Block until ``key`` has been updated past ``seq``. Returns the count, or None on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._seq.get(key, 0) <= seq:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+            return self._counts[key]
+
+    async def wait_async(self, key, seq: int, timeout: Optional[float] = None) -> Optional[int]:
+        """Coroutine version of ``wait``."""
+        while self._seq.get(key, 0) <= seq:
+            event = self._events.setdefault(key, asyncio.Event())
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        return self._counts[key]
@@ -0,0 +1,282 @@
+# pyagw3/heard.py
+
+# PyAGW3/heard.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# Passive heard-station index
+# Updated on the receive thread from monitored frames the client already
+# gets (and from 'H' replies), so heard-list queries need no server round
+# trip. Per-port recency-ordered dicts answer "heard on port N in the last T
+# seconds" in O(result); per-station and per-port activity is kept in
+# fixed-size array-backed time buckets.
+
+import array
+import collections
+import re
+import struct
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .ax25 import ADDRESS_LEN, _cached_call, address_end
+from .codec import strip_callsign
+from .filters import _kind_table
+
+# Monitored kinds that identify a transmitting station
+HEARD_KINDS = b'DKUIS'
+# One 'H' reply entry: callsign, last heard (epoch seconds)
+HEARD_ENTRY = struct.Struct('<10sI')
+# Distinct digipeater paths remembered per station
+MAX_PATHS = 8
+
+_RAW = ord('K')
+_MONITOR_TEXT = frozenset(b'UIS')
+_VIA = re.compile(rb' Via ([^ <\r]+)')
+
+
+class HeardEntry(NamedTuple):
+    """Snapshot of one station's record."""
+    callsign: str
+    first_heard: float
+    last_heard: float
+    frames: int
+    bytes: int
+    ports: Dict[int, float]      # AGW port -> last heard there
+    paths: Dict[str, int]        # digipeater path ('' if direct) -> frames
+
+
+class _Buckets:
+    """Frame counts per time bucket in a ring of ``n`` slots; stale slots are reset lazily."""
+    __slots__ = ('counts', 'ids')
+
+    def __init__(self, n: int):
+        self.counts = array.array('I', bytes(4 * n))
+        self.ids = array.array('q', [-1]) * n
+
+    def add(self, bucket: int, frames: int = 1):
+        i = bucket % len(self.ids)
+        if self.ids[i] != bucket:
+            self.ids[i] = bucket
+            self.counts[i] = 0
+        self.counts[i] += frames
+
+    def series(self, current: int) -> List[int]:
+        n = len(self.ids)
+        result = []
+        for bucket in range(current - n + 1, current + 1):
+            i = bucket % n
+            result.append(self.counts[i] if self.ids[i] == bucket else 0)
+        return result
+
+
+class _Station:
+    __slots__ = ('callsign', 'first_heard', 'last_heard', 'frames', 'bytes', 'ports', 'paths', 'buckets')
+
+    def __init__(self, callsign: str, now: float, buckets: int):
+        self.callsign = callsign
+        self.first_heard = now
+        self.last_heard = now
+        self.frames = 0
+        self.bytes = 0
+        self.ports: Dict[int, float] = {}
+        self.paths: Dict[str, int] = {}
+        self.buckets = _Buckets(buckets)
+
+    def entry(self) -> HeardEntry:
+        return HeardEntry(self.callsign, self.first_heard, self.last_heard, self.frames, self.bytes,
+                          dict(self.ports), dict(self.paths))
+
+
+class HeardIndex:
+    """
+    Heard-station index fed by ``attach(client)``. Tracks first/last heard,
+    frame and byte counts, ports and digipeater paths per callsign, plus
+    frames per ``bucket_seconds`` over the last ``buckets`` buckets. The
+    least recently heard station is evicted beyond ``max_stations``.
+    """
+    def __init__(self, bucket_seconds: float = 60.0, buckets: int = 60, max_stations: int = 10000,
+                 kinds=HEARD_KINDS):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = buckets
+        self.max_stations = max_stations
+        self._kinds = _kind_table(kinds)
+        self._stations: Dict[str, _Station] = {}
+        # callsign -> ordering time, most recently heard last (ordering times never decrease along the dict)
+        self._recent: 'collections.OrderedDict[str, float]' = collections.OrderedDict()
+        self._by_port: Dict[int, 'collections.OrderedDict[str, float]'] = {}  # same, per port
+        self._port_buckets: Dict[int, _Buckets] = {}
+        self._lock = threading.Lock()
+        self._clients = []
+
+    def __len__(self) -> int:
+        return len(self._stations)
+
+    def attach(self, client):
+        """Index every monitored frame and 'H' reply ``client`` receives from now on."""
+        client.add_tap(self)
+        client.heard_index = self
+        self._clients.append(client)
+
+    def detach(self, client):
+        client.remove_tap(self)
+        if client.heard_index is self:
+            client.heard_index = None
+        self._clients.remove(client)
+
+    def clear(self):
+        with self._lock:
+            self._stations.clear()
+            self._recent.clear()
+            self._by_port.clear()
+            self._port_buckets.clear()
+
+    # Updates
+
+    def __call__(self, buffer, frames: list):
+        """Receive-path tap: index the monitored frames of one read."""
+        now = None
+        kinds = self._kinds
+        for kind, port, raw_from, _raw_to, _user, payload, _offset in frames:
+            if not kinds[kind]:
+                continue
+            if now is None:
+                now = time.time()
+            if kind == _RAW:
+                call, path = _raw_source(payload)
+            else:
+                call = strip_callsign(raw_from).decode('ascii', errors='ignore')
+                path = _text_path(payload) if kind in _MONITOR_TEXT else ''
+            if call:
+                self.record(port, call, len(payload), path, now)
+
+    def record(self, port: int, callsign: str, size: int = 0, path: str = '', now: Optional[float] = None):
+        """Count one frame from ``callsign`` heard on ``port`` via ``path``."""
+        if now is None:
+            now = time.time()
+        with self._lock:
+            station = self._touch(port, callsign, now)
+            station.frames += 1
+            station.bytes += size
+            paths = station.paths
+            if path in paths or len(paths) < MAX_PATHS:
+                paths[path] = paths.get(path, 0) + 1
+            else:
+                # Replace the least used path
+                del paths[min(paths, key=paths.get)]
+                paths[path] = 1
+            bucket = int(now // self.bucket_seconds)
+            station.buckets.add(bucket)
+            port_buckets = self._port_buckets.get(port)
+            if port_buckets is None:
+                port_buckets = self._port_buckets[port] = _Buckets(self.buckets)
+            port_buckets.add(bucket)
+
+    def record_heard_list(self, port: int, entries: List[Tuple[str, int]]):
+        """Merge (callsign, last heard) pairs from an 'H' reply; counts are unchanged."""
+        with self._lock:
+            for callsign, last_heard in entries:
+                station = self._stations.get(callsign)
+                if station is None or last_heard > station.last_heard:
+                    self._touch(port, callsign, float(last_heard))
+
+    def _touch(self, port: int, callsign: str, now: float) -> _Station:
+        station = self._stations.get(callsign)
+        if station is None:
+            if len(self._stations) >= self.max_stations:
+                self._evict()
+            station = self._stations[callsign] = _Station(callsign, now, self.buckets)
+        elif now < station.first_heard:
+            station.first_heard = now
+        if now >= station.last_heard:
+            station.last_heard = now
+            _place(self._recent, callsign, now)
+        if now >= station.ports.get(port, 0.0):
+            station.ports[port] = now
+            recent = self._by_port.get(port)
+            if recent is None:
+                recent = self._by_port[port] = collections.OrderedDict()
+            _place(recent, callsign, now)
+        return station
+
+    def _evict(self):
+        callsign, _ = self._recent.popitem(last=False)
+        station = self._stations.pop(callsign)
+        for port in station.ports:
+            self._by_port[port].pop(callsign, None)
+
+    # Queries
+
+    def heard(self, port: Optional[int] = None, within: Optional[float] = None,
+              now: Optional[float] = None) -> List[HeardEntry]:
+        """Stations heard (on ``port``, in the last ``within`` seconds), most recent first."""
+        cutoff = None if within is None else (time.time() if now is None else now) - within
+        result = []
+        with self._lock:
+            recent = self._recent if port is None else self._by_port.get(port, {})
+            for callsign, order in reversed(recent.items()):
+                if cutoff is not None and order < cutoff:
+                    break
+                station = self._stations[callsign]
+                if cutoff is None or (station.last_heard if port is None else station.ports[port]) >= cutoff:
+                    result.append(station.entry())
+        return result
+
+    def station(self, callsign: str) -> Optional[HeardEntry]:
+        with self._lock:
+            station = self._stations.get(callsign.upper())
+            return station.entry() if station is not None else None
+
+    def activity(self, callsign: Optional[str] = None, port: Optional[int] = None,
+                 now: Optional[float] = None) -> List[Tuple[float, int]]:
+        """
+        (bucket start time, frames) for the last ``buckets`` buckets, oldest
+        first, for one station or one port.
+        """
+        current = int((time.time() if now is None else now) // self.bucket_seconds)
+        with self._lock:
+            if callsign is not None:
+                station = self._stations.get(callsign.upper())
+                counts = station.buckets.series(current) if station else [0] * self.buckets
+            else:
+                buckets = self._port_buckets.get(port)
+                counts = buckets.series(current) if buckets else [0] * self.buckets
+        first = current - self.buckets + 1
+        return [((first + i) * self.bucket_seconds, count) for i, count in enumerate(counts)]
+
+
+def _place(recent: 'collections.OrderedDict[str, float]', callsign: str, heard_at: float):
+    """Move ``callsign`` to the recent end; an out-of-order time (from an 'H' reply) is clamped up to keep the order."""
+    if recent:
+        newest = recent[next(reversed(recent))]
+        if newest > heard_at:
+            heard_at = newest
+    recent[callsign] = heard_at
+    recent.move_to_end(callsign)
+
+
+def _raw_source(payload) -> Tuple[str, str]:
+    """(source, digipeater path) of a 'K' payload."""
+    end = address_end(payload)
+    if end < 0:
+        return '', ''
+    data = bytes(payload[:end])
+    source = _cached_call(data[1 + ADDRESS_LEN:1 + 2 * ADDRESS_LEN])
+    path = ','.join(_cached_call(data[pos:pos + ADDRESS_LEN]) + ('*' if data[pos + 6] & 0x80 else '')
+                    for pos in range(1 + 2 * ADDRESS_LEN, end, ADDRESS_LEN))
+    return source, path
+
+
+def _text_path(payload) -> str:
+    """Digipeater path from the 'Via ...' part of an AGWPE monitor line."""
+    m = _VIA.search(bytes(payload[:128]))
+    return m.group(1).decode('ascii', errors='ignore') if m else ''
+
+
+def parse_heard_list(payload) -> List[Tuple[str, int]]:
+    """(callsign, last heard) pairs of an 'H' reply, empty slots skipped."""
+    view = memoryview(payload)
+    view = view[:len(view) - len(view) % HEARD_ENTRY.size]
+    return [(call, ts) for call, ts in ((strip_callsign(raw).decode('ascii', errors='ignore'), ts)
+                                        for raw, ts in HEARD_ENTRY.iter_unpack(view)) if call]
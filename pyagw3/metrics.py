@@ -0,0 +1,190 @@
+# pyagw3/metrics.py
+
+# PyAGW3/metrics.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# Client metrics
+# Per-kind and per-port frame/byte counters, error and reconnect counters,
+# fixed-bucket latency histograms, stats() snapshots and Prometheus text export
+
+import bisect
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Histogram bucket upper bounds in seconds (10 us .. 1 s)
+LATENCY_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+
+def _kind_label(kind: int) -> str:
+    """Printable label for a DataKind byte ('D', 'K', ... or '0x00')."""
+    char = chr(kind)
+    return char if char.isalnum() and kind < 128 else f"0x{kind:02x}"
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``observe`` is a bisect and two increments."""
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        return {"buckets": list(self.buckets), "counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+
+class ClientMetrics:
+    """
+    Counters updated from the receive and send paths (the send side is
+    updated under the client's send lock). Per-kind counters are 256-entry lists indexed by the DataKind byte;
+    per-port counters are dicts keyed by radio port.
+    """
+    def __init__(self):
+        self.frames_in = [0] * 256
+        self.bytes_in = [0] * 256
+        self.frames_out = [0] * 256
+        self.bytes_out = [0] * 256
+        self.port_frames_in: Dict[int, int] = {}
+        self.port_bytes_in: Dict[int, int] = {}
+        self.port_frames_out: Dict[int, int] = {}
+        self.port_bytes_out: Dict[int, int] = {}
+        self.decode_errors = 0
+        self.send_errors = 0
+        self.connects = 0
+        self.reconnects = 0
+        self.connect_failures = 0
+        self.dispatch_latency = Histogram()
+        self.send_lock_wait = Histogram()
+
+    def record_in(self, kind: int, port: int, nbytes: int):
+        self.frames_in[kind] += 1
+        self.bytes_in[kind] += nbytes
+        self.port_frames_in[port] = self.port_frames_in.get(port, 0) + 1
+        self.port_bytes_in[port] = self.port_bytes_in.get(port, 0) + nbytes
+
+    def record_out(self, kind: int, port: int, nbytes: int):
+        self.frames_out[kind] += 1
+        self.bytes_out[kind] += nbytes
+        self.port_frames_out[port] = self.port_frames_out.get(port, 0) + 1
+        self.port_bytes_out[port] = self.port_bytes_out.get(port, 0) + nbytes
+
+    def record_connect(self):
+        if self.connects:
+            self.reconnects += 1
+        self.connects += 1
+
+    @staticmethod
+    def _by_kind(values: List[int]) -> Dict[str, int]:
+        return {_kind_label(kind): n for kind, n in enumerate(values) if n}
+
+    def snapshot(self) -> dict:
+        """Point-in-time copy of every counter as plain dicts/ints."""
+        return {
+            "frames_in": self._by_kind(self.frames_in),
+            "bytes_in": self._by_kind(self.bytes_in),
+            "frames_out": self._by_kind(self.frames_out),
+            "bytes_out": self._by_kind(self.bytes_out),
+            "port_frames_in": dict(self.port_frames_in),
+            "port_bytes_in": dict(self.port_bytes_in),
+            "port_frames_out": dict(self.port_frames_out),
+            "port_bytes_out": dict(self.port_bytes_out),
+            "decode_errors": self.decode_errors,
+            "send_errors": self.send_errors,
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "connect_failures": self.connect_failures,
+            "dispatch_latency": self.dispatch_latency.snapshot(),
+            "send_lock_wait": self.send_lock_wait.snapshot(),
+        }
+
+
+def _labels(base: Dict[str, str], **extra) -> str:
+    items = dict(base, **extra)
+    if not items:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in sorted(items.items())) + '}'
+
+
+def prometheus_text(stats: dict, prefix: str = "pyagw3", labels: Optional[Dict[str, str]] = None) -> str:
+    """Render a ``client.stats()`` snapshot in the Prometheus text exposition format."""
+    return render_prometheus([(labels or {}, stats)], prefix)
+
+
+def render_prometheus(sources: Iterable[Tuple[Dict[str, str], dict]], prefix: str = "pyagw3") -> str:
+    """Render several (labels, stats) snapshots as one exposition, grouping samples by metric family."""
+    families: Dict[str, list] = {}
+
+    def add(name: str, kind: str, help_text: str, labels: Dict[str, str], samples: Iterable[tuple]):
+        family = families.setdefault(name, [kind, help_text, []])
+        for suffix, extra, value in samples:
+            family[2].append(f"{prefix}_{name}{suffix}{_labels(labels, **extra)} {value}")
+
+    for labels, stats in sources:
+        for direction, verb in (("in", "received"), ("out", "sent")):
+            add(f"frames_{verb}_total", "counter", f"Frames {verb} by data kind", labels,
+                [("", {"kind": k}, v) for k, v in stats[f"frames_{direction}"].items()])
+            add(f"bytes_{verb}_total", "counter", f"Frame bytes {verb} by data kind (header included)", labels,
+                [("", {"kind": k}, v) for k, v in stats[f"bytes_{direction}"].items()])
+            add(f"port_frames_{verb}_total", "counter", f"Frames {verb} by radio port", labels,
+                [("", {"port": str(p)}, v) for p, v in stats[f"port_frames_{direction}"].items()])
+            add(f"port_bytes_{verb}_total", "counter", f"Frame bytes {verb} by radio port", labels,
+                [("", {"port": str(p)}, v) for p, v in stats[f"port_bytes_{direction}"].items()])
+        for name in ("decode_errors", "send_errors", "connects", "reconnects", "connect_failures",
+                     "dispatch_dropped", "filter_hits", "filter_misses"):
+            if name in stats:
+                add(f"{name}_total", "counter", name.replace('_', ' ').capitalize(), labels, [("", {}, stats[name])])
+        for name, help_text in (("dispatch_latency", "Time spent dispatching one received frame"),
+                                ("send_lock_wait", "Time spent waiting for the send lock")):
+            hist = stats[name]
+            samples = []
+            cumulative = 0
+            for bound, count in zip(hist["buckets"], hist["counts"]):
+                cumulative += count
+                samples.append(("_bucket", {"le": repr(bound)}, cumulative))
+            samples.append(("_bucket", {"le": "+Inf"}, hist["count"]))
+            samples.append(("_sum", {}, hist["sum"]))
+            samples.append(("_count", {}, hist["count"]))
+            add(f"{name}_seconds", "histogram", help_text, labels, samples)
+        for name, value in sorted(stats.get("queues", {}).items()):
+            add(name, "gauge", name.replace('_', ' ').capitalize(), labels, [("", {}, value)])
+
+    lines = []
+    for name, (kind, help_text, samples) in families.items():
+        lines.append(f"# HELP {prefix}_{name} {help_text}")
+        lines.append(f"# TYPE {prefix}_{name} {kind}")
+        lines.extend(samples)
+    return '\n'.join(lines) + '\n'
+
+
+def start_prometheus_server(clients: Dict[str, object], port: int = 9477, host: str = "0.0.0.0"):
+    """
+    Serve ``/metrics`` for the given {name: client} mapping from a daemon thread.
+    Returns the HTTP server; call ``shutdown()`` on it to stop.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = render_prometheus([({"client": name}, c.stats()) for name, c in clients.items()]).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="agwpe-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,282 @@
+# pyagw3/pcap.py
+
+# PyAGW3/pcap.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# pcapng export and pcap/pcapng import of raw ('K') AX.25 frames
+# The writer is a receive-path tap (or takes CaptureReader records) and
+# streams Enhanced Packet Blocks straight to a buffered file, one interface
+# per AGW port, so Wireshark can dissect the channel. The reader walks pcap
+# or pcapng files block by block and yields 'K' AGWPEFrames for replay.
+# Both run in constant memory regardless of file size.
+
+import os
+import re
+import struct
+import threading
+import time
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, Tuple
+
+from .agwpe import AGWPEFrame
+from .ax25 import _cached_call, address_end
+from .codec import HEADER_LEN, encode_frame
+
+# Link-layer types: bare AX.25, and AX.25 behind a one-byte KISS header (the 'K' payload as-is)
+LINKTYPE_AX25 = 3
+LINKTYPE_AX25_KISS = 202
+
+_RAW = ord('K')
+_SHB_TYPE = 0x0A0D0D0A
+_IDB_TYPE = 1
+_SPB_TYPE = 3
+_EPB_TYPE = 6
+_BYTE_ORDER_MAGIC = 0x1A2B3C4D
+_OPT_IF_NAME = 2
+_OPT_IF_TSRESOL = 9
+_PCAP_MAGICS = {0xA1B2C3D4: 1000, 0xA1B23C4D: 1}  # ns per timestamp fraction unit
+_PORT_NAME = re.compile(rb'port (\d+)')
+
+_SHB = struct.Struct('<IIIHHq')
+_IDB = struct.Struct('<IIHHI')
+_EPB = struct.Struct('<IIIIIII')
+_TRAILER = struct.Struct('<I')
+
+
+def _option(code: int, value: bytes) -> bytes:
+    return struct.pack('<HH', code, len(value)) + value + b'\0' * (-len(value) % 4)
+
+
+class PcapngWriter:
+    """
+    Streams raw AX.25 frames to a pcapng file (a path or a binary file object).
+
+    Interface ``n`` of the file carries AGW port ``n``; timestamps have
+    nanosecond resolution. With ``LINKTYPE_AX25_KISS`` the 'K' payload is
+    written unchanged, with ``LINKTYPE_AX25`` its leading KISS byte is dropped.
+    Only raw frames are exported, so the client must have raw monitoring on
+    (``send_raw_enable()``).
+    """
+    def __init__(self, file, linktype: int = LINKTYPE_AX25_KISS, snaplen: int = 0):
+        if linktype not in (LINKTYPE_AX25, LINKTYPE_AX25_KISS):
+            raise ValueError(f"Unsupported link type {linktype}")
+        self.linktype = linktype
+        self.snaplen = snaplen
+        self.frames = 0
+        self._own = isinstance(file, (str, os.PathLike))
+        self._file: BinaryIO = open(file, 'wb') if self._own else file
+        self._skip = 1 if linktype == LINKTYPE_AX25 else 0
+        self._interfaces = 0
+        self._lock = threading.Lock()
+        self._clients = []
+        self._file.write(_SHB.pack(_SHB_TYPE, 28, _BYTE_ORDER_MAGIC, 1, 0, -1) + _TRAILER.pack(28))
+
+    def __enter__(self) -> 'PcapngWriter':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def attach(self, client):
+        """Export every raw frame ``client`` receives from now on."""
+        client.add_tap(self)
+        self._clients.append(client)
+
+    def detach(self, client):
+        client.remove_tap(self)
+        self._clients.remove(client)
+
+    def __call__(self, buffer, frames: list):
+        """Receive-path tap: export the 'K' frames of one read."""
+        now = None
+        for frame in frames:
+            if frame[0] == _RAW:
+                if now is None:
+                    now = time.time_ns()
+                self.write(frame[1], frame[5], now)
+
+    def _add_interfaces(self, port: int):
+        while self._interfaces <= port:
+            options = (_option(_OPT_IF_NAME, b'port %d' % self._interfaces) + _option(_OPT_IF_TSRESOL, b'\x09')
+                       + _option(0, b''))
+            length = _IDB.size + len(options) + 4
+            self._file.write(_IDB.pack(_IDB_TYPE, length, self.linktype, 0, self.snaplen) + options
+                             + _TRAILER.pack(length))
+            self._interfaces += 1
+
+    def write(self, port: int, data, timestamp_ns: Optional[int] = None):
+        """Write one 'K' payload (KISS byte + AX.25 frame) received on ``port``."""
+        if timestamp_ns is None:
+            timestamp_ns = time.time_ns()
+        packet = memoryview(data)[self._skip:]
+        captured = len(packet)
+        if self.snaplen and captured > self.snaplen:
+            captured = self.snaplen
+        pad = -captured % 4
+        length = _EPB.size + captured + pad + 4
+        with self._lock:
+            if port >= self._interfaces:
+                self._add_interfaces(port)
+            write = self._file.write
+            write(_EPB.pack(_EPB_TYPE, length, port, timestamp_ns >> 32, timestamp_ns & 0xFFFFFFFF,
+                            captured, len(packet)))
+            write(packet[:captured])
+            write(b'\0' * pad + _TRAILER.pack(length))
+            self.frames += 1
+
+    def write_records(self, records: Iterable[Tuple[int, bytes]]) -> int:
+        """Export the 'K' frames of (receive time ns, wire frame) records, e.g. ``CaptureReader.frames()``."""
+        count = 0
+        for ts, raw in records:
+            if raw[0] == _RAW:
+                self.write(int.from_bytes(raw[4:8], 'little'), memoryview(raw)[HEADER_LEN:], ts)
+                count += 1
+        return count
+
+    def flush(self):
+        with self._lock:
+            self._file.flush()
+
+    def close(self):
+        for client in list(self._clients):
+            self.detach(client)
+        with self._lock:
+            if self._own:
+                self._file.close()
+            else:
+                self._file.flush()
+
+
+def _kiss_payload(linktype: int, data: bytes, port: int) -> Optional[bytes]:
+    if linktype == LINKTYPE_AX25_KISS:
+        # Only KISS data frames (command nibble 0) carry AX.25
+        return data if data and data[0] & 0x0F == 0 else None
+    if linktype == LINKTYPE_AX25:
+        return bytes([(port & 0x0F) << 4]) + data
+    return None
+
+
+def _calls(data: bytes) -> Tuple[bytes, bytes]:
+    """(source, destination) of a 'K' payload's AX.25 address field, as 'CALL-SSID' bytes."""
+    end = address_end(data)
+    if end < 0:
+        return b'', b''
+    return _cached_call(data[8:15]).encode('ascii'), _cached_call(data[1:8]).encode('ascii')
+
+
+def _to_frame(port: int, data: bytes) -> AGWPEFrame:
+    call_from, call_to = _calls(data)
+    return AGWPEFrame(encode_frame(b'K', port, call_from, call_to, data))
+
+
+def read_pcap(file) -> Iterator[Tuple[int, AGWPEFrame]]:
+    """
+    Yield (timestamp ns, 'K' AGWPEFrame) for every AX.25 packet in a pcap or
+    pcapng file (a path or a binary file object); other link types are
+    skipped. In pcapng files the AGW port is the interface number, in
+    classic pcap files the KISS port nibble (0 for bare AX.25).
+    """
+    own = isinstance(file, (str, os.PathLike))
+    f = open(file, 'rb') if own else file
+    try:
+        head = f.read(4)
+        if len(head) < 4:
+            return
+        if int.from_bytes(head, 'little') == _SHB_TYPE:
+            yield from _read_pcapng(f, head)
+        else:
+            yield from _read_classic(f, head)
+    finally:
+        if own:
+            f.close()
+
+
+def _read_classic(f: BinaryIO, head: bytes) -> Iterator[Tuple[int, AGWPEFrame]]:
+    for order in '<>':
+        magic = struct.unpack(order + 'I', head)[0]
+        if magic in _PCAP_MAGICS:
+            break
+    else:
+        raise ValueError("Not a pcap or pcapng file")
+    frac_ns = _PCAP_MAGICS[magic]
+    rest = f.read(20)
+    linktype = struct.unpack(order + 'I', rest[16:20])[0] & 0x0FFFFFFF
+    record = struct.Struct(order + 'IIII')
+    while True:
+        header = f.read(record.size)
+        if len(header) < record.size:
+            return
+        seconds, fraction, captured, _ = record.unpack(header)
+        data = f.read(captured)
+        if len(data) < captured:
+            return
+        payload = _kiss_payload(linktype, data, 0)
+        if payload is not None:
+            yield seconds * 1_000_000_000 + fraction * frac_ns, _to_frame(payload[0] >> 4, payload)
+
+
+def _read_pcapng(f: BinaryIO, head: bytes) -> Iterator[Tuple[int, AGWPEFrame]]:
+    order = '<'
+    interfaces: Dict[int, Tuple[int, int, int]] = {}  # id -> (linktype, port, ns per tick or -divisor)
+    block_type = int.from_bytes(head, 'little')
+    while True:
+        raw_len = f.read(4)
+        if len(raw_len) < 4:
+            return
+        if block_type == _SHB_TYPE:
+            bom = f.read(4)
+            order = '<' if struct.unpack('<I', bom)[0] == _BYTE_ORDER_MAGIC else '>'
+            length = struct.unpack(order + 'I', raw_len)[0]
+            body = bom + f.read(length - 12)
+            interfaces = {}
+        else:
+            length = struct.unpack(order + 'I', raw_len)[0]
+            body = f.read(length - 8)
+        if len(body) < length - 8:
+            return
+        if block_type == _IDB_TYPE:
+            interfaces[len(interfaces)] = _parse_idb(order, body, len(interfaces))
+        elif block_type == _EPB_TYPE:
+            iface, high, low, captured, _ = struct.unpack_from(order + 'IIIII', body)
+            linktype, port, unit = interfaces.get(iface, (None, iface, 1000))
+            payload = _kiss_payload(linktype, body[20:20 + captured], port)
+            if payload is not None:
+                ticks = (high << 32) | low
+                yield (ticks * unit if unit > 0 else ticks * 1_000_000_000 // -unit), _to_frame(port, payload)
+        elif block_type == _SPB_TYPE and 0 in interfaces:
+            linktype, port, _ = interfaces[0]
+            original = struct.unpack_from(order + 'I', body)[0]
+            payload = _kiss_payload(linktype, body[4:4 + original], port)
+            if payload is not None:
+                yield 0, _to_frame(port, payload)
+        head = f.read(4)
+        if len(head) < 4:
+            return
+        block_type = struct.unpack(order + 'I', head)[0]
+
+
+def _parse_idb(order: str, body: bytes, iface: int) -> Tuple[int, int, int]:
+    """(linktype, AGW port, timestamp unit) of an Interface Description Block body."""
+    linktype = struct.unpack_from(order + 'H', body)[0]
+    port = iface
+    unit = 1000  # default resolution is microseconds
+    pos = 8
+    end = len(body) - 4
+    while pos + 4 <= end:
+        code, length = struct.unpack_from(order + 'HH', body, pos)
+        value = body[pos + 4:pos + 4 + length]
+        if code == 0:
+            break
+        if code == _OPT_IF_NAME:
+            m = _PORT_NAME.search(value)
+            if m:
+                port = int(m.group(1))
+        elif code == _OPT_IF_TSRESOL and value:
+            exponent = value[0] & 0x7F
+            if value[0] & 0x80:
+                unit = -(1 << exponent)
+            else:
+                unit = 10 ** (9 - exponent) if exponent <= 9 else -(10 ** exponent)
+        pos += 4 + length + (-length % 4)
+    return linktype, port, unit
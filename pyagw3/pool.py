@@ -0,0 +1,362 @@
+# pyagw3/pool.py
+
+# PyAGW3/pool.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# Multi-server connection pool
+# Several AGWPE back ends behind one object: logical radio ports map to
+# (server, AGW port) targets with failover, monitor frames from every server
+# are merged into one tagged stream, and all sockets share a single selector
+# reader thread plus one health/reconnect thread
+
+import itertools
+import logging
+import queue
+import selectors
+import socket
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from .agwpe import AGWPE_DEFAULT_PORT, AGWPEClient, AGWPEFrame
+from .ax25 import PID_NO_L3
+from .supervisor import backoff_delay
+
+logger = logging.getLogger('AGWPE')
+
+
+class PoolFrame(NamedTuple):
+    """A monitored frame tagged with where it came from."""
+    seq: int
+    time: float
+    server: str
+    port: Optional[int]
+    frame: AGWPEFrame
+
+
+class _Member:
+    """One back end in the pool."""
+    def __init__(self, name: str, client: AGWPEClient):
+        self.name = name
+        self.client = client
+        self.healthy = False
+        self.last_rx = 0.0
+        self.attempt = 0
+        self.next_retry = 0.0
+
+
+class AGWPEPool:
+    """
+    Manages one AGWPEClient per back end without a thread per server.
+
+    ``map_port(logical, [(server, agw_port), ...])`` routes a logical radio
+    port to the first healthy target in the list, so redundant servers give
+    failover. Connected-mode calls stay on the back end the link was opened
+    on. Frames from every server arrive on ``on_frame`` / ``frames()`` as
+    PoolFrame tuples, in arrival order. A server that stops answering the
+    periodic 'v' health check within ``health_timeout`` is marked down and
+    reconnected with exponential backoff; its session state is replayed.
+    """
+    def __init__(self, health_interval: float = 5.0, health_timeout: float = 15.0,
+                 reconnect_base_delay: float = 1.0, reconnect_max_delay: float = 60.0,
+                 frame_queue_size: int = 10000):
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.reconnect_base_delay = reconnect_base_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.on_frame: Optional[Callable[[PoolFrame], None]] = None
+        self.frames_dropped = 0
+        self._members: Dict[str, _Member] = {}
+        self._routes: Dict[int, List[Tuple[str, int]]] = {}
+        self._logical: Dict[Tuple[str, int], int] = {}
+        self._links: Dict[Tuple[int, str], Tuple[str, int]] = {}
+        # next() on a count is atomic, so frames delivered from several dispatch threads get distinct numbers
+        self._seq = itertools.count(1)
+        self._frame_queue_size = frame_queue_size
+        self._frames: Optional[queue.Queue] = None
+        self._lock = threading.Lock()
+        self._running = False
+        self._stop = threading.Event()
+        self._selector = selectors.DefaultSelector()
+        self._registered: Dict[_Member, socket.socket] = {}
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._threads: List[threading.Thread] = []
+
+    def __enter__(self) -> 'AGWPEPool':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Configuration
+
+    def add_server(self, name: str, host: str = "127.0.0.1", port: int = AGWPE_DEFAULT_PORT,
+                   callsign: str = "NOCALL", **client_kwargs) -> AGWPEClient:
+        """Add a back end. ``client_kwargs`` are passed to AGWPEClient."""
+        if name in self._members:
+            raise ValueError(f"Server {name!r} already in the pool")
+        client = AGWPEClient(host, port, callsign, **client_kwargs)
+        deliver = lambda frame, name=name: self._on_member_frame(name, frame)
+        client.on_frame = deliver
+        # Monitor kinds the client has no built-in handler for
+        for kind in b'UIST':
+            client.register_handler(kind, deliver)
+        self._members[name] = _Member(name, client)
+        if self._running:
+            self._wake()
+        return client
+
+    def map_port(self, logical: int, targets: Sequence[Tuple[str, int]]):
+        """Route logical radio port ``logical`` to the first healthy (server, AGW port) in ``targets``."""
+        targets = [(server, agw_port) for server, agw_port in targets]
+        for server, agw_port in targets:
+            if server not in self._members:
+                raise KeyError(f"Unknown server {server!r}")
+            self._logical[(server, agw_port)] = logical
+        self._routes[logical] = targets
+
+    def client(self, name: str) -> AGWPEClient:
+        return self._members[name].client
+
+    def healthy(self, name: str) -> bool:
+        return self._members[name].healthy
+
+    def route(self, logical: int) -> Tuple[AGWPEClient, int]:
+        """(client, AGW port) currently serving ``logical``."""
+        if logical not in self._routes:
+            raise KeyError(f"Logical port {logical} is not mapped")
+        for server, agw_port in self._routes[logical]:
+            member = self._members[server]
+            if member.healthy:
+                return member.client, agw_port
+        raise ConnectionError(f"No healthy server for logical port {logical}")
+
+    # Lifecycle
+
+    def start(self):
+        """Connect every server and start the shared reader and health threads."""
+        self._running = True
+        self._stop.clear()
+        now = time.monotonic()
+        for member in self._members.values():
+            self._try_connect(member, now)
+        for target, name in ((self._reader_loop, "agwpe-pool-reader"), (self._health_loop, "agwpe-pool-health")):
+            t = threading.Thread(target=target, name=name, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def close(self):
+        """Stop the pool threads and close every client."""
+        self._running = False
+        self._stop.set()
+        self._wake()
+        for t in self._threads:
+            t.join(timeout=2)
+        self._threads = []
+        for member in self._members.values():
+            member.healthy = False
+            member.client.close()
+        self._selector.close()
+        self._wake_r.close()
+        self._wake_w.close()
+        if self._frames is not None:
+            self._frames.put(None)
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b'\0')
+        except OSError:
+            pass
+
+    def _try_connect(self, member: _Member, now: float) -> bool:
+        client = member.client
+        if client.sock:
+            client.sock.close()
+        try:
+            client._open()
+        except Exception as e:
+            client.metrics.connect_failures += 1
+            member.attempt += 1
+            delay = backoff_delay(member.attempt, self.reconnect_base_delay, self.reconnect_max_delay)
+            member.next_retry = now + delay
+            logger.warning(f"[AGWPE] Pool server {member.name} unavailable: {e}. Retrying in {delay:.2f}s")
+            return False
+        member.attempt = 0
+        member.last_rx = time.monotonic()
+        member.healthy = True
+        logger.info(f"[AGWPE] Pool server {member.name} connected")
+        self._wake()
+        return True
+
+    def _member_down(self, member: _Member):
+        if not member.healthy:
+            return
+        member.healthy = False
+        member.client.connected = False
+        member.client._drop_sessions()
+        member.attempt = 0
+        member.next_retry = time.monotonic()
+        with self._lock:
+            for link, (server, _) in list(self._links.items()):
+                if server == member.name:
+                    del self._links[link]
+        logger.warning(f"[AGWPE] Pool server {member.name} is down")
+
+    # Shared reader
+
+    def _sync_registrations(self):
+        """(Re)register the sockets of healthy members; only called from the reader thread."""
+        for member, sock in list(self._registered.items()):
+            if not member.healthy or member.client.sock is not sock:
+                try:
+                    self._selector.unregister(sock)
+                except (KeyError, ValueError):
+                    pass
+                del self._registered[member]
+        for member in self._members.values():
+            sock = member.client.sock
+            if member.healthy and sock is not None and member not in self._registered:
+                self._selector.register(sock, selectors.EVENT_READ, member)
+                self._registered[member] = sock
+
+    def _reader_loop(self):
+        self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+        while self._running:
+            self._sync_registrations()
+            for key, _ in self._selector.select(0.5):
+                member = key.data
+                if member is None:
+                    try:
+                        self._wake_r.recv(4096)
+                    except OSError:
+                        pass
+                    continue
+                member.last_rx = time.monotonic()
+                if not member.client._receive_once():
+                    self._member_down(member)
+
+    def _on_member_frame(self, name: str, frame: AGWPEFrame):
+        tagged = PoolFrame(next(self._seq), time.time(), name, self._logical.get((name, frame.port)), frame)
+        if self.on_frame:
+            self.on_frame(tagged)
+        if self._frames is not None:
+            self._put_frame(tagged)
+
+    def _put_frame(self, tagged: Optional[PoolFrame]):
+        """Queue a frame for ``frames()``, dropping the oldest when the queue is full."""
+        while True:
+            try:
+                self._frames.put_nowait(tagged)
+                return
+            except queue.Full:
+                try:
+                    self._frames.get_nowait()
+                    self.frames_dropped += 1
+                except queue.Empty:
+                    pass
+
+    def frames(self, timeout: Optional[float] = None) -> Iterator[PoolFrame]:
+        """
+        Iterate merged monitor/connection frames until the pool closes (or
+        nothing arrives for ``timeout`` seconds). Frames are queued from the
+        first call onwards.
+        """
+        if self._frames is None:
+            self._frames = queue.Queue(self._frame_queue_size)
+        frames = self._frames
+
+        def iterate():
+            while True:
+                try:
+                    tagged = frames.get(timeout=timeout)
+                except queue.Empty:
+                    return
+                if tagged is None:
+                    return
+                yield tagged
+        return iterate()
+
+    # Health checks and reconnects
+
+    def _health_loop(self):
+        last_ping = time.monotonic()
+        while not self._stop.wait(min(0.1, self.health_interval)):
+            now = time.monotonic()
+            ping = now - last_ping >= self.health_interval
+            if ping:
+                last_ping = now
+            for member in list(self._members.values()):
+                if member.healthy:
+                    if now - member.last_rx > self.health_timeout:
+                        logger.warning(f"[AGWPE] Pool server {member.name} failed its health check")
+                        self._member_down(member)
+                        try:
+                            member.client.sock.shutdown(socket.SHUT_RDWR)
+                        except OSError:
+                            pass
+                        self._wake()
+                    elif ping:
+                        member.client.request_extended_version()
+                elif now >= member.next_retry:
+                    self._try_connect(member, now)
+
+    # Routed requests
+
+    def send_ui(self, port: int, dest: str, src: str, pid: int, info: bytes = b'', priority: Optional[int] = None):
+        """Send a UI frame on logical ``port``."""
+        client, agw_port = self.route(port)
+        client.send_ui(agw_port, dest, src, pid, info, priority)
+
+    def send_raw_unproto(self, port: int, dest: str, src: str, data: bytes, priority: Optional[int] = None):
+        client, agw_port = self.route(port)
+        client.send_raw_unproto(agw_port, dest, src, data, priority)
+
+    def send_raw_ui(self, port: int, dest: str, src: str, info: bytes = b'', pid: int = PID_NO_L3, path=(),
+                    priority: Optional[int] = None):
+        client, agw_port = self.route(port)
+        client.send_raw_ui(agw_port, dest, src, info, pid, path, priority)
+
+    def send_monitor(self, port: Optional[int] = None):
+        """Request monitoring on every target of logical ``port`` (all mapped ports if None), backups included."""
+        logicals = self._routes if port is None else (port,)
+        for logical in logicals:
+            for server, agw_port in self._routes[logical]:
+                self._members[server].client.send_monitor(agw_port)
+
+    def send_connect(self, port: int, dest: str, src: Optional[str] = None):
+        """Connect on logical ``port``; later connected-mode calls for ``dest`` use the same back end."""
+        client, agw_port = self.route(port)
+        server = next(name for name, m in self._members.items() if m.client is client)
+        with self._lock:
+            self._links[(port, dest.upper())] = (server, agw_port)
+        client.send_connect(agw_port, dest, src)
+
+    def _link(self, port: int, dest: str) -> Tuple[AGWPEClient, int]:
+        with self._lock:
+            target = self._links.get((port, dest.upper()))
+        if target is None:
+            raise ConnectionError(f"No link to {dest} on logical port {port}")
+        return self._members[target[0]].client, target[1]
+
+    def send_connected_data(self, port: int, dest: str, data: bytes, src: Optional[str] = None):
+        client, agw_port = self._link(port, dest)
+        client.send_connected_data(agw_port, dest, data, src)
+
+    def send_disconnect(self, port: int, dest: str, src: Optional[str] = None):
+        client, agw_port = self._link(port, dest)
+        with self._lock:
+            self._links.pop((port, dest.upper()), None)
+        client.send_disconnect(agw_port, dest, src)
+
+    def stats(self) -> Dict[str, dict]:
+        """``client.stats()`` per server, plus its health."""
+        result = {}
+        for name, member in self._members.items():
+            stats = member.client.stats()
+            stats["healthy"] = member.healthy
+            result[name] = stats
+        return result
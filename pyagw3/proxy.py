@@ -0,0 +1,388 @@
+# pyagw3/proxy.py
+
+# PyAGW3/proxy.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# Multi-application fan-out proxy
+# Serves the AGWPE TCP/IP API to any number of local applications over one
+# upstream AGWPEClient connection. Registrations, monitor ports and raw mode
+# are merged upstream (and replayed by the client after a reconnect);
+# monitored frames are copied out of the receive buffer once per read and
+# the same buffer is queued to every application that monitors the port.
+# Connected-mode frames, the disconnect of an open or requested link and
+# 'X'/'y' replies go to the application owning the local callsign; query
+# replies to every application waiting on that query. Each
+# application has its own bounded send queue and writer thread, so a slow
+# reader loses monitor frames instead of stalling the others.
+
+import collections
+import logging
+import socket
+import threading
+from typing import Deque, Dict, List, Optional, Set, Tuple
+
+from .agwpe import AGWPEClient, _sendmsg_all
+from .codec import HEADER_LEN, decode_many, encode_frame, strip_callsign
+from .decoder import FrameDecoder
+from .filters import MONITOR_KINDS, _kind_table
+
+logger = logging.getLogger('AGWPE')
+
+# Per-application send queue limit; monitor frames beyond it are dropped
+DEFAULT_QUEUE_BYTES = 1024 * 1024
+# An application whose queue of routed (non-monitor) frames passes this many times the limit is disconnected
+HARD_LIMIT_FACTOR = 4
+
+_MONITOR = _kind_table(MONITOR_KINDS)
+_RAW = ord('K')
+_C, _D, _X, _LINK_Y = ord('C'), ord('D'), ord('X'), ord('y')
+# Routed to the owner of the local callsign, which is the header's call_to
+_TO_LOCAL = frozenset(b'Ccd')
+# Requests answered with a reply of the same kind and port. A reply reports current state, so it
+# answers every application waiting on that query, whichever request (the upstream client's own
+# 'Y' polls included) it was sent for
+_QUERY_KINDS = frozenset(b'GgHYmv')
+
+
+class _Downstream:
+    """One connected application: its merged-state contributions and send queue."""
+    def __init__(self, sock: socket.socket, address):
+        self.sock = sock
+        self.address = address
+        self.callsigns: Set[bytes] = set()
+        self.monitor_ports: Set[int] = set()
+        self.raw = False
+        self.alive = True
+        self.queued = 0
+        self.dropped = 0
+        self.frames_in = 0
+        self.frames_out = 0
+        # Reader and writer thread, dropped from the proxy's list when the application leaves
+        self.threads: List[threading.Thread] = []
+        self._parts: Deque[memoryview] = collections.deque()
+        self._cond = threading.Condition()
+
+    def enqueue(self, buffer: memoryview, frames: int, limit: int, droppable: bool) -> bool:
+        """
+        Queue a run of frames for the writer thread. Droppable (monitor) runs
+        are dropped past ``limit`` queued bytes; False means a routed run
+        pushed the queue past the hard limit.
+        """
+        with self._cond:
+            if not self.alive:
+                return True
+            if droppable and self.queued >= limit:
+                self.dropped += frames
+                return True
+            self._parts.append(buffer)
+            self.queued += len(buffer)
+            self.frames_out += frames
+            self._cond.notify()
+            return self.queued < limit * HARD_LIMIT_FACTOR
+
+    def write_loop(self):
+        while True:
+            with self._cond:
+                while self.alive and not self._parts:
+                    self._cond.wait()
+                if not self.alive:
+                    return
+                parts = list(self._parts)
+                self._parts.clear()
+            nbytes = sum(len(p) for p in parts)
+            try:
+                _sendmsg_all(self.sock, parts)
+            except OSError:
+                self.close()
+                return
+            with self._cond:
+                self.queued -= nbytes
+
+    def close(self):
+        with self._cond:
+            if not self.alive:
+                return
+            self.alive = False
+            self._parts.clear()
+            self._cond.notify_all()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class AGWPEProxy:
+    """
+    AGWPE server for local applications backed by one ``upstream``
+    AGWPEClient (connected by the caller; its reconnect and session replay
+    cover the merged state). ``R`` for a callsign another application owns
+    is refused with a failed 'X'. Monitor frames are dropped for an
+    application with more than ``max_queue_bytes`` unsent; one that falls
+    ``HARD_LIMIT_FACTOR`` times that far behind on routed frames is
+    disconnected. Use ``port=0`` for an ephemeral port.
+    """
+    def __init__(self, upstream: AGWPEClient, host: str = "127.0.0.1", port: int = 0,
+                 max_queue_bytes: int = DEFAULT_QUEUE_BYTES):
+        self.upstream = upstream
+        self.host = host
+        self.port = port
+        self.max_queue_bytes = max_queue_bytes
+        self._downstreams: List[_Downstream] = []
+        self._owners: Dict[bytes, _Downstream] = {}
+        # Requested and open connected-mode links by (port, local call, remote call)
+        self._links: Dict[Tuple[int, bytes, bytes], _Downstream] = {}
+        # Applications waiting for a query reply, by (data kind, port)
+        self._waiting: Dict[Tuple[int, int], Deque[_Downstream]] = collections.defaultdict(collections.deque)
+        self._upstream_ports: Set[int] = set()
+        self._upstream_raw = False
+        self._lock = threading.Lock()
+        self._listener: Optional[socket.socket] = None
+        self._running = False
+        self._threads: List[threading.Thread] = []
+
+    def __enter__(self) -> 'AGWPEProxy':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def downstreams(self) -> List[_Downstream]:
+        with self._lock:
+            return [d for d in self._downstreams if d.alive]
+
+    def start(self):
+        """Bind, listen and start routing upstream frames."""
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind((self.host, self.port))
+        self._listener.listen(16)
+        self._listener.settimeout(0.2)
+        self.port = self._listener.getsockname()[1]
+        self._running = True
+        self.upstream.add_tap(self._route)
+        t = threading.Thread(target=self._accept_loop, name="agwpe-proxy", daemon=True)
+        t.start()
+        self._threads.append(t)
+        logger.info(f"[AGWPE] Proxy listening on {self.host}:{self.port}")
+
+    def stop(self):
+        """Disconnect every application and close the listener; the upstream client stays open."""
+        self._running = False
+        self.upstream.remove_tap(self._route)
+        if self._listener:
+            try:
+                self._listener.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._listener.close()
+        for downstream in self.downstreams:
+            downstream.close()
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for t in threads:
+            t.join(timeout=2)
+        logger.info("[AGWPE] Proxy stopped")
+
+    def stats(self) -> List[dict]:
+        """Per-application address, callsigns, queued bytes and frame counters."""
+        return [{"address": d.address, "callsigns": sorted(c.decode('ascii', errors='ignore') for c in d.callsigns),
+                 "queued_bytes": d.queued, "frames_in": d.frames_in, "frames_out": d.frames_out, "dropped": d.dropped}
+                for d in self.downstreams]
+
+    # Applications
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                sock, address = self._listener.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            downstream = _Downstream(sock, address)
+            downstream.threads = [
+                threading.Thread(target=self._serve, args=(downstream,), name=f"agwpe-proxy-in-{address[1]}", daemon=True),
+                threading.Thread(target=downstream.write_loop, name=f"agwpe-proxy-out-{address[1]}", daemon=True)]
+            with self._lock:
+                self._downstreams = [d for d in self._downstreams if d.alive] + [downstream]
+                self._threads.extend(downstream.threads)
+            for t in downstream.threads:
+                t.start()
+
+    def _serve(self, downstream: _Downstream):
+        decoder = FrameDecoder()
+        try:
+            while self._running and downstream.alive:
+                if not decoder.recv_into(downstream.sock):
+                    break
+                frames, consumed = decode_many(decoder.pending())
+                for kind, port, call_from, call_to, _user, payload, _offset in frames:
+                    downstream.frames_in += 1
+                    self._request(downstream, kind, port, strip_callsign(call_from), strip_callsign(call_to),
+                                  bytes(payload))
+                decoder.consume(consumed)
+        except OSError:
+            pass
+        finally:
+            downstream.close()
+            self._release(downstream)
+
+    def _request(self, downstream: _Downstream, kind: int, port: int, call_from: bytes, call_to: bytes, data: bytes):
+        """Apply one frame from an application to the merged upstream state and forward what is needed."""
+        forward = True
+        with self._lock:
+            if kind == ord('R'):
+                call_from = call_from.upper()
+                owner = self._owners.get(call_from)
+                if owner is not None:
+                    # Already registered upstream: answer here
+                    self._reply(downstream, b'X', call_from, b'\x01' if owner is downstream else b'\x00')
+                    return
+                self._owners[call_from] = downstream
+                downstream.callsigns.add(call_from)
+            elif kind == ord('x'):
+                call_from = call_from.upper()
+                if self._owners.get(call_from) is not downstream:
+                    return
+                del self._owners[call_from]
+                downstream.callsigns.discard(call_from)
+            elif kind == ord('M'):
+                downstream.monitor_ports.add(port)
+                forward = port not in self._upstream_ports
+                self._upstream_ports.add(port)
+            elif kind == ord('k'):
+                downstream.raw = not downstream.raw
+                forward = self._raw_changed()
+            elif kind == _C:
+                # Routes the link's connect reply or failure back here
+                self._links[(port, call_from.upper(), call_to.upper())] = downstream
+            elif kind in _QUERY_KINDS:
+                self._waiting[(kind, port)].append(downstream)
+        if forward:
+            self.upstream._send_frame(bytes((kind,)), port, call_from, call_to, data)
+
+    def _reply(self, downstream: _Downstream, data_kind: bytes, call_from: bytes, data: bytes):
+        downstream.enqueue(memoryview(encode_frame(data_kind, 0, call_from, b'', data)), 1, self.max_queue_bytes, False)
+
+    def _raw_changed(self) -> bool:
+        """Caller holds the lock. True if upstream raw mode must be toggled to match the applications."""
+        wanted = any(d.raw for d in self._downstreams if d.alive)
+        if wanted == self._upstream_raw:
+            return False
+        self._upstream_raw = wanted
+        return True
+
+    def _release(self, downstream: _Downstream):
+        """Drop a disconnected application's registrations and raw mode upstream."""
+        with self._lock:
+            self._downstreams = [d for d in self._downstreams if d is not downstream]
+            self._threads = [t for t in self._threads if t not in downstream.threads]
+            self._links = {key: owner for key, owner in self._links.items() if owner is not downstream}
+            calls = [call for call, owner in self._owners.items() if owner is downstream]
+            for call in calls:
+                del self._owners[call]
+            toggle_raw = self._raw_changed()
+        for call in calls:
+            self.upstream._send_frame(b'x', 0, call)
+        if toggle_raw:
+            self.upstream._send_frame(b'k')
+
+    # Upstream
+
+    def _route(self, buffer, frames: list):
+        """Upstream tap: queue each frame of one read to the applications it belongs to."""
+        if not frames:
+            return
+        base = frames[0][6]
+        last = frames[-1]
+        # One copy of the read, shared by every application's queue
+        shared = memoryview(bytes(buffer[base:last[6] + HEADER_LEN + len(last[5])]))
+        spans: Dict[_Downstream, list] = {}
+        with self._lock:
+            downstreams = [d for d in self._downstreams if d.alive]
+            for decoded in frames:
+                kind, port = decoded[0], decoded[1]
+                targets = None
+                if kind in _TO_LOCAL:
+                    targets = self._link_owner(port, decoded[3], decoded[2], kind == _C)
+                elif kind == _D:
+                    # Disconnect of a link an application opened or requested; other 'D' frames are monitored
+                    targets = self._link_owner(port, decoded[3], decoded[2], None)
+                elif kind == _LINK_Y or kind == _X:
+                    targets = self._owner(decoded[2])
+                    if kind == _X and targets and not decoded[5][:1] == b'\x01':
+                        self._refused(decoded[2], targets[0])
+                droppable = targets is None and _MONITOR[kind]
+                if droppable:
+                    raw = kind == _RAW
+                    targets = [d for d in downstreams if port in d.monitor_ports and (d.raw or not raw)]
+                elif targets is None:
+                    targets = self._waiter(kind, port)
+                if not targets:
+                    continue
+                start = decoded[6] - base
+                span = (start, start + HEADER_LEN + len(decoded[5]), droppable)
+                for downstream in targets:
+                    spans.setdefault(downstream, []).append(span)
+        for downstream, runs in spans.items():
+            self._deliver(downstream, shared, runs)
+
+    def _owner(self, local: bytes) -> Optional[List[_Downstream]]:
+        """Caller holds the lock. The application that registered the local callsign."""
+        owner = self._owners.get(strip_callsign(local).upper())
+        return [owner] if owner is not None and owner.alive else None
+
+    def _link_owner(self, port: int, local: bytes, remote: bytes, connect: Optional[bool]) -> Optional[List[_Downstream]]:
+        """
+        Caller holds the lock. The application on link (port, local, remote):
+        ``connect`` True records an inbound link for the callsign owner,
+        None ends the link (only a known link has an owner), False looks it up
+        falling back to the callsign owner.
+        """
+        key = (port, strip_callsign(local).upper(), strip_callsign(remote).upper())
+        if connect is None:
+            owner = self._links.pop(key, None)
+            return [owner] if owner is not None and owner.alive else None
+        owner = self._links.get(key)
+        if owner is None or not owner.alive:
+            targets = self._owner(local)
+            if targets and connect:
+                self._links[key] = targets[0]
+            return targets
+        return [owner]
+
+    def _refused(self, raw_call: bytes, downstream: _Downstream):
+        """Caller holds the lock. Upstream rejected a registration: forget the owner."""
+        call = strip_callsign(raw_call).upper()
+        if self._owners.get(call) is downstream:
+            del self._owners[call]
+            downstream.callsigns.discard(call)
+
+    def _waiter(self, kind: int, port: int) -> Optional[List[_Downstream]]:
+        """Caller holds the lock. Every application waiting on the query, each once; later replies go unclaimed."""
+        queue = self._waiting.pop((kind, port), None)
+        if not queue:
+            return None
+        waiters = list(dict.fromkeys(d for d in queue if d.alive))
+        return waiters or None
+
+    def _deliver(self, downstream: _Downstream, shared: memoryview, spans: list):
+        """Queue adjacent frames of the shared read as one buffer; monitor and routed runs are queued separately."""
+        runs = []
+        for start, end, droppable in spans:
+            if runs and runs[-1][1] == start and runs[-1][2] == droppable:
+                runs[-1][1] = end
+                runs[-1][3] += 1
+            else:
+                runs.append([start, end, droppable, 1])
+        for start, end, droppable, count in runs:
+            if not downstream.enqueue(shared[start:end], count, self.max_queue_bytes, droppable):
+                logger.warning(f"[AGWPE] Proxy client {downstream.address} too slow, disconnecting")
+                downstream.close()
+                return
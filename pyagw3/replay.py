@@ -0,0 +1,212 @@
+# pyagw3/replay.py
+
+# PyAGW3/replay.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# Replay and query engine for CaptureWriter recordings
+# Segments are memory-mapped and frames are yielded as memoryview slices of
+# the mapping; the sidecar time and callsign indexes narrow each query to the
+# records it needs. Replay feeds the same decode/dispatch path as a live
+# client, at recorded speed, N x speed or as fast as possible.
+
+import bisect
+import mmap
+import os
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from .agwpe import AGWPEClient, FrameDispatcher
+from .capture import (FILE_HEADER, RECORD_HEADER, SEGMENT_MAGIC, SegmentIndex,
+                      index_path, list_segments, read_index)
+from .codec import strip_callsign
+from .filters import _kind_table
+
+_RECORD = RECORD_HEADER.size
+
+
+def _to_ns(seconds: Optional[float]) -> Optional[int]:
+    return None if seconds is None else int(seconds * 1e9)
+
+
+class CaptureSegment:
+    """One memory-mapped segment and its index (None if the sidecar is missing, e.g. still being written)."""
+    def __init__(self, path: str):
+        self.path = path
+        self.index: Optional[SegmentIndex] = read_index(path) if os.path.exists(index_path(path)) else None
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self._map)
+        if bytes(self.view[:8]) != SEGMENT_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a capture segment")
+
+    def close(self):
+        self.view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # Frames handed out by records() are still referenced; the mapping goes with them
+            pass
+
+    def overlaps(self, start_ns: Optional[int], end_ns: Optional[int]) -> bool:
+        if self.index is None or not self.index.records:
+            return self.index is None
+        return ((start_ns is None or self.index.last_ns >= start_ns)
+                and (end_ns is None or self.index.first_ns <= end_ns))
+
+    def seek(self, start_ns: Optional[int]) -> int:
+        """File offset from which scanning finds every record at or after ``start_ns``."""
+        if start_ns is None or self.index is None:
+            return FILE_HEADER.size
+        i = bisect.bisect_right(self.index.times, start_ns) - 1
+        return self.index.offsets[i] if i >= 0 else FILE_HEADER.size
+
+    def records(self, offset: int = FILE_HEADER.size) -> Iterator[Tuple[int, int, memoryview]]:
+        """Yield (receive time ns, record offset, wire frame view) from ``offset`` on."""
+        view = self.view
+        unpack_from = RECORD_HEADER.unpack_from
+        end = len(view)
+        while offset + _RECORD <= end:
+            ts, n = unpack_from(view, offset)
+            frame = offset + _RECORD
+            if frame + n > end:
+                return  # truncated tail of a segment that was still being written
+            yield ts, offset, view[frame:frame + n]
+            offset = frame + n
+
+    def record_at(self, offset: int) -> Tuple[int, memoryview]:
+        ts, n = RECORD_HEADER.unpack_from(self.view, offset)
+        return ts, self.view[offset + _RECORD:offset + _RECORD + n]
+
+    def callsign_offsets(self, callsign: bytes) -> Optional[List[int]]:
+        """Sorted record offsets mentioning ``callsign`` (every SSID if it has none), or None without an index."""
+        if self.index is None:
+            return None
+        if b'-' in callsign:
+            offsets = self.index.callsigns.get(callsign)
+            return list(offsets) if offsets is not None else []
+        merged = set()
+        for call, offsets in self.index.callsigns.items():
+            if call == callsign or call.split(b'-')[0] == callsign:
+                merged.update(offsets)
+        return sorted(merged)
+
+
+class CaptureReader:
+    """
+    Read-only view of a capture directory (or an explicit list of segment paths).
+
+    ``frames()`` answers queries such as "frames from N0CALL between t1 and
+    t2 on port 1" by skipping segments outside the time range, seeking with
+    the time index and, for callsign queries, visiting only the indexed
+    records. Yielded memoryviews point into the mapping and are valid until
+    ``close()``.
+    """
+    def __init__(self, source, prefix: str = "capture"):
+        paths = list_segments(source, prefix) if isinstance(source, str) and os.path.isdir(source) else list(
+            [source] if isinstance(source, str) else source)
+        self.segments = [CaptureSegment(path) for path in paths if os.path.getsize(path) >= FILE_HEADER.size]
+
+    def __enter__(self) -> 'CaptureReader':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for segment in self.segments:
+            segment.close()
+        self.segments = []
+
+    def frames(self, start: Optional[float] = None, end: Optional[float] = None, callsign: Optional[str] = None,
+               port: Optional[int] = None, kinds=None) -> Iterator[Tuple[int, memoryview]]:
+        """
+        Yield (receive time ns, wire frame view) in recorded order.
+        ``start``/``end`` are epoch seconds (inclusive); ``callsign`` matches
+        either header callsign (all SSIDs when none is given).
+        """
+        start_ns, end_ns = _to_ns(start), _to_ns(end)
+        call = callsign.upper().encode('ascii') if callsign else None
+        kind_table = _kind_table(kinds) if kinds is not None else None
+        for segment in self.segments:
+            if not segment.overlaps(start_ns, end_ns):
+                continue
+            offsets = segment.callsign_offsets(call) if call is not None else None
+            if offsets is not None:
+                if start_ns is not None and segment.index.times:
+                    offsets = offsets[bisect.bisect_left(offsets, segment.seek(start_ns)):]
+                source: Iterable = (segment.record_at(offset) for offset in offsets)
+            else:
+                source = ((ts, raw) for ts, _, raw in segment.records(segment.seek(start_ns)))
+            for ts, raw in source:
+                if start_ns is not None and ts < start_ns:
+                    continue
+                if end_ns is not None and ts > end_ns:
+                    break
+                if kind_table is not None and not kind_table[raw[0]]:
+                    continue
+                if port is not None and int.from_bytes(raw[4:8], 'little') != port:
+                    continue
+                if call is not None and offsets is None and not _mentions(raw, call):
+                    continue
+                yield ts, raw
+
+    def replay(self, client: FrameDispatcher, speed: Optional[float] = None, **query) -> int:
+        """
+        Dispatch recorded frames through ``client`` exactly as its receive path
+        would (taps, frame filter, built-in handlers, subscribers). ``speed``
+        1.0 keeps the recorded timing, 10.0 plays ten times faster and None
+        as fast as possible. ``query`` takes the ``frames()`` arguments.
+        Returns the number of frames dispatched.
+        """
+        return replay_records(client, self.frames(**query), speed)
+
+
+def _mentions(raw: memoryview, call: bytes) -> bool:
+    for field in (bytes(raw[8:18]), bytes(raw[18:28])):
+        stripped = strip_callsign(field)
+        if stripped == call or (b'-' not in call and stripped.split(b'-')[0] == call):
+            return True
+    return False
+
+
+def replay_records(client: FrameDispatcher, records: Iterable[Tuple[int, bytes]], speed: Optional[float] = None) -> int:
+    """Dispatch (receive time ns, wire frame) records through ``client``; see ``CaptureReader.replay``."""
+    count = 0
+    first_ts = None
+    wall_start = 0.0
+    for ts, raw in records:
+        if speed:
+            if first_ts is None:
+                first_ts, wall_start = ts, time.monotonic()
+            delay = wall_start + (ts - first_ts) / 1e9 / speed - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        count += client._dispatch_buffer(memoryview(raw), ts / 1e9)[1]
+    return count
+
+
+class ReplayClient(AGWPEClient):
+    """
+    AGWPEClient driven by a capture instead of a socket, for regression-testing
+    handlers against recorded traffic. Frames the handlers send are collected
+    in ``sent`` as (data_kind, port, call_from, call_to, data) tuples.
+    """
+    def __init__(self, reader: CaptureReader, callsign: str = "NOCALL", **kwargs):
+        super().__init__(callsign=callsign, **kwargs)
+        self.reader = reader
+        self.sent: List[tuple] = []
+
+    def connect(self, max_retries: int = 0, base_delay: float = 1.0) -> bool:
+        self.connected = True
+        return True
+
+    def run(self, speed: Optional[float] = None, **query) -> int:
+        """Replay the capture through this client's callbacks; see ``CaptureReader.replay``."""
+        return self.reader.replay(self, speed, **query)
+
+    def _send_frame(self, data_kind: bytes, port: int = 0, call_from: bytes = b'', call_to: bytes = b'', data: bytes = b'',
+                    priority: Optional[int] = None):
+        self.sent.append((data_kind, port, strip_callsign(call_from), strip_callsign(call_to), bytes(data)))
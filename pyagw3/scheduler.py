@@ -0,0 +1,322 @@
+# pyagw3/scheduler.py
+
+# PyAGW3/scheduler.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# Priority transmit scheduler
+# Sits between AGWPEClient's send methods and the socket for frames that go
+# on air: per-port queues drained interactive first, then traffic, then
+# beacons, paced by an airtime token bucket derived from the port's baud
+# rate and kept below a 'Y' outstanding-frame high-water mark so the TNC
+# queue stays short and a late interactive frame doesn't wait behind it.
+
+import collections
+import logging
+import threading
+import time
+from typing import Callable, Deque, Dict, List, Optional
+
+from .flow import DEFAULT_HIGH_WATER
+from .metrics import Histogram
+from .supervisor import OFFLINE_REJECT
+
+logger = logging.getLogger('AGWPE')
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_TRAFFIC = 1
+PRIORITY_BEACON = 2
+PRIORITY_NAMES = ('interactive', 'traffic', 'beacon')
+
+# Data kinds that are transmitted on air and therefore scheduled. Connects share the
+# interactive lane with data and disconnects so a disconnect/reconnect keeps its order
+SCHEDULED_KINDS = frozenset((b'C', b'D', b'K', b'V', b'd'))
+# Queue wait histogram bucket upper bounds in seconds
+WAIT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Bytes a payload gains on air: addresses, control and PID, plus HDLC flags and FCS
+AX25_OVERHEAD = 18 + 4
+# Average HDLC bit-stuffing expansion
+BIT_STUFFING = 1.05
+
+
+def airtime(nbytes: int, baud: int, txdelay: float = 0.0) -> float:
+    """Seconds on air for a frame with ``nbytes`` of payload at ``baud``."""
+    return txdelay + (nbytes + AX25_OVERHEAD) * 8 * BIT_STUFFING / baud
+
+
+def default_priority(data_kind: bytes, data: bytes) -> int:
+    """Connects, connected-mode data and disconnects are interactive; everything else is traffic."""
+    if data_kind in (b'C', b'd') or (data_kind == b'D' and not data):
+        return PRIORITY_INTERACTIVE
+    return PRIORITY_TRAFFIC
+
+
+class _Entry:
+    __slots__ = ('frame', 'priority', 'queued_at', 'cost')
+
+    def __init__(self, frame: tuple, priority: int, queued_at: float, cost: float):
+        self.frame = frame
+        self.priority = priority
+        self.queued_at = queued_at
+        self.cost = cost
+
+
+class _PortQueue:
+    """Queues, airtime bucket and counters of one radio port."""
+    def __init__(self, baud: int, budget: Optional[float], burst: float, high_water: int, txdelay: float):
+        self.baud = baud
+        self.budget = budget
+        self.burst = burst
+        self.high_water = high_water
+        self.txdelay = txdelay
+        self.queues: List[Deque[_Entry]] = [collections.deque() for _ in PRIORITY_NAMES]
+        # Queued beacons by (kind, from, to) so a newer copy replaces the queued one
+        self.beacons: Dict[tuple, _Entry] = {}
+        self.tokens = burst
+        self.refilled = time.monotonic()
+        self.last_poll = 0.0
+        # When the 'Y' high-water hold began; every reply restarts it
+        self.held_since: Optional[float] = None
+        # Set when 'Y' polls went unanswered for poll_timeout; cleared by the next reply
+        self.unanswered = False
+        self.poll_timeouts = 0
+        self.sent = [0] * len(PRIORITY_NAMES)
+        self.coalesced = 0
+        self.airtime_used = 0.0
+        self.waits = [Histogram(WAIT_BUCKETS) for _ in PRIORITY_NAMES]
+
+    def __len__(self) -> int:
+        return sum(len(q) for q in self.queues)
+
+    def head(self) -> Optional[_Entry]:
+        for queue in self.queues:
+            if queue:
+                return queue[0]
+        return None
+
+    def refill(self, now: float):
+        if self.budget is not None:
+            self.tokens = min(self.burst, self.tokens + (now - self.refilled) * self.budget)
+        self.refilled = now
+
+
+class TxScheduler:
+    """
+    Priority transmit scheduler for an AGWPEClient (see ``attach``).
+
+    On-air frames are queued per radio port and sent interactive first,
+    then traffic, then beacons (``send_ui(..., priority=PRIORITY_BEACON)``).
+    A port with a ``budget`` (fraction of the channel's airtime this client
+    may use, 1.0 = all of it) spends airtime tokens computed from ``baud``
+    and refilled at ``budget`` seconds per second, up to ``burst`` seconds.
+    At most ``high_water`` frames are left outstanding in the TNC: past
+    that the scheduler polls 'Y' every ``poll_interval`` until the count
+    drops; if no reply arrives within ``poll_timeout`` it sends without the
+    limit until the back end answers again. A beacon queued while an older one from the same source to the
+    same destination is still waiting replaces it.
+    """
+    def __init__(self, baud: int = 1200, budget: Optional[float] = None, burst: float = 2.0,
+                 high_water: int = DEFAULT_HIGH_WATER, txdelay: float = 0.0, poll_interval: float = 0.5,
+                 poll_timeout: float = 5.0, classify: Callable[[bytes, bytes], int] = default_priority):
+        self.defaults = dict(baud=baud, budget=budget, burst=burst, high_water=high_water, txdelay=txdelay)
+        self.poll_interval = poll_interval
+        self.poll_timeout = poll_timeout
+        self.classify = classify
+        self.client = None
+        self._ports: Dict[int, _PortQueue] = {}
+        self._cond = threading.Condition()
+        self._running = False
+        # True while the scheduler thread writes a batch it has taken off the queues
+        self._sending = False
+        self._thread: Optional[threading.Thread] = None
+
+    def configure_port(self, port: int, **settings):
+        """Override ``baud``, ``budget``, ``burst``, ``high_water`` or ``txdelay`` for one port."""
+        unknown = set(settings) - set(self.defaults)
+        if unknown:
+            raise TypeError(f"Unknown port settings: {', '.join(sorted(unknown))}")
+        with self._cond:
+            queue = self._port(port)
+            for name, value in settings.items():
+                setattr(queue, name, value)
+            queue.tokens = min(queue.tokens, queue.burst)
+            self._cond.notify_all()
+
+    def _port(self, port: int) -> _PortQueue:
+        queue = self._ports.get(port)
+        if queue is None:
+            queue = self._ports[port] = _PortQueue(**self.defaults)
+        return queue
+
+    # Lifecycle
+
+    def attach(self, client):
+        """Route ``client``'s on-air frames through this scheduler and start the scheduler thread."""
+        if self.client is not None:
+            raise RuntimeError("Scheduler is already attached")
+        self.client = client
+        client.tx_scheduler = self
+        client.register_handler('Y', self._on_outstanding)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="agwpe-tx-scheduler", daemon=True)
+        self._thread.start()
+
+    def close(self, timeout: Optional[float] = 5.0) -> int:
+        """Send what is queued (waiting at most ``timeout``), then detach from the client. Returns the frames dropped."""
+        self.flush(timeout)
+        with self._cond:
+            self._running = False
+            left = sum(len(queue) for queue in self._ports.values())
+            for queue in self._ports.values():
+                for q in queue.queues:
+                    q.clear()
+                queue.beacons.clear()
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        client, self.client = self.client, None
+        if client is not None:
+            client.unregister_handler('Y', self._on_outstanding)
+            if client.tx_scheduler is self:
+                client.tx_scheduler = None
+        return left
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued frame has been handed to the TNC."""
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not (self._sending or any(self._ports.values())) or not self._running, timeout)
+
+    # Queueing
+
+    def submit(self, data_kind: bytes, port: int, call_from: bytes, call_to: bytes, data: bytes,
+               priority: Optional[int] = None):
+        """Queue one frame; called by the client's send path."""
+        client = self.client
+        if client is not None and client.offline_policy == OFFLINE_REJECT and not (client.connected and client.sock):
+            # Refuse on the caller's thread, as an unscheduled send would
+            raise ConnectionError(f"Not connected to {client.transport}")
+        if priority is None:
+            priority = self.classify(data_kind, data)
+        now = time.monotonic()
+        with self._cond:
+            queue = self._port(port)
+            frame = (data_kind, port, call_from, call_to, data)
+            cost = airtime(len(data), queue.baud, queue.txdelay)
+            if priority == PRIORITY_BEACON:
+                key = (data_kind, call_from, call_to)
+                queued = queue.beacons.get(key)
+                if queued is not None:
+                    # Keep the older entry's place (and wait time), send the newest content
+                    queued.frame = frame
+                    queued.cost = cost
+                    queue.coalesced += 1
+                    return
+                entry = queue.beacons[key] = _Entry(frame, priority, now, cost)
+            else:
+                entry = _Entry(frame, priority, now, cost)
+            queue.queues[priority].append(entry)
+            self._cond.notify_all()
+
+    def _on_outstanding(self, frame):
+        with self._cond:
+            queue = self._ports.get(frame.port)
+            if queue is not None:
+                queue.held_since = None
+                queue.unanswered = False
+            self._cond.notify_all()
+
+    # Scheduler thread
+
+    def _next_batch(self, now: float) -> tuple:
+        """Pop every frame that may go now; returns (frames, seconds until something else may)."""
+        client = self.client
+        ready = []
+        wait = None
+        for port, queue in self._ports.items():
+            while True:
+                entry = queue.head()
+                if entry is None:
+                    break
+                in_flight = client.outstanding.get(port) or 0
+                if in_flight < queue.high_water:
+                    queue.held_since = None
+                elif not queue.unanswered:
+                    if queue.held_since is None:
+                        queue.held_since = now
+                    if now - queue.held_since >= self.poll_timeout:
+                        # The back end doesn't answer 'Y': a stale count mustn't hold the queue forever
+                        queue.unanswered = True
+                        queue.poll_timeouts += 1
+                    else:
+                        if now - queue.last_poll >= self.poll_interval:
+                            queue.last_poll = now
+                            ready.append(('poll', port))
+                        delay = min(self.poll_interval, queue.held_since + self.poll_timeout - now)
+                        wait = delay if wait is None else min(wait, delay)
+                        break
+                queue.refill(now)
+                if queue.budget is not None and queue.tokens < min(entry.cost, queue.burst):
+                    delay = (min(entry.cost, queue.burst) - queue.tokens) / queue.budget
+                    wait = delay if wait is None else min(wait, delay)
+                    break
+                queue.queues[entry.priority].popleft()
+                if entry.priority == PRIORITY_BEACON:
+                    frame = entry.frame
+                    queue.beacons.pop((frame[0], frame[2], frame[3]), None)
+                if queue.budget is not None:
+                    queue.tokens -= entry.cost
+                queue.airtime_used += entry.cost
+                queue.sent[entry.priority] += 1
+                queue.waits[entry.priority].observe(now - entry.queued_at)
+                client.outstanding.sent(port)
+                ready.append(entry.frame)
+        return ready, wait
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._sending = False
+                if not self._running:
+                    return
+                ready, wait = self._next_batch(time.monotonic())
+                if not ready:
+                    self._cond.notify_all()
+                    self._cond.wait(wait)
+                    continue
+                self._sending = True
+            client = self.client
+            for item in ready:
+                try:
+                    if item[0] == 'poll':
+                        client.request_outstanding(item[1])
+                    else:
+                        client._send_direct(*item)
+                except Exception as e:
+                    # The connection dropped after the frame was queued; keep draining the rest
+                    logger.error(f"[AGWPE] Scheduled send failed: {e}")
+                    client.metrics.send_errors += 1
+
+    # Introspection
+
+    def pending(self) -> int:
+        """Frames queued on every port."""
+        with self._cond:
+            return sum(len(queue) for queue in self._ports.values())
+
+    def stats(self) -> Dict[int, dict]:
+        """Per-port queue depths, sent/coalesced counts, airtime and queue wait histograms by priority."""
+        with self._cond:
+            result = {}
+            for port, queue in self._ports.items():
+                result[port] = {
+                    "queued": {name: len(queue.queues[i]) for i, name in enumerate(PRIORITY_NAMES)},
+                    "sent": {name: queue.sent[i] for i, name in enumerate(PRIORITY_NAMES)},
+                    "coalesced": queue.coalesced,
+                    "poll_timeouts": queue.poll_timeouts,
+                    "airtime_seconds": queue.airtime_used,
+                    "tokens": queue.tokens if queue.budget is not None else None,
+                    "queue_wait": {name: queue.waits[i].snapshot() for i, name in enumerate(PRIORITY_NAMES)},
+                }
+            return result
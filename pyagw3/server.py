@@ -0,0 +1,351 @@
+# pyagw3/server.py
+
+# PyAGW3/server.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# In-process AGWPE server emulator for load testing and CI
+# Speaks R, M, k, D, K, C, d, H, Y, y, v, m, P and T over real TCP
+# Emulated remote stations auto-accept connects and echo connected data
+# Synthetic monitor traffic at a configurable frame rate and size mix
+
+import os
+import random
+import socket
+import struct
+import threading
+import time
+import logging
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from .codec import encode_frame, encode_many, decode_many, strip_callsign
+from .decoder import FrameDecoder
+
+logger = logging.getLogger('AGWPE')
+
+DEFAULT_VERSION = "PyAGW3 AGWPE emulator"
+# (payload size, weight) pairs used when no size mix is given
+DEFAULT_SIZE_MIX = ((0, 1), (64, 4), (256, 2), (2048, 1))
+
+# Resolution of the synthetic traffic generator; frames due within one tick are sent as one batch
+_TICK = 0.01
+
+
+class _Session:
+    """State for one connected application."""
+    def __init__(self, sock: socket.socket, address):
+        self.sock = sock
+        self.address = address
+        self.lock = threading.Lock()
+        self.callsigns: Set[bytes] = set()
+        self.monitor_ports: Set[int] = set()
+        self.monitor_all = False
+        self.raw = False
+        self.links: Set[Tuple[int, bytes, bytes]] = set()
+        self.alive = True
+
+    def monitors(self, port: int) -> bool:
+        return self.monitor_all or port in self.monitor_ports
+
+    def send(self, data: bytes) -> bool:
+        if not self.alive:
+            return False
+        try:
+            with self.lock:
+                self.sock.sendall(data)
+            return True
+        except OSError:
+            self.alive = False
+            return False
+
+
+class AGWPEServer:
+    """
+    Threaded AGWPE TCP/IP API server emulator.
+
+    Each accepted application gets its own thread. Monitor frames ('D', and
+    'K' for applications that enabled raw with 'k') are delivered to every
+    application that requested monitoring ('M') on the frame's radio port.
+    Use ``port=0`` to bind an ephemeral TCP port; the bound one is in ``port``.
+    With ``path`` it listens on that Unix domain socket instead, and
+    ``serve_stream`` serves an in-process stream (``transport.MemoryTransport``).
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, radio_ports: int = 2,
+                 version: str = DEFAULT_VERSION, echo_connected: bool = True, path: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.radio_ports = radio_ports
+        self.version = version
+        self.echo_connected = echo_connected
+        self.parameters: Dict[Tuple[int, int], int] = {}
+        self.logins: List[Tuple[str, str]] = []
+        self.outstanding: Dict[int, int] = {}
+        # Per-link counts for 'y'; with track_outstanding each received 'd' frame adds one
+        # (tests drain it to emulate the TNC transmitting)
+        self.link_outstanding: Dict[Tuple[int, bytes, bytes], int] = {}
+        self.track_outstanding = False
+        # Remote callsigns whose connect requests fail with a retry-out 'D'
+        self.unreachable: Set[bytes] = set()
+        # When set, frames are still read but never answered (a hung back end)
+        self.muted = False
+        self.heard: Dict[bytes, int] = {}
+        self.frames_in = 0
+        self.frames_out = 0
+        self.kinds_in: Dict[bytes, int] = {}
+        self._sessions: List[_Session] = []
+        self._lock = threading.Lock()
+        self._count_lock = threading.Lock()
+        self._listener: Optional[socket.socket] = None
+        self._running = False
+        self._threads: List[threading.Thread] = []
+        self._traffic: Optional[threading.Thread] = None
+        self._traffic_stop = threading.Event()
+
+    def __enter__(self) -> 'AGWPEServer':
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        return (self.host, self.port)
+
+    @property
+    def sessions(self) -> List[_Session]:
+        with self._lock:
+            return [s for s in self._sessions if s.alive]
+
+    def start(self):
+        """Bind, listen and start accepting applications."""
+        if self.path is not None:
+            self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._listener.bind(self.path)
+        else:
+            self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self._listener.bind((self.host, self.port))
+            self.port = self._listener.getsockname()[1]
+        self._listener.listen(16)
+        self._listener.settimeout(0.2)
+        self._running = True
+        t = threading.Thread(target=self._accept_loop, name="agwpe-server", daemon=True)
+        t.start()
+        self._threads.append(t)
+        logger.info(f"[AGWPE] Emulator listening on {self.path or f'{self.host}:{self.port}'}")
+
+    def stop(self):
+        """Stop traffic, disconnect every application and close the listener."""
+        self.stop_traffic()
+        self._running = False
+        if self._listener:
+            # shutdown() stops listening immediately; close() alone is deferred while accept() is polling
+            try:
+                self._listener.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self._listener.close()
+            if self.path is not None and os.path.exists(self.path):
+                os.unlink(self.path)
+        for session in self.sessions:
+            session.alive = False
+            try:
+                session.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            session.sock.close()
+        for t in self._threads:
+            t.join(timeout=2)
+        self._threads = []
+        logger.info("[AGWPE] Emulator stopped")
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                sock, address = self._listener.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if self.path is None:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.serve_stream(sock, address)
+
+    def serve_stream(self, sock, address=None):
+        """Serve one application over a connected stream (a socket or ``transport.MemoryStream``)."""
+        session = _Session(sock, address)
+        with self._lock:
+            self._sessions = [s for s in self._sessions if s.alive] + [session]
+        name = f"agwpe-server-{address[1]}" if isinstance(address, tuple) else "agwpe-server-stream"
+        t = threading.Thread(target=self._serve, args=(session,), name=name, daemon=True)
+        t.start()
+        with self._lock:
+            # Drop handlers whose application has gone, as for _sessions, so the list doesn't grow per connection
+            self._threads = [th for th in self._threads if th.is_alive()] + [t]
+
+    def _serve(self, session: _Session):
+        decoder = FrameDecoder()
+        try:
+            while session.alive:
+                if not decoder.recv_into(session.sock):
+                    break
+                frames, consumed = decode_many(decoder.pending())
+                for kind, port, call_from, call_to, _user, payload, _offset in frames:
+                    self._handle(session, bytes((kind,)), port, strip_callsign(call_from), strip_callsign(call_to), bytes(payload))
+                decoder.consume(consumed)
+        except OSError:
+            pass
+        finally:
+            session.alive = False
+            session.sock.close()
+
+    def _reply(self, session: _Session, data_kind: bytes, port: int = 0, call_from: bytes = b'', call_to: bytes = b'', data: bytes = b''):
+        if session.send(encode_frame(data_kind, port, call_from, call_to, data)):
+            self._count_out(1)
+
+    def _count_out(self, n: int):
+        with self._count_lock:
+            self.frames_out += n
+
+    def _handle(self, session: _Session, kind: bytes, port: int, call_from: bytes, call_to: bytes, data: bytes):
+        with self._count_lock:
+            self.frames_in += 1
+            self.kinds_in[kind] = self.kinds_in.get(kind, 0) + 1
+        if self.muted:
+            return
+
+        if kind == b'R':
+            session.callsigns.add(call_from)
+            self._reply(session, b'X', call_from=call_from, data=b'\x01')
+        elif kind == b'M':
+            session.monitor_ports.add(port)
+        elif kind == b'k':
+            session.raw = not session.raw
+        elif kind == b'D' and not data and (port, call_from, call_to) in session.links:
+            session.links.discard((port, call_from, call_to))
+            self._reply(session, b'D', port, call_to, call_from, b'*** DISCONNECTED From Station ' + call_to + b'\r')
+        elif kind == b'D':
+            self.heard[call_from] = int(time.time())
+            self.broadcast(b'D', port, call_from, call_to, data, exclude=session)
+        elif kind == b'K':
+            self.broadcast(b'K', port, call_from, call_to, data, exclude=session)
+        elif kind == b'C' and call_to in self.unreachable:
+            self._reply(session, b'D', port, call_to, call_from, b'*** DISCONNECTED RETRYOUT With ' + call_to + b'\r')
+        elif kind == b'C':
+            session.links.add((port, call_from, call_to))
+            self._reply(session, b'C', port, call_to, call_from, b'*** CONNECTED With Station ' + call_to + b'\r')
+        elif kind == b'd':
+            if self.track_outstanding:
+                link = (port, call_from, call_to)
+                with self._count_lock:
+                    self.link_outstanding[link] = self.link_outstanding.get(link, 0) + 1
+            if self.echo_connected and (port, call_from, call_to) in session.links:
+                self._reply(session, b'd', port, call_to, call_from, data)
+        elif kind == b'H':
+            entries = sorted(self.heard.items(), key=lambda item: -item[1])[:20]
+            payload = b''.join(struct.pack('<10sI', call.ljust(10), ts) for call, ts in entries)
+            self._reply(session, b'H', port, data=payload.ljust(20 * 14, b'\0'))
+        elif kind == b'Y':
+            self._reply(session, kind, port, call_from, call_to, struct.pack('<I', self.outstanding.get(port, 0)))
+        elif kind == b'y':
+            count = self.link_outstanding.get((port, call_from, call_to), self.outstanding.get(port, 0))
+            self._reply(session, kind, port, call_from, call_to, struct.pack('<I', count))
+        elif kind == b'v':
+            self._reply(session, b'v', data=self.version.encode('ascii'))
+        elif kind == b'm':
+            self._reply(session, b'm', data=struct.pack('<II', 64 * 1024 * 1024, 8 * 1024 * 1024))
+        elif kind == b'P':
+            if len(data) >= 5:
+                param_id, value = struct.unpack('<BI', data[:5])
+                self.parameters[(port, param_id)] = value
+        elif kind == b'T':
+            parts = data.split(b'\0')
+            if len(parts) >= 2:
+                self.logins.append((parts[0].decode('ascii', errors='ignore'), parts[1].decode('ascii', errors='ignore')))
+
+    def connect_in(self, port: int, remote: str, local: str) -> bool:
+        """Emulate ``remote`` connecting to the application that registered ``local``."""
+        remote_call, local_call = remote.upper().encode('ascii'), local.upper().encode('ascii')
+        for session in self.sessions:
+            if local_call in session.callsigns:
+                session.links.add((port, local_call, remote_call))
+                self._reply(session, b'C', port, remote_call, local_call, b'*** CONNECTED To Station ' + remote_call + b'\r')
+                return True
+        return False
+
+    def disconnect_in(self, port: int, remote: str, local: str) -> bool:
+        """Emulate ``remote`` dropping its link to ``local``."""
+        link = (port, local.upper().encode('ascii'), remote.upper().encode('ascii'))
+        for session in self.sessions:
+            if link in session.links:
+                session.links.discard(link)
+                self._reply(session, b'D', port, link[2], link[1], b'*** DISCONNECTED From Station ' + link[2] + b'\r')
+                return True
+        return False
+
+    def broadcast(self, data_kind: bytes, port: int, call_from: bytes, call_to: bytes, data: bytes = b'',
+                  exclude: Optional[_Session] = None) -> int:
+        """Deliver a monitor frame to every application monitoring ``port``. Returns the number of recipients."""
+        frame = encode_frame(data_kind, port, call_from, call_to, data)
+        sent = 0
+        for session in self.sessions:
+            if session is exclude or not session.monitors(port) or (data_kind == b'K' and not session.raw):
+                continue
+            if session.send(frame):
+                sent += 1
+        self._count_out(sent)
+        return sent
+
+    def start_traffic(self, rate: float = 100.0, size_mix: Sequence[Tuple[int, int]] = DEFAULT_SIZE_MIX,
+                      ports: Optional[Sequence[int]] = None, callsigns: Sequence[str] = ("N0CALL-1", "N0CALL-2", "N0CALL-3"),
+                      kind: bytes = b'D', seed: Optional[int] = None):
+        """
+        Generate synthetic monitor traffic at ``rate`` frames/sec.
+        ``size_mix`` is a list of (payload size, weight) pairs.
+        """
+        self.stop_traffic()
+        self._traffic_stop.clear()
+        rng = random.Random(seed)
+        ports = list(ports) if ports is not None else list(range(self.radio_ports))
+        calls = [c.encode('ascii') for c in callsigns]
+        sizes = [s for s, _ in size_mix]
+        weights = [w for _, w in size_mix]
+        payloads = {size: bytes(rng.getrandbits(8) for _ in range(size)) for size in sizes}
+
+        def generate():
+            due = 0.0
+            last = time.monotonic()
+            while not self._traffic_stop.is_set():
+                now = time.monotonic()
+                due += (now - last) * rate
+                last = now
+                count = int(due)
+                if count:
+                    due -= count
+                    batch: Dict[int, list] = {}
+                    for size in rng.choices(sizes, weights, k=count):
+                        port = rng.choice(ports)
+                        call = rng.choice(calls)
+                        batch.setdefault(port, []).append((kind, port, call, b'BEACON', payloads[size]))
+                    for port, frames in batch.items():
+                        data = encode_many(frames)
+                        for session in self.sessions:
+                            if session.monitors(port) and (kind != b'K' or session.raw) and session.send(data):
+                                self._count_out(len(frames))
+                    stamp = int(time.time())
+                    for call in calls:
+                        self.heard[call] = stamp
+                self._traffic_stop.wait(_TICK)
+
+        self._traffic = threading.Thread(target=generate, name="agwpe-traffic", daemon=True)
+        self._traffic.start()
+
+    def stop_traffic(self):
+        """Stop the synthetic traffic generator."""
+        if self._traffic:
+            self._traffic_stop.set()
+            self._traffic.join()
+            self._traffic = None
@@ -0,0 +1,252 @@
+# pyagw3/session.py
+
+# PyAGW3/session.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# Connected-mode sessions
+# One object per AX.25 link keyed by (port, local call, remote call), fed by
+# the client's 'C' / 'd' / 'D' handlers: a blocking socket-like AX25Session
+# for AGWPEClient and an asyncio StreamReader/StreamWriter pair for
+# AsyncAGWPEClient. Writes go through send_stream() flow control.
+
+import asyncio
+import collections
+import threading
+from typing import Deque, Optional
+
+from .flow import DEFAULT_HIGH_WATER, DEFAULT_PACLEN
+
+STATE_CONNECTING = 'connecting'
+STATE_CONNECTED = 'connected'
+STATE_DISCONNECTED = 'disconnected'
+
+
+class AX25Session:
+    """
+    Blocking connected-mode session, created with ``AGWPEClient.open_session``
+    or handed to ``on_session`` when a remote station connects to us.
+    Received data is buffered per session; ``read``/``readline`` return b''
+    once the link is down and the buffer is empty. ``write`` waits for 'y'
+    replies, so don't call it from a callback running on the receive thread.
+    """
+    def __init__(self, client, port: int, local: bytes, remote: bytes,
+                 paclen: int = DEFAULT_PACLEN, high_water: int = DEFAULT_HIGH_WATER):
+        self.client = client
+        self.port = port
+        self.local = local.decode('ascii', errors='ignore')
+        self.remote = remote.decode('ascii', errors='ignore')
+        self.key = (port, local, remote)
+        self.paclen = paclen
+        self.high_water = high_water
+        self.state = STATE_CONNECTING
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._rx = bytearray()
+        self._cond = threading.Condition()
+
+    def __repr__(self) -> str:
+        return f"<AX25Session port={self.port} {self.local}->{self.remote} {self.state}>"
+
+    def __enter__(self) -> 'AX25Session':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def connected(self) -> bool:
+        return self.state == STATE_CONNECTED
+
+    # Called from the client's receive path
+
+    def _on_connect(self):
+        with self._cond:
+            self.state = STATE_CONNECTED
+            self._cond.notify_all()
+
+    def _on_data(self, data: bytes):
+        with self._cond:
+            self._rx += data
+            self.bytes_in += len(data)
+            self._cond.notify_all()
+
+    def _on_disconnect(self):
+        with self._cond:
+            self.state = STATE_DISCONNECTED
+            self._cond.notify_all()
+
+    def _wait(self, predicate, timeout: Optional[float]):
+        if not self._cond.wait_for(predicate, timeout):
+            raise TimeoutError(f"Timed out on link to {self.remote}")
+
+    def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the connect to complete. Returns False if the link went down instead."""
+        with self._cond:
+            self._wait(lambda: self.state != STATE_CONNECTING, timeout)
+            return self.state == STATE_CONNECTED
+
+    def read(self, n: int = -1, timeout: Optional[float] = None) -> bytes:
+        """Return up to ``n`` buffered bytes (all if ``n`` < 0), waiting for at least one."""
+        with self._cond:
+            self._wait(lambda: self._rx or self.state == STATE_DISCONNECTED, timeout)
+            if n < 0 or n >= len(self._rx):
+                data = bytes(self._rx)
+                self._rx.clear()
+            else:
+                data = bytes(self._rx[:n])
+                del self._rx[:n]
+            return data
+
+    def readline(self, sep: bytes = b'\r', timeout: Optional[float] = None) -> bytes:
+        """Return the next line including ``sep`` (AX.25 text lines end in CR), or the remainder at EOF."""
+        with self._cond:
+            self._wait(lambda: sep in self._rx or self.state == STATE_DISCONNECTED, timeout)
+            end = self._rx.find(sep)
+            end = len(self._rx) if end < 0 else end + len(sep)
+            data = bytes(self._rx[:end])
+            del self._rx[:end]
+            return data
+
+    def write(self, data, timeout: Optional[float] = None) -> int:
+        """Send bytes, a binary file or an iterable of bytes with flow control. Returns bytes sent."""
+        if self.state != STATE_CONNECTED:
+            raise ConnectionError(f"Link to {self.remote} is {self.state}")
+        sent = self.client.send_stream(self.port, self.remote, data, paclen=self.paclen,
+                                       high_water=self.high_water, timeout=timeout, src=self.local)
+        self.bytes_out += sent
+        return sent
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Disconnect and wait for the link to go down."""
+        if self.state != STATE_DISCONNECTED:
+            self.client.send_disconnect(self.port, self.remote, src=self.local)
+            with self._cond:
+                self._cond.wait_for(lambda: self.state == STATE_DISCONNECTED, timeout)
+        self.client._sessions.pop(self.key, None)
+
+
+class _SessionTransport(asyncio.Transport):
+    """
+    Transport behind an AsyncAX25Session's StreamWriter. Writes are queued and
+    sent in order by one task through ``send_stream``; the protocol is paused
+    while more than ``high_water`` bytes are queued so ``drain()`` waits.
+    """
+    def __init__(self, session: 'AsyncAX25Session', protocol: asyncio.StreamReaderProtocol, high_water: int = 16384):
+        super().__init__({'peername': (session.port, session.remote), 'sockname': (session.port, session.local)})
+        self._session = session
+        self._protocol = protocol
+        self._queue: Deque[bytes] = collections.deque()
+        self._buffered = 0
+        self._high_water = high_water
+        self._paused = False
+        self._closing = False
+        self._task: Optional[asyncio.Task] = None
+
+    def write(self, data):
+        if self._closing:
+            raise ConnectionError(f"Link to {self._session.remote} is closing")
+        if not data:
+            return
+        self._queue.append(bytes(data))
+        self._buffered += len(data)
+        if not self._paused and self._buffered > self._high_water:
+            self._paused = True
+            self._protocol.pause_writing()
+        self._pump()
+
+    def _pump(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        session = self._session
+        client = session.client
+        try:
+            while self._queue and session.state == STATE_CONNECTED:
+                data = self._queue.popleft()
+                session.bytes_out += await client.send_stream(session.port, session.remote, data,
+                                                              paclen=session.paclen, high_water=session.high_water,
+                                                              src=session.local)
+                self._buffered -= len(data)
+                if self._paused and self._buffered <= self._high_water // 4:
+                    self._paused = False
+                    self._protocol.resume_writing()
+            if self._closing and session.state == STATE_CONNECTED:
+                await client.send_disconnect(session.port, session.remote, src=session.local)
+        except Exception as e:
+            session._on_disconnect(e)
+
+    def get_write_buffer_size(self) -> int:
+        return self._buffered
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def close(self):
+        if not self._closing:
+            self._closing = True
+            self._pump()
+
+    def abort(self):
+        self._queue.clear()
+        self._buffered = 0
+        self.close()
+
+
+class AsyncAX25Session:
+    """
+    asyncio connected-mode session: ``reader`` is an asyncio.StreamReader fed
+    with the link's 'd' frames and ``writer`` an asyncio.StreamWriter whose
+    writes are flow-controlled; closing the writer disconnects the link.
+    """
+    def __init__(self, client, port: int, local: bytes, remote: bytes,
+                 paclen: int = DEFAULT_PACLEN, high_water: int = DEFAULT_HIGH_WATER):
+        loop = asyncio.get_running_loop()
+        self.client = client
+        self.port = port
+        self.local = local.decode('ascii', errors='ignore')
+        self.remote = remote.decode('ascii', errors='ignore')
+        self.key = (port, local, remote)
+        self.paclen = paclen
+        self.high_water = high_water
+        self.state = STATE_CONNECTING
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._connected = loop.create_future()
+        self.reader = asyncio.StreamReader()
+        self._protocol = asyncio.StreamReaderProtocol(self.reader)
+        self._transport = _SessionTransport(self, self._protocol)
+        self._protocol.connection_made(self._transport)
+        self.writer = asyncio.StreamWriter(self._transport, self._protocol, self.reader, loop)
+
+    def __repr__(self) -> str:
+        return f"<AsyncAX25Session port={self.port} {self.local}->{self.remote} {self.state}>"
+
+    @property
+    def connected(self) -> bool:
+        return self.state == STATE_CONNECTED
+
+    def _on_connect(self):
+        self.state = STATE_CONNECTED
+        if not self._connected.done():
+            self._connected.set_result(True)
+
+    def _on_data(self, data: bytes):
+        self.bytes_in += len(data)
+        self.reader.feed_data(data)
+
+    def _on_disconnect(self, exc: Optional[Exception] = None):
+        if self.state == STATE_DISCONNECTED:
+            return
+        self.state = STATE_DISCONNECTED
+        self.client._sessions.pop(self.key, None)
+        if not self._connected.done():
+            self._connected.set_result(False)
+        self._transport._closing = True
+        self._protocol.connection_lost(exc)
+
+    async def wait_connected(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the connect to complete. Returns False if the link went down instead."""
+        return await asyncio.wait_for(asyncio.shield(self._connected), timeout)
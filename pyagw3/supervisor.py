@@ -0,0 +1,73 @@
+# pyagw3/supervisor.py
+
+# PyAGW3/supervisor.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# Reconnect support
+# Records the session-defining frames an application sends (R/x, M, k, T, P)
+# so they can be replayed after an automatic reconnect, plus the offline send
+# policies and the exponential backoff used by connect()
+
+import random
+from typing import Dict, List, Optional, Tuple
+
+# What happens to frames sent while the client is offline
+OFFLINE_DROP = 'drop'
+OFFLINE_BUFFER = 'buffer'
+OFFLINE_REJECT = 'reject'
+OFFLINE_POLICIES = (OFFLINE_DROP, OFFLINE_BUFFER, OFFLINE_REJECT)
+
+# Data kinds that change server-side session state; these are recorded and replayed, never buffered
+SESSION_KINDS = frozenset((b'R', b'x', b'M', b'k', b'T', b'P'))
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: Optional[float] = None) -> float:
+    """Exponential backoff with jitter for retry ``attempt`` (1-based)."""
+    delay = base_delay * (2 ** (attempt - 1))
+    if max_delay is not None:
+        delay = min(delay, max_delay)
+    return delay + random.uniform(0, base_delay)
+
+
+class SessionState:
+    """
+    Server-side state established by an application, in replay order:
+    login (authenticated before anything else, as on a fresh connect),
+    callsign registrations, monitored ports, raw enable, parameters.
+    Repeated frames overwrite earlier ones, so replay sends each item once.
+    """
+    def __init__(self):
+        self.callsigns: Dict[bytes, None] = {}
+        self.monitor_ports: Dict[int, None] = {}
+        self.raw = False
+        self.login: Optional[bytes] = None
+        self.parameters: Dict[Tuple[int, int], bytes] = {}
+
+    def record(self, data_kind: bytes, port: int, call_from: bytes, data: bytes):
+        if data_kind == b'R':
+            self.callsigns[call_from] = None
+        elif data_kind == b'x':
+            self.callsigns.pop(call_from, None)
+        elif data_kind == b'M':
+            self.monitor_ports[port] = None
+        elif data_kind == b'k':
+            self.raw = not self.raw
+        elif data_kind == b'T':
+            self.login = data
+        elif data_kind == b'P' and data:
+            self.parameters[(port, data[0])] = data
+
+    def replay_frames(self) -> List[tuple]:
+        """(data_kind, port, call_from, call_to, data) frames that re-establish this state on a fresh connection."""
+        frames = [] if self.login is None else [(b'T', 0, b'', b'', self.login)]
+        frames += [(b'R', 0, call, b'', b'') for call in self.callsigns]
+        frames += [(b'M', port, b'', b'', b'') for port in self.monitor_ports]
+        if self.raw:
+            frames.append((b'k', 0, b'', b'', b''))
+        frames += [(b'P', port, b'', b'', data) for (port, _), data in self.parameters.items()]
+        return frames
+
+    def clear(self):
+        self.__init__()
@@ -0,0 +1,471 @@
+# pyagw3/transport.py
+
+# PyAGW3/transport.py
+# GNU Lesser General Public License v3.0 or later
+# Copyright (C) 2025-2026 Kris Kirby, KE4AHR
+# SPDX-License-Identifier: LGPL-3.0-or-later
+#
+# Pluggable transports
+# A transport opens the byte stream AGWPEClient speaks the AGWPE API over:
+# anything with socket-style sendall/sendmsg/recv_into/shutdown/close.
+# TCP and Unix domain sockets reach an AGWPE server; the in-memory pair
+# connects to an in-process peer without the kernel (tests, benchmarks);
+# the KISS back ends talk to a TNC directly over a serial port or
+# KISS-over-TCP, answering the AGWPE requests locally and converting
+# between AX.25 frames and AGWPE 'K'/'U'/'I'/'S' frames, so no AGWPE server
+# is needed at all.
+
+import collections
+import errno
+import logging
+import os
+import re
+import select
+import socket
+import threading
+import time
+from typing import Callable, Deque, List, Optional, Set, Tuple
+
+from .ax25 import FRAME_I, FRAME_U, build_ui, decode
+from .codec import decode_many, encode_frame, strip_callsign
+from .decoder import FrameDecoder
+
+logger = logging.getLogger('AGWPE')
+
+FEND = 0xC0
+FESC = 0xDB
+TFEND = 0xDC
+TFESC = 0xDD
+# KISS command nibble of a data frame
+KISS_DATA = 0x00
+
+KISS_VERSION = b"PyAGW3 KISS"
+# Default baud rate of a KISS serial port
+DEFAULT_SERIAL_BAUD = 9600
+
+_ESCAPED = re.compile(bytes([FESC]) + b'(.)', re.DOTALL)
+_UNESCAPE = {TFEND: bytes([FEND]), TFESC: bytes([FESC])}
+
+
+class Transport:
+    """Opens a connected byte stream for an AGWPEClient; called again for every reconnect."""
+    def open(self):
+        raise NotImplementedError
+
+
+class TCPTransport(Transport):
+    """AGWPE server over TCP (the default), with keepalive probing a dead peer within a few minutes."""
+    def __init__(self, host: str = "127.0.0.1", port: int = 8000, keepalive: bool = True):
+        self.host = host
+        self.port = port
+        self.keepalive = keepalive
+
+    def __str__(self):
+        return f"{self.host}:{self.port}"
+
+    def open(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            if self.keepalive:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+                # Platform-specific tuning
+                if hasattr(socket, 'TCP_KEEPIDLE'):
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 60)
+                if hasattr(socket, 'TCP_KEEPINTVL'):
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
+                if hasattr(socket, 'TCP_KEEPCNT'):
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 5)
+            sock.connect((self.host, self.port))
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+
+class UnixTransport(Transport):
+    """AGWPE server on a Unix domain socket ``path``, for a co-located modem."""
+    def __init__(self, path: str):
+        self.path = path
+
+    def __str__(self):
+        return f"unix:{self.path}"
+
+    def open(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except Exception:
+            sock.close()
+            raise
+        return sock
+
+
+class MemoryStream:
+    """
+    One end of an in-process stream pair (see ``memory_pair``). Written
+    ``bytes`` are queued by reference and copied once, into the reader's
+    buffer; other buffers are copied on write since the caller may reuse them.
+    """
+    def __init__(self):
+        self.peer: Optional['MemoryStream'] = None
+        self._chunks: Deque[memoryview] = collections.deque()
+        self._cond = threading.Condition()
+        self._eof = False        # nothing more will arrive
+        self._closed = False
+
+    def _push(self, data) -> int:
+        chunk = memoryview(data if isinstance(data, bytes) else bytes(data))
+        with self._cond:
+            if self._closed or self._eof:
+                raise BrokenPipeError(errno.EPIPE, "Stream closed")
+            if chunk:
+                self._chunks.append(chunk)
+                self._cond.notify()
+        return len(chunk)
+
+    def sendall(self, data):
+        if self._closed:
+            raise OSError(errno.EBADF, "Stream closed")
+        self.peer._push(data)
+
+    def sendmsg(self, buffers) -> int:
+        if self._closed:
+            raise OSError(errno.EBADF, "Stream closed")
+        return sum(self.peer._push(b) for b in buffers)
+
+    def recv_into(self, buffer, nbytes: int = 0) -> int:
+        view = memoryview(buffer).cast('B')
+        limit = nbytes or len(view)
+        with self._cond:
+            while not self._chunks and not self._eof:
+                self._cond.wait()
+            n = 0
+            chunks = self._chunks
+            while chunks and n < limit:
+                chunk = chunks[0]
+                take = min(len(chunk), limit - n)
+                view[n:n + take] = chunk[:take]
+                n += take
+                if take == len(chunk):
+                    chunks.popleft()
+                else:
+                    chunks[0] = chunk[take:]
+            return n
+
+    def recv(self, bufsize: int) -> bytes:
+        buffer = bytearray(bufsize)
+        return bytes(buffer[:self.recv_into(buffer)])
+
+    def _finish(self):
+        """No more data will arrive at this end once the queue is drained."""
+        with self._cond:
+            self._eof = True
+            self._cond.notify_all()
+
+    def shutdown(self, how: int = socket.SHUT_RDWR):
+        if how in (socket.SHUT_RD, socket.SHUT_RDWR):
+            with self._cond:
+                self._chunks.clear()
+            self._finish()
+        if how in (socket.SHUT_WR, socket.SHUT_RDWR) and self.peer is not None:
+            self.peer._finish()
+
+    def close(self):
+        if not self._closed:
+            self.shutdown(socket.SHUT_RDWR)
+            self._closed = True
+
+    def setsockopt(self, *args):
+        pass
+
+
+def memory_pair() -> Tuple[MemoryStream, MemoryStream]:
+    """Two connected in-process stream ends."""
+    a, b = MemoryStream(), MemoryStream()
+    a.peer, b.peer = b, a
+    return a, b
+
+
+class MemoryTransport(Transport):
+    """
+    In-process transport: each ``open()`` creates a ``memory_pair`` and
+    passes the far end to ``accept``, e.g. ``AGWPEServer.serve_stream``.
+    """
+    def __init__(self, accept: Callable[[MemoryStream], None]):
+        self.accept = accept
+
+    def __str__(self):
+        return "memory"
+
+    def open(self) -> MemoryStream:
+        near, far = memory_pair()
+        self.accept(far)
+        return near
+
+
+# KISS
+
+def kiss_escape(data) -> bytes:
+    return bytes(data).replace(b'\xdb', b'\xdb\xdd').replace(b'\xc0', b'\xdb\xdc')
+
+
+def kiss_unescape(data) -> bytes:
+    return _ESCAPED.sub(lambda m: _UNESCAPE.get(m.group(1)[0], m.group(1)), bytes(data))
+
+
+def kiss_frame(port: int, frame, command: int = KISS_DATA) -> bytes:
+    """One FEND-delimited KISS frame carrying ``frame`` (bare AX.25, no KISS byte) for TNC ``port``."""
+    return b'\xc0' + kiss_escape(bytes([(port & 0x0F) << 4 | command & 0x0F]) + bytes(frame)) + b'\xc0'
+
+
+class KISSDecoder:
+    """Splits a KISS byte stream into unescaped frames (KISS command byte first)."""
+    def __init__(self):
+        self._partial = bytearray()
+
+    def feed(self, data) -> List[bytes]:
+        self._partial += data
+        if FEND not in data:
+            return []
+        *frames, self._partial = self._partial.split(b'\xc0')
+        self._partial = bytearray(self._partial)
+        return [kiss_unescape(f) for f in frames if f]
+
+
+def monitor_text(port: int, frame) -> Tuple[bytes, bytes]:
+    """(data kind, payload) of the AGWPE monitor frame describing a decoded AX.25 ``frame``."""
+    if frame.frame_type == FRAME_I:
+        kind = b'I'
+        desc = f"I R{frame.control >> 5 & 7} S{frame.control >> 1 & 7} pid={frame.pid:02X} Len={len(frame.info)} "
+    elif frame.name == 'UI':
+        kind = b'U'
+        desc = f"UI pid={frame.pid:02X} Len={len(frame.info)} "
+    else:
+        kind = b'S'
+        desc = f"{frame.name} R{frame.control >> 5 & 7} " if frame.frame_type != FRAME_U else f"{frame.name} "
+    via = f" Via {','.join(frame.digipeaters)}" if frame.digipeaters else ""
+    line = f"{port + 1}:Fm {frame.src} To {frame.dest}{via} <{desc}>[{time.strftime('%H:%M:%S')}]\r"
+    return kind, line.encode('ascii', errors='replace') + frame.info
+
+
+class _FdDevice:
+    """Serial port (or pty) file descriptor."""
+    def __init__(self, fd: int):
+        self.fd = fd
+
+    def fileno(self) -> int:
+        return self.fd
+
+    def read(self) -> bytes:
+        return os.read(self.fd, 4096)
+
+    def write(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self.fd, view):]
+
+    def close(self):
+        os.close(self.fd)
+
+
+class _SocketDevice:
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def read(self) -> bytes:
+        return self.sock.recv(4096)
+
+    def write(self, data: bytes):
+        self.sock.sendall(data)
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class KISSStream:
+    """
+    AGWPE-speaking stream over a KISS ``device``. Requests written by the
+    client are answered locally ('R' -> 'X', 'Y'/'y' -> 0 outstanding, 'v',
+    'm', 'H') or sent to the TNC ('K' raw frames, 'D' UI frames). Frames
+    from the TNC are delivered as monitor text ('U'/'I'/'S') on monitored
+    ports and, with raw enabled, as 'K'. Connected mode needs an AX.25 link
+    layer the TNC doesn't have: 'C' is refused with a retry-out 'D'.
+    """
+    def __init__(self, device, name: str = "kiss"):
+        self.device = device
+        self.name = name
+        self.callsigns: Set[bytes] = set()
+        self.monitor_ports: Set[int] = set()
+        self.raw = False
+        self._inbox, self._replies = memory_pair()
+        self._requests = FrameDecoder()
+        self._write_lock = threading.Lock()
+        self._running = True
+        self._reader = threading.Thread(target=self._read_loop, name=f"agwpe-kiss-{name}", daemon=True)
+        self._reader.start()
+
+    # Client side
+
+    def recv_into(self, buffer, nbytes: int = 0) -> int:
+        return self._inbox.recv_into(buffer, nbytes)
+
+    def sendall(self, data):
+        self.sendmsg((data,))
+
+    def sendmsg(self, buffers) -> int:
+        n = 0
+        with self._write_lock:
+            for data in buffers:
+                n += self._requests.feed(data)
+            frames, consumed = decode_many(self._requests.pending())
+            for kind, port, call_from, call_to, _user, payload, _offset in frames:
+                self._request(bytes((kind,)), port, strip_callsign(call_from), strip_callsign(call_to), bytes(payload))
+            self._requests.consume(consumed)
+        return n
+
+    def shutdown(self, how: int = socket.SHUT_RDWR):
+        self.close()
+
+    def close(self):
+        if not self._running:
+            return
+        self._running = False
+        self._inbox.close()
+        self._reader.join(timeout=2)
+        self.device.close()
+
+    def setsockopt(self, *args):
+        pass
+
+    # AGWPE requests
+
+    def _reply(self, data_kind: bytes, port: int = 0, call_from: bytes = b'', call_to: bytes = b'', data: bytes = b''):
+        try:
+            self._replies.sendall(encode_frame(data_kind, port, call_from, call_to, data))
+        except OSError:
+            pass
+
+    def _request(self, kind: bytes, port: int, call_from: bytes, call_to: bytes, data: bytes):
+        if kind == b'K':
+            if data:
+                self.device.write(kiss_frame(port, data[1:], data[0] & 0x0F))
+        elif kind == b'D' and data:
+            frame = build_ui(call_to.decode('ascii', 'replace'), call_from.decode('ascii', 'replace'),
+                             data[1:], data[0])
+            self.device.write(kiss_frame(port, frame[1:]))
+        elif kind == b'R':
+            self.callsigns.add(call_from)
+            self._reply(b'X', call_from=call_from, data=b'\x01')
+        elif kind == b'x':
+            self.callsigns.discard(call_from)
+        elif kind == b'M':
+            self.monitor_ports.add(port)
+        elif kind == b'k':
+            self.raw = not self.raw
+        elif kind in (b'Y', b'y'):
+            # The TNC's queue isn't visible over KISS
+            self._reply(kind, port, call_from, call_to, bytes(4))
+        elif kind == b'v':
+            self._reply(b'v', data=KISS_VERSION)
+        elif kind == b'm':
+            self._reply(b'm', data=bytes(8))
+        elif kind == b'H':
+            self._reply(b'H', port)
+        elif kind == b'C':
+            self._reply(b'D', port, call_to, call_from, b'*** DISCONNECTED RETRYOUT With ' + call_to + b'\r')
+        elif logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[AGWPE] {self.name}: {kind.decode()} frame not supported over KISS")
+
+    # TNC frames
+
+    def _read_loop(self):
+        decoder = KISSDecoder()
+        fd = self.device.fileno()
+        try:
+            while self._running:
+                ready, _, _ = select.select([fd], [], [], 0.2)
+                if not ready:
+                    continue
+                data = self.device.read()
+                if not data:
+                    break
+                for frame in decoder.feed(data):
+                    self._deliver(frame)
+        except OSError as e:
+            if self._running:
+                logger.error(f"[AGWPE] {self.name}: read failed: {e}")
+        finally:
+            # End of stream for the client
+            self._replies.shutdown(socket.SHUT_WR)
+
+    def _deliver(self, frame: bytes):
+        command, port = frame[0] & 0x0F, frame[0] >> 4
+        if command != KISS_DATA or port not in self.monitor_ports:
+            return
+        try:
+            decoded = decode(frame, kiss=True)
+        except ValueError:
+            return
+        src, dest = decoded.src.encode('ascii', 'replace'), decoded.dest.encode('ascii', 'replace')
+        kind, text = monitor_text(port, decoded)
+        self._reply(kind, port, src, dest, text)
+        if self.raw:
+            self._reply(b'K', port, src, dest, bytes([KISS_DATA]) + frame[1:])
+
+
+class KISSTransport(Transport):
+    """Base of the KISS back ends: ``_device()`` opens the TNC connection."""
+    def _device(self):
+        raise NotImplementedError
+
+    def open(self) -> KISSStream:
+        return KISSStream(self._device(), str(self))
+
+
+class KISSSerialTransport(KISSTransport):
+    """KISS TNC on serial port ``path`` (a pty works too) at ``baud``, 8N1, raw mode."""
+    def __init__(self, path: str, baud: int = DEFAULT_SERIAL_BAUD):
+        self.path = path
+        self.baud = baud
+
+    def __str__(self):
+        return f"kiss:{self.path}"
+
+    def _device(self) -> _FdDevice:
+        import termios
+        import tty
+
+        fd = os.open(self.path, os.O_RDWR | os.O_NOCTTY)
+        try:
+            tty.setraw(fd)
+            attrs = termios.tcgetattr(fd)
+            speed = getattr(termios, f"B{self.baud}")
+            attrs[4] = attrs[5] = speed
+            attrs[2] |= termios.CLOCAL | termios.CREAD
+            termios.tcsetattr(fd, termios.TCSANOW, attrs)
+        except Exception:
+            os.close(fd)
+            raise
+        return _FdDevice(fd)
+
+
+class KISSTCPTransport(KISSTransport):
+    """KISS over TCP, e.g. a soundcard modem's KISS port."""
+    def __init__(self, host: str = "127.0.0.1", port: int = 8001):
+        self.host = host
+        self.port = port
+
+    def __str__(self):
+        return f"kiss:{self.host}:{self.port}"
+
+    def _device(self) -> _SocketDevice:
+        sock = socket.create_connection((self.host, self.port))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return _SocketDevice(sock)
@@ -0,0 +1,92 @@
+import asyncio
+import pytest
+
+from pyagw3.aio import AsyncAGWPEClient
+from pyagw3.codec import decode_many, encode_frame, strip_callsign
+
+class FakeServer:
+    """Minimal asyncio AGWPE peer recording the frames it receives."""
+    def __init__(self):
+        self.received = []
+        self.writer = None
+        self.connected = asyncio.Event()
+
+    async def handle(self, reader, writer):
+        self.writer = writer
+        self.connected.set()
+        buf = b''
+        while True:
+            data = await reader.read(4096)
+            if not data:
+                break
+            buf += data
+            frames, consumed = decode_many(buf)
+            self.received.extend((bytes([k]), p, strip_callsign(f), strip_callsign(t), bytes(d)) for k, p, f, t, _u, d, _o in frames)
+            buf = buf[consumed:]
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, '127.0.0.1', 0)
+        return self.server.sockets[0].getsockname()[1]
+
+def run(coro):
+    return asyncio.run(asyncio.wait_for(coro, 5))
+
+def test_async_connect_registers_and_sends():
+    async def scenario():
+        server = FakeServer()
+        port = await server.start()
+        client = AsyncAGWPEClient(port=port, callsign="test")
+        assert await client.connect(max_retries=0)
+        await client.send_ui(port=1, dest="BEACON", src="TEST", pid=0xF0, info=b"hi")
+        await client.send_connected_data(0, "n0call", b"data")
+        await client.request_heard_stations(2)
+        await client.close()
+        await asyncio.sleep(0.05)
+        server.server.close()
+        return server.received
+    received = run(scenario())
+    assert received[0] == (b'R', 0, b'TEST', b'', b'')
+    assert received[1] == (b'D', 1, b'TEST', b'BEACON', b'\xf0hi')
+    assert received[2] == (b'd', 0, b'TEST', b'N0CALL', b'data')
+    assert received[3] == (b'H', 2, b'', b'', b'')
+
+def test_async_callbacks_and_frame_iterator():
+    async def scenario():
+        server = FakeServer()
+        port = await server.start()
+        client = AsyncAGWPEClient(port=port)
+        connected = []
+        client.on_connected_data = lambda p, call, data: connected.append((p, call, data))
+        assert await client.connect(max_retries=0)
+        incoming = client.frames()
+        await server.connected.wait()
+        stream = encode_frame(b'D', 0, b'N0CALL', b'APRS', b'one') + encode_frame(b'd', 1, b'PEER', b'TEST', b'linked') \
+            + encode_frame(b'K', 2, b'A', b'B', b'\x00\x01')
+        server.writer.write(stream[:50])
+        await server.writer.drain()
+        await asyncio.sleep(0.01)
+        server.writer.write(stream[50:])
+        await server.writer.drain()
+        frames = []
+        async for frame in incoming:
+            frames.append((frame.data_kind, frame.port, frame.call_from, frame.data))
+            if len(frames) == 2:
+                server.writer.close()
+        server.server.close()
+        return frames, connected, client.connected
+    frames, connected, still_connected = run(scenario())
+    assert frames == [(b'D', 0, b'N0CALL', b'one'), (b'K', 2, b'A', b'\x00\x01')]
+    assert connected == [(1, "PEER", b"linked")]
+    assert not still_connected
+
+def test_async_connect_backoff_uses_asyncio_sleep(monkeypatch):
+    delays = []
+    async def fake_sleep(delay):
+        delays.append(delay)
+    monkeypatch.setattr(asyncio, 'sleep', fake_sleep)
+    monkeypatch.setattr('random.uniform', lambda a, b: 0)
+    async def scenario():
+        client = AsyncAGWPEClient(port=1)
+        return await client.connect(max_retries=2, base_delay=0.1)
+    assert run(scenario()) is False
+    assert delays == [0.1, 0.2]
@@ -0,0 +1,139 @@
+import pytest
+
+from pyagw3 import ax25
+from pyagw3.ax25 import FRAME_I, FRAME_S, FRAME_U, address_columns, decode, decode_batch
+
+
+def address(call, ssid=0, last=False, h=False):
+    return bytes(b << 1 for b in call.ljust(6).encode()) + bytes([0x60 | (h << 7) | (ssid << 1) | int(last)])
+
+
+def frame(dest, src, digis=(), control=0x03, tail=b'\xf0hello', kiss=True):
+    addresses = [address(*dest), address(*src, last=not digis)]
+    for i, (call, ssid, h) in enumerate(digis):
+        addresses.append(address(call, ssid, last=i == len(digis) - 1, h=h))
+    return (b'\x00' if kiss else b'') + b''.join(addresses) + bytes([control]) + tail
+
+
+def test_decodes_ui_frame_with_path():
+    f = decode(frame(('APRS', 0), ('N0CALL', 9), digis=[('WIDE1', 1, True), ('WIDE2', 2, False)]))
+    assert (f.dest, f.src, f.digipeaters) == ('APRS', 'N0CALL-9', ('WIDE1-1*', 'WIDE2-2'))
+    assert (f.control, f.pid, f.info) == (0x03, 0xF0, b'hello')
+    assert (f.frame_type, f.name) == (FRAME_U, 'UI')
+    assert f.path == 'N0CALL-9>APRS,WIDE1-1*,WIDE2-2'
+
+
+def test_control_field_types():
+    i_frame = decode(frame(('KE4AHR', 0), ('N0CALL', 1), control=0x20, tail=b'\xf0data'))
+    assert (i_frame.frame_type, i_frame.pid, i_frame.info) == (FRAME_I, 0xF0, b'data')
+    rr = decode(frame(('KE4AHR', 0), ('N0CALL', 1), control=0x41, tail=b''))
+    assert (rr.frame_type, rr.name, rr.pid, rr.info) == (FRAME_S, 'RR', None, b'')
+    sabm = decode(frame(('KE4AHR', 0), ('N0CALL', 1), control=0x3F, tail=b''))
+    assert sabm.name == 'SABM'
+
+
+def test_bare_frames_and_errors():
+    assert decode(frame(('CQ', 0), ('N0CALL', 0), kiss=False), kiss=False).src == 'N0CALL'
+    with pytest.raises(ValueError):
+        decode(b'\x00' + address('CQ'))
+    with pytest.raises(ValueError):
+        decode(frame(('CQ', 0), ('N0CALL', 0), control=0x03, tail=b'')[:-1])
+
+
+def test_address_end_limits_digipeaters():
+    digis = [('WIDE', n % 8, False) for n in range(9)]
+    assert ax25.address_end(frame(('CQ', 0), ('N0CALL', 0), digis=digis)) == -1
+
+
+def test_batch_matches_single_decode():
+    payloads = [frame(('APRS', 0), ('N0CALL', n % 16), digis=[('WIDE1', 1, n % 2 == 0)], tail=b'\xf0%d' % n)
+                for n in range(50)]
+    payloads.insert(10, b'\x00garbage')
+    # Same addresses in a row with other control fields, and one cut off after the address block
+    link = frame(('KE4AHR', 0), ('N0CALL', 1), control=0x20, tail=b'\xf0data')
+    payloads += [link, frame(('KE4AHR', 0), ('N0CALL', 1), control=0x41, tail=b''), link[:-6], link]
+    decoded = decode_batch(payloads)
+    assert decoded[10] is None and decoded[-2] is None
+    valid = payloads[:10] + payloads[11:-2] + payloads[-1:]
+    assert decoded[:10] + decoded[11:-2] + decoded[-1:] == [decode(p) for p in valid]
+
+
+def test_address_columns_without_numpy():
+    payloads = [frame(('APRS', 0), ('N0CALL', 9)), b'\x00', frame(('CQ', 0), ('KE4AHR', 0))]
+    columns = address_columns(payloads, use_numpy=False)
+    assert columns == {'dest': [b'APRS', b'', b'CQ'], 'dest_ssid': [0, 0, 0],
+                       'src': [b'N0CALL', b'', b'KE4AHR'], 'src_ssid': [9, 0, 0]}
+
+
+def test_address_columns_with_numpy():
+    pytest.importorskip('numpy')
+    payloads = [frame(('APRS', 0), ('N0CALL', 9)), frame(('CQ', 0), ('KE4AHR', 0))]
+    columns = address_columns(payloads, use_numpy=True)
+    assert list(columns['src']) == [b'N0CALL', b'KE4AHR']
+    assert list(columns['src_ssid']) == [9, 0]
+    assert list(columns['dest']) == [b'APRS', b'CQ']
+
+
+def test_numpy_required_when_requested(monkeypatch):
+    monkeypatch.setattr(ax25, 'numpy', None)
+    with pytest.raises(ImportError):
+        address_columns([], use_numpy=True)
+
+
+def test_encode_address_bits():
+    assert ax25.encode_address('N0CALL-9', last=True) == address('N0CALL', 9, last=True)
+    assert ax25.encode_address('wide1-1', high_bit=True) == address('WIDE1', 1, h=True)
+    for bad in ('TOOLONGCALL', 'N0CALL-16', ''):
+        with pytest.raises(ValueError):
+            ax25.encode_address(bad)
+
+
+def test_builders_round_trip():
+    ui = ax25.build_ui('APRS', 'N0CALL-9', b'hello', path=['WIDE1-1*', 'WIDE2-2'])
+    assert decode(ui) == ax25.AX25Frame('APRS', 'N0CALL-9', ('WIDE1-1*', 'WIDE2-2'), 0x03, 0xF0, b'hello')
+    i_frame = decode(ax25.build_i('KE4AHR', 'N0CALL', ns=2, nr=5, info=b'data', poll=True))
+    assert (i_frame.frame_type, i_frame.control, i_frame.info) == (FRAME_I, 5 << 5 | 0x10 | 2 << 1, b'data')
+    rej = decode(ax25.build_s('KE4AHR', 'N0CALL', 'REJ', nr=3))
+    assert (rej.name, rej.control >> 5) == ('REJ', 3)
+    assert ax25.build_ui('CQ', 'N0CALL', kiss_port=2)[0] == 0x20
+
+
+def test_address_blocks_are_cached():
+    ax25.address_block.cache_clear()
+    for n in range(100):
+        ax25.build_ui('BEACON', 'N0CALL', b'%d' % n, path=('WIDE2-1',))
+    info = ax25.address_block.cache_info()
+    assert (info.misses, info.hits) == (1, 99)
+
+
+def test_command_response_bits():
+    command = ax25.address_block('KE4AHR', 'N0CALL')
+    response = ax25.address_block('KE4AHR', 'N0CALL', command=False)
+    assert (command[6] & 0x80, command[13] & 0x80) == (0x80, 0)
+    assert (response[6] & 0x80, response[13] & 0x80) == (0, 0x80)
+
+
+def test_client_send_raw_ui():
+    from pyagw3.agwpe import AGWPEClient
+    from pyagw3.codec import pad_callsign
+    from pyagw3.server import AGWPEServer
+    from .test_server import wait_for
+
+    assert pad_callsign('n0call') is pad_callsign('n0call')
+    with AGWPEServer() as server:
+        monitor = AGWPEClient(port=server.port)
+        sender = AGWPEClient(port=server.port)
+        received = []
+        monitor.on_frame = lambda f: received.append(f)
+        try:
+            assert monitor.connect(max_retries=0) and sender.connect(max_retries=0)
+            monitor.send_raw_enable()
+            monitor.send_monitor(0)
+            assert wait_for(lambda: any(s.raw and s.monitors(0) for s in server.sessions))
+            sender.send_raw_ui(0, 'BEACON', 'N0CALL-1', b'telemetry', path=('WIDE2-1',))
+            assert wait_for(lambda: received)
+        finally:
+            monitor.close()
+            sender.close()
+    decoded = decode(received[0].data)
+    assert (decoded.dest, decoded.src, decoded.digipeaters, decoded.info) == ('BEACON', 'N0CALL-1', ('WIDE2-1',), b'telemetry')
@@ -0,0 +1,26 @@
+import json
+
+from pyagw3 import bench
+
+def test_receive_path_rows():
+    rows = bench.bench_receive_path(count=50, payload_sizes=(0, 64), splits={"bulk": 4096, "tiny": 7})
+    assert [(r["payload"], r["split"]) for r in rows] == [(0, "bulk"), (0, "tiny"), (64, "bulk"), (64, "tiny")]
+    assert all(r["frames_per_sec"] > 0 for r in rows)
+
+def test_socket_receive_and_round_trip():
+    assert bench.bench_socket_receive(count=50, payload_sizes=(256,))[0]["frames_per_sec"] > 0
+    rt = bench.bench_round_trip(count=20)
+    assert rt["count"] == 20
+    assert 0 < rt["p50_us"] <= rt["p99_us"] <= rt["max_us"]
+
+def test_percentile():
+    samples = list(range(1, 101))
+    assert bench._percentile(samples, 50) == 51
+    assert bench._percentile(samples, 99) == 99
+
+def test_main_writes_json(tmp_path, monkeypatch):
+    monkeypatch.setattr(bench, "run", lambda quick: {"meta": {"quick": quick}})
+    out = tmp_path / "results.json"
+    monkeypatch.setattr(bench, "_print_report", lambda results: None)
+    bench.main(["--quick", "--output", str(out)])
+    assert json.loads(out.read_text()) == {"meta": {"quick": True}}
@@ -0,0 +1,114 @@
+import os
+import struct
+
+import pytest
+
+from pyagw3.agwpe import AGWPEClient
+from pyagw3.capture import (FILE_HEADER, RECORD_HEADER, SEGMENT_MAGIC, CaptureWriter, index_path,
+                            list_segments, read_index)
+from pyagw3.codec import encode_frame
+
+
+def read_records(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, _ = FILE_HEADER.unpack_from(data)
+    assert magic == SEGMENT_MAGIC
+    pos = FILE_HEADER.size
+    records = []
+    while pos < len(data):
+        ts, n = RECORD_HEADER.unpack_from(data, pos)
+        records.append((pos, ts, data[pos + RECORD_HEADER.size:pos + RECORD_HEADER.size + n]))
+        pos += RECORD_HEADER.size + n
+    return records
+
+
+def feed(client, frames):
+    client._decoder.feed(b''.join(encode_frame(*f) for f in frames))
+    client._process_pending()
+
+
+def test_records_monitor_frames_with_index(tmp_path):
+    client = AGWPEClient()
+    writer = CaptureWriter(str(tmp_path), index_interval=0)
+    writer.attach(client)
+    frames = [(b'U', 0, b'N0CALL-1', b'CQ', b'one'), (b'v', 0, b'', b'', b'version'),
+              (b'K', 1, b'KE4AHR', b'N0CALL-1', b'\x00raw'), (b'D', 0, b'W1AW', b'BEACON', b'')]
+    feed(client, frames)
+    writer.close()
+    assert client._taps == ()
+
+    [segment] = list_segments(str(tmp_path))
+    records = read_records(segment)
+    assert [r[2] for r in records] == [encode_frame(*f) for f in (frames[0], frames[2], frames[3])]
+    assert writer.frames == 3 and writer.dropped == 0
+
+    index = read_index(segment)
+    assert index.records == 3
+    assert list(index.offsets) == [r[0] for r in records]
+    assert index.first_ns == records[0][1] and index.last_ns == records[-1][1]
+    assert list(index.callsigns[b'N0CALL-1']) == [records[0][0], records[1][0]]
+    assert list(index.callsigns[b'W1AW']) == [records[2][0]]
+
+
+def test_segment_rotation_and_append_only(tmp_path):
+    frame = (b'U', 0, b'N0CALL', b'CQ', bytes(200))
+    writer = CaptureWriter(str(tmp_path), segment_bytes=1000, buffer_bytes=1)
+    for _ in range(12):
+        writer.record(encode_frame(*frame))
+        writer.flush(timeout=5)
+    writer.close()
+    segments = list_segments(str(tmp_path))
+    assert len(segments) > 2
+    assert all(os.path.exists(index_path(s)) for s in segments)
+    assert sum(read_index(s).records for s in segments) == 12
+
+    again = CaptureWriter(str(tmp_path))
+    again.record(encode_frame(*frame))
+    again.close()
+    assert list_segments(str(tmp_path))[:-1] == segments
+    assert len(read_records(list_segments(str(tmp_path))[-1])) == 1
+
+
+def test_drops_instead_of_blocking_when_behind(tmp_path):
+    writer = CaptureWriter(str(tmp_path), max_pending_bytes=100, flush_interval=10, buffer_bytes=10 ** 6)
+    frame = encode_frame(b'U', 0, b'A', b'B', bytes(50))
+    for _ in range(3):
+        writer.record(frame)
+    assert writer.dropped == 2
+    writer.close()
+    assert writer.frames == 1
+
+
+def test_rejects_oversized_segments(tmp_path):
+    with pytest.raises(ValueError):
+        CaptureWriter(str(tmp_path), segment_bytes=2 ** 32)
+
+
+def test_large_write_is_split_across_segments(tmp_path):
+    frame = encode_frame(b'U', 0, b'N0CALL', b'CQ', bytes(200))
+    # Everything reaches the writer thread as one chunk several segments long
+    writer = CaptureWriter(str(tmp_path), segment_bytes=1000, flush_interval=10, buffer_bytes=10 ** 6)
+    for _ in range(20):
+        writer.record(frame)
+    writer.close()
+    segments = list_segments(str(tmp_path))
+    assert len(segments) >= 4
+    for segment in segments:
+        index = read_index(segment)
+        assert max(index.offsets) < 1000
+        assert all(r[0] < 1000 for r in read_records(segment))
+    assert sum(read_index(s).records for s in segments) == writer.frames == 20
+
+
+def test_write_errors_are_surfaced(tmp_path):
+    writer = CaptureWriter(str(tmp_path))
+    # Occupy the name of the first segment so opening it fails in the writer thread
+    open(os.path.join(str(tmp_path), "capture-000000.agwcap"), 'wb').close()
+    writer.record(encode_frame(b'U', 0, b'N0CALL', b'CQ', b'x'))
+    with pytest.raises(FileExistsError):
+        writer.flush(timeout=5)
+    writer.record(encode_frame(b'U', 0, b'N0CALL', b'CQ', b'y'))
+    assert writer.dropped == 1
+    with pytest.raises(FileExistsError):
+        writer.close()
@@ -0,0 +1,57 @@
+import struct
+import pytest
+
+from pyagw3.codec import HEADER, HEADER_LEN, encode_header, encode_frame, encode_many, decode_header, decode_many, strip_callsign
+
+def test_header_layout_matches_wire_format():
+    header = encode_header(b'D', port=2, call_from=b'SOURCE', call_to=b'DEST', data_len=6)
+    expected = bytearray(36)
+    expected[0:1] = b'D'
+    struct.pack_into('<I', expected, 4, 2)
+    expected[8:18] = b'SOURCE    '
+    expected[18:28] = b'DEST      '
+    struct.pack_into('<I', expected, 28, 6)
+    assert HEADER_LEN == 36
+    assert header == bytes(expected)
+
+def test_callsigns_truncated_to_ten_bytes():
+    header = encode_header(b'D', call_from=b'ABCDEFGHIJKLM')
+    assert header[8:18] == b'ABCDEFGHIJ'
+
+def test_encode_frame_appends_data():
+    frame = encode_frame(b'K', 1, b'A', b'B', b'\x01\x02')
+    assert frame[36:] == b'\x01\x02'
+    assert decode_header(frame)[4] == 2
+
+def test_encode_many_matches_single_encodes():
+    frames = [(b'D', i, b'SRC%d' % i, b'DST', b'x' * i) for i in range(10)]
+    assert encode_many(frames) == b''.join(encode_frame(*f) for f in frames)
+    assert encode_many([]) == b''
+
+def test_decode_many_round_trip():
+    frames = [(b'D', 0, b'N0CALL', b'BEACON', b'hello'), (b'm', 3, b'', b'', b''), (b'K', 1, b'A', b'B', b'\0' * 300)]
+    decoded, consumed = decode_many(encode_many(frames))
+    assert consumed == sum(36 + len(f[4]) for f in frames)
+    assert [(bytes([k]), p, strip_callsign(f), strip_callsign(t), bytes(d)) for k, p, f, t, _u, d, _o in decoded] == frames
+
+def test_decode_many_leaves_partial_frame():
+    stream = encode_frame(b'D', data=b'one') + encode_frame(b'D', data=b'two')
+    decoded, consumed = decode_many(stream[:-1])
+    assert len(decoded) == 1
+    assert consumed == 39
+    decoded, consumed = decode_many(stream, consumed)
+    assert bytes(decoded[0][5]) == b'two'
+
+def test_strip_callsign_handles_nul_and_space_padding():
+    assert strip_callsign(b'N0CALL    ') == b'N0CALL'
+    assert strip_callsign(b'N0CALL\0\0\0\0') == b'N0CALL'
+    assert strip_callsign(b'\0' * 10) == b''
+
+def test_send_frame_uses_codec(agwpe_client, mock_socket):
+    agwpe_client.send_ui(port=0, dest="DEST", src="SOURCE", pid=0xF0, info=b"hello")
+    mock_socket.sendall.assert_called_with(encode_frame(b'D', 0, b'SOURCE', b'DEST', b'\xf0hello'))
+
+def test_session_replay_single_write(agwpe_client, mock_socket):
+    frames = [(b'R', 0, b'A', b'', b''), (b'M', 1, b'', b'', b'')]
+    agwpe_client._write_frames(frames)
+    mock_socket.sendall.assert_called_once_with(encode_many(frames))
@@ -0,0 +1,134 @@
+import socket
+import struct
+import pytest
+
+from pyagw3.decoder import FrameDecoder, HEADER_LEN
+
+def make_frame(kind, payload=b'', port=0, call_from=b'FROM', call_to=b'TO'):
+    header = bytearray(36)
+    header[0:1] = kind
+    struct.pack_into('<I', header, 4, port)
+    header[8:18] = call_from.ljust(10)
+    header[18:28] = call_to.ljust(10)
+    struct.pack_into('<I', header, 28, len(payload))
+    return bytes(header) + payload
+
+def test_feed_yields_complete_frames():
+    decoder = FrameDecoder()
+    f1 = make_frame(b'D', b'first')
+    f2 = make_frame(b'K', b'second')
+    decoder.feed(f1 + f2)
+    frames = [bytes(f) for f in decoder.frames()]
+    assert frames == [f1, f2]
+    assert len(decoder) == 0
+
+def test_partial_frame_is_held_until_complete():
+    decoder = FrameDecoder()
+    frame = make_frame(b'D', b'0123456789')
+    decoder.feed(frame[:20])
+    assert list(decoder.frames()) == []
+    decoder.feed(frame[20:40])
+    assert list(decoder.frames()) == []
+    decoder.feed(frame[40:])
+    assert [bytes(f) for f in decoder.frames()] == [frame]
+
+def test_byte_at_a_time():
+    decoder = FrameDecoder(size=HEADER_LEN)
+    frames = [make_frame(b'D', bytes([i]) * i) for i in range(50)]
+    stream = b''.join(frames)
+    out = []
+    for i in range(len(stream)):
+        decoder.feed(stream[i:i + 1])
+        out.extend(bytes(f) for f in decoder.frames())
+    assert out == frames
+
+def test_grows_for_oversized_frame():
+    decoder = FrameDecoder(size=64)
+    frame = make_frame(b'K', b'x' * 5000)
+    decoder.feed(frame)
+    assert decoder.capacity >= len(frame)
+    assert [bytes(f) for f in decoder.frames()] == [frame]
+
+def test_grow_keeps_earlier_views_intact():
+    decoder = FrameDecoder(size=64)
+    frame = make_frame(b'D', b'abc')
+    decoder.feed(frame + make_frame(b'D', b'y' * 10)[:10])
+    view = next(iter(decoder.frames()))
+    decoder.feed(b'z' * 4096)
+    assert bytes(view) == frame
+
+def test_shift_with_overlapping_tail():
+    decoder = FrameDecoder(size=128)
+    first = make_frame(b'D', b'a' * 4)
+    second = make_frame(b'D', bytes(range(80)))
+    # 40 bytes consumed, 60 pending: the shifted tail overlaps its old position
+    decoder.feed(first + second[:60])
+    assert [bytes(f) for f in decoder.frames()] == [first]
+    decoder.feed(second[60:])
+    assert decoder.capacity == 128
+    assert [bytes(f) for f in decoder.frames()] == [second]
+
+def test_recv_into_socket():
+    a, b = socket.socketpair()
+    try:
+        decoder = FrameDecoder(size=128)
+        frames = [make_frame(b'D', b'p' * n) for n in (0, 64, 256, 2048)]
+        a.sendall(b''.join(frames))
+        a.close()
+        out = []
+        while decoder.recv_into(b):
+            out.extend(bytes(f) for f in decoder.frames())
+        assert out == frames
+    finally:
+        b.close()
+
+def test_client_receive_once_over_socketpair():
+    from pyagw3.agwpe import AGWPEClient
+    a, b = socket.socketpair()
+    client = AGWPEClient(callsign="TEST")
+    client.sock = b
+    client.connected = True
+    try:
+        frames = []
+        client.on_frame = lambda f: frames.append((f.call_from, f.data))
+        a.sendall(make_frame(b'D', b'hello', call_from=b'N0CALL') + make_frame(b'D', b'world')[:30])
+        assert client._receive_once()
+        a.sendall(make_frame(b'D', b'world')[30:])
+        assert client._receive_once()
+        assert frames == [(b'N0CALL', b'hello'), (b'FROM', b'world')]
+        a.close()
+        assert not client._receive_once()
+        assert not client.connected
+    finally:
+        client.close()
+
+def test_oversized_data_len_is_rejected():
+    decoder = FrameDecoder(size=128, max_frame=1024)
+    header = bytearray(make_frame(b'D'))
+    struct.pack_into('<I', header, 28, 0xFFFFFFFF)
+    decoder.feed(bytes(header))
+    with pytest.raises(ValueError):
+        decoder.writable()
+    with pytest.raises(ValueError):
+        decoder.feed(b'x' * 16)
+    assert decoder.capacity == 128
+
+def test_client_disconnects_on_oversized_frame():
+    from pyagw3.agwpe import AGWPEClient
+    a, b = socket.socketpair()
+    client = AGWPEClient(callsign="TEST")
+    client.sock = b
+    client.connected = True
+    try:
+        header = bytearray(make_frame(b'D'))
+        struct.pack_into('<I', header, 28, 0xFFFFFFFF)
+        a.sendall(bytes(header))
+        assert client._receive_once()
+        a.sendall(b'x' * 64)
+        assert not client._receive_once()
+        assert not client.connected
+        assert client.metrics.decode_errors == 1
+        assert client._decoder.capacity < 1 << 20
+    finally:
+        a.close()
+        client.close()
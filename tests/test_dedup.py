@@ -0,0 +1,89 @@
+import pytest
+
+from pyagw3.agwpe import AGWPEClient
+from pyagw3.ax25 import build_ui
+from pyagw3.codec import decode_many, encode_frame
+from pyagw3.dedup import DuplicateFilter, frame_hash
+from pyagw3.replay import replay_records
+
+
+def feed(client, frames):
+    client._decoder.feed(b''.join(encode_frame(*f) for f in frames))
+    client._process_pending()
+
+
+def monitor(via, time, info=b'hello'):
+    return (b'U', 0, b'N0CALL-1', b'CQ',
+            b'1:Fm N0CALL-1 To CQ' + via + b' <UI pid=F0 Len=5 >[' + time + b']\r' + info)
+
+
+def decoded(frame):
+    return decode_many(encode_frame(*frame))[0][0]
+
+
+def test_digipeated_copies_hash_alike():
+    direct = monitor(b'', b'12:00:00')
+    assert frame_hash(decoded(direct)) == frame_hash(decoded(monitor(b' Via WIDE1-1*', b'12:00:01')))
+    assert frame_hash(decoded(direct)) != frame_hash(decoded(monitor(b'', b'12:00:00', b'other')))
+    raw = (b'K', 0, b'', b'', build_ui('APRS', 'N0CALL', b'!pos'))
+    digipeated = (b'K', 0, b'', b'', build_ui('APRS', 'N0CALL', b'!pos', path=('WIDE1-1*', 'WIDE2-1')))
+    assert frame_hash(decoded(raw)) == frame_hash(decoded(digipeated))
+    assert frame_hash(decoded(raw)) != frame_hash(decoded((b'K', 1, b'', b'', raw[4])))
+
+
+def test_drop_mode_skips_dispatch_but_not_taps():
+    client = AGWPEClient()
+    dedup = DuplicateFilter()
+    dedup.attach(client)
+    received, tapped = [], []
+    for kind in 'UK':
+        client.register_handler(kind, received.append)
+    client.add_tap(lambda buffer, frames: tapped.extend(frames))
+    feed(client, [monitor(b'', b'12:00:00'), monitor(b' Via WIDE1-1*', b'12:00:01'),
+                  (b'K', 0, b'', b'', build_ui('APRS', 'W1AW', b'x', path=('RELAY*',))),
+                  (b'K', 0, b'', b'', build_ui('APRS', 'W1AW', b'x')),
+                  (b'v', 0, b'', b'', b'2005.127'), (b'v', 0, b'', b'', b'2005.127')])
+    assert [f.data_kind for f in received] == [b'U', b'K']
+    assert len(tapped) == 6
+    assert dedup.stats() == {"checked": 4, "duplicates": 2, "sources": {"N0CALL-1": 1, "W1AW": 1}}
+    assert client.stats()["duplicates"] == 2
+    dedup.detach(client)
+    feed(client, [monitor(b'', b'12:00:00')])
+    assert len(received) == 3
+
+
+def test_tag_mode_numbers_repeats():
+    client = AGWPEClient()
+    DuplicateFilter(mode='tag').attach(client)
+    received = []
+    client.register_handler('U', received.append)
+    feed(client, [monitor(b'', b'12:00:00'), monitor(b' Via A*', b'12:00:01'), monitor(b' Via B*', b'12:00:02')])
+    assert [f.user for f in received] == [0, 1, 2]
+    assert received[2].data.endswith(b'hello')
+
+
+def test_window_and_slot_reuse():
+    dedup = DuplicateFilter(window=10, slots=1)
+    a, b = decoded(monitor(b'', b'1')), decoded(monitor(b'', b'1', b'b'))
+    assert dedup.repeat(a, now=0.0) == 0
+    assert dedup.repeat(a, now=5.0) == 1
+    # The window is measured from the first copy
+    assert dedup.repeat(a, now=10.5) == 0
+    # One slot: another frame evicts the entry, so the next copy of a passes
+    assert dedup.repeat(b, now=11.0) == 0
+    assert dedup.repeat(a, now=12.0) == 0
+    with pytest.raises(ValueError):
+        DuplicateFilter(slots=1000)
+
+
+def test_replay_uses_recorded_time():
+    client = AGWPEClient()
+    DuplicateFilter(window=30).attach(client)
+    received = []
+    client.register_handler('U', received.append)
+    beacon = encode_frame(*monitor(b'', b'12:00:00'))
+    # Beacons recorded ten minutes apart, plus a digipeated copy a second after the first
+    records = [(0, beacon), (1_000_000_000, encode_frame(*monitor(b' Via WIDE1-1*', b'12:00:01'))),
+               (600_000_000_000, beacon)]
+    assert replay_records(client, records) == 2
+    assert len(received) == 2
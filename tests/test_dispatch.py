@@ -0,0 +1,102 @@
+import asyncio
+import socket
+import threading
+import time
+import pytest
+
+from pyagw3.agwpe import AGWPEClient
+from pyagw3.codec import encode_frame
+from pyagw3.dispatch import (InlineExecutor, OrderedThreadPoolExecutor, AsyncioExecutor,
+                             OVERFLOW_BLOCK, OVERFLOW_DROP)
+
+def test_inline_executor_runs_immediately():
+    calls = []
+    assert InlineExecutor().submit('k', calls.append, 1)
+    assert calls == [1]
+
+def test_unknown_overflow_policy_rejected():
+    with pytest.raises(ValueError):
+        OrderedThreadPoolExecutor(overflow='maybe')
+
+def test_thread_pool_keeps_per_key_order():
+    executor = OrderedThreadPoolExecutor(workers=4, queue_depth=10000)
+    results = {k: [] for k in range(8)}
+    for i in range(500):
+        for k in results:
+            executor.submit(k, results[k].append, i)
+    executor.shutdown()
+    assert all(v == list(range(500)) for v in results.values())
+
+def test_thread_pool_drop_policy_counts_drops():
+    gate = threading.Event()
+    executor = OrderedThreadPoolExecutor(workers=1, queue_depth=2, overflow=OVERFLOW_DROP)
+    executor.submit('k', gate.wait)
+    time.sleep(0.05)  # worker is now blocked inside the first callback
+    accepted = [executor.submit('k', lambda: None) for _ in range(5)]
+    assert accepted == [True, True, False, False, False]
+    assert executor.dropped == 3
+    assert executor.pending == 2
+    gate.set()
+    executor.shutdown()
+
+def test_thread_pool_survives_callback_errors():
+    executor = OrderedThreadPoolExecutor(workers=1)
+    out = []
+    executor.submit('k', lambda: 1 / 0)
+    executor.submit('k', out.append, 'ok')
+    executor.shutdown()
+    assert out == ['ok']
+
+def test_asyncio_executor_hands_off_to_loop():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        executor = AsyncioExecutor(loop, queue_depth=100)
+        seen = []
+        done = asyncio.Event()
+
+        async def coro_cb(value):
+            seen.append(('coro', value, threading.current_thread() is threading.main_thread()))
+            done.set()
+
+        def producer():
+            executor.submit('k', lambda v: seen.append(('plain', v)), 1)
+            executor.submit('k', coro_cb, 2)
+
+        t = threading.Thread(target=producer)
+        t.start()
+        await done.wait()
+        t.join()
+        return seen, executor.pending
+    seen, pending = asyncio.run(asyncio.wait_for(scenario(), 5))
+    assert seen == [('plain', 1), ('coro', 2, True)]
+    assert pending == 0
+
+def test_asyncio_executor_drops_when_full_on_loop_thread():
+    async def scenario():
+        executor = AsyncioExecutor(asyncio.get_running_loop(), queue_depth=2, overflow=OVERFLOW_BLOCK)
+        accepted = [executor.submit('k', lambda: None) for _ in range(4)]
+        await asyncio.sleep(0)
+        return accepted, executor.dropped
+    assert asyncio.run(scenario()) == ([True, True, False, False], 2)
+
+def test_slow_callback_does_not_stall_receive():
+    a, b = socket.socketpair()
+    executor = OrderedThreadPoolExecutor(workers=2, queue_depth=100)
+    client = AGWPEClient(callsign="TEST", executor=executor)
+    client.sock = b
+    client.connected = True
+    gate = threading.Event()
+    handled = []
+    client.on_frame = lambda f: (gate.wait(), handled.append(f.call_from))
+    try:
+        a.sendall(b''.join(encode_frame(b'D', 0, b'N0CALL', b'ID', b'%d' % i) for i in range(10)))
+        start = time.monotonic()
+        assert client._receive_once()
+        assert time.monotonic() - start < 0.5
+        assert handled == []
+        gate.set()
+        executor.shutdown()
+        assert handled == [b'N0CALL'] * 10
+    finally:
+        client.close()
+        a.close()
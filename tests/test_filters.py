@@ -0,0 +1,92 @@
+import socket
+import pytest
+
+from pyagw3.agwpe import AGWPEClient
+from pyagw3.codec import encode_frame, encode_many, decode_many
+from pyagw3.filters import FrameFilter
+
+def accepts(flt, kind=b'U', port=0, call_from=b'N0CALL', call_to=b'APRS'):
+    return flt(memoryview(encode_frame(kind, port, call_from, call_to, b'data')), 0)
+
+def test_port_and_kind_filter():
+    flt = FrameFilter(ports={1, 2}, kinds=b'UK')
+    assert accepts(flt, port=1)
+    assert not accepts(flt, port=0)
+    assert not accepts(flt, kind=b'I', port=1)
+    assert flt.hits == 1
+    assert flt.misses == 2
+
+def test_non_monitor_kinds_always_pass():
+    flt = FrameFilter(ports={5}, callsigns=['NOBODY'])
+    assert accepts(flt, kind=b'Y', port=0)
+    assert accepts(flt, kind=b'd', call_from=b'OTHER')
+    assert flt.hits == flt.misses == 0
+
+def test_callsign_prefix_and_wildcards():
+    flt = FrameFilter(callsigns=['KE4*', 'W?XYZ'], fields='from')
+    assert accepts(flt, call_from=b'KE4AHR')
+    assert accepts(flt, call_from=b'KE4AHR-15')
+    assert accepts(flt, call_from=b'W1XYZ')
+    assert not accepts(flt, call_from=b'W12XYZ')
+    assert not accepts(flt, call_from=b'N0CALL', call_to=b'KE4AHR')
+
+def test_callsign_matches_either_field_by_default():
+    flt = FrameFilter(callsigns=['ke4ahr'])
+    assert accepts(flt, call_from=b'N0CALL', call_to=b'KE4AHR')
+    assert not accepts(flt, call_from=b'N0CALL', call_to=b'KE4AHRX')
+
+def test_ssid_constraints():
+    flt = FrameFilter(callsigns=['N0CALL'], ssids=range(1, 8), fields='from')
+    assert accepts(flt, call_from=b'N0CALL-7')
+    assert not accepts(flt, call_from=b'N0CALL')
+    assert not accepts(flt, call_from=b'N0CALL-9')
+    exact = FrameFilter(callsigns=['N0CALL-9'], fields='from')
+    assert accepts(exact, call_from=b'N0CALL-9')
+    assert not accepts(exact, call_from=b'N0CALL-1')
+    any_ssid = FrameFilter(callsigns=['N0CALL-*'], fields='from')
+    assert accepts(any_ssid, call_from=b'N0CALL-1')
+    assert not accepts(any_ssid, call_from=b'N0CALL')
+
+def test_invalid_fields_rejected():
+    with pytest.raises(ValueError):
+        FrameFilter(fields='via')
+
+def test_decode_many_skips_rejected_frames():
+    stream = encode_many([(b'U', 0, b'A', b'B', b'x' * 10), (b'U', 1, b'A', b'B', b'keep'), (b'U', 0, b'A', b'B', b'')])
+    frames, consumed = decode_many(stream, accept=FrameFilter(ports={1}))
+    assert consumed == len(stream)
+    assert [(f[1], bytes(f[5]), f[6]) for f in frames] == [(1, b'keep', 46)]
+
+def test_client_applies_filter_before_dispatch():
+    a, b = socket.socketpair()
+    client = AGWPEClient(callsign="TEST")
+    client.sock = b
+    client.connected = True
+    client.frame_filter = FrameFilter(callsigns=['KE4*'])
+    seen = []
+    client.on_frame = lambda f: seen.append(f.call_from)
+    client.register_handler(b'U', lambda f: seen.append(f.call_from))
+    try:
+        a.sendall(encode_many([(b'D', 0, b'N0CALL', b'ID', b'1'), (b'D', 0, b'KE4AHR', b'ID', b'2'),
+                               (b'U', 0, b'W1AW', b'CQ', b'3'), (b'U', 0, b'KE4XYZ', b'CQ', b'4')]))
+        client._receive_once()
+        assert seen == [b'KE4AHR', b'KE4XYZ']
+        assert (client.frame_filter.hits, client.frame_filter.misses) == (2, 2)
+    finally:
+        client.close()
+        a.close()
+
+def test_session_disconnect_passes_monitor_filter():
+    client = AGWPEClient(callsign="TEST")
+    session = client._new_session(0, b'TEST', b'KE4AHR')
+    client._sessions[session.key] = session
+    session._on_connect()
+    client.frame_filter = FrameFilter(callsigns=['W1AW'])
+    seen = []
+    client.register_handler(b'D', lambda f: seen.append(f.call_from))
+    client._decoder.feed(encode_many([(b'D', 0, b'N0CALL', b'ID', b'monitored'),
+                                      (b'D', 0, b'KE4AHR', b'TEST', b'*** DISCONNECTED From Station KE4AHR\r')]))
+    client._process_pending()
+    assert seen == [b'KE4AHR']
+    assert client.sessions == [] and not session.connected
+    assert (client.frame_filter.hits, client.frame_filter.misses) == (0, 1)
@@ -0,0 +1,113 @@
+import asyncio
+import io
+import threading
+import time
+
+import pytest
+
+from pyagw3.agwpe import AGWPEClient
+from pyagw3.aio import AsyncAGWPEClient
+from pyagw3.codec import encode_frame
+from pyagw3.flow import OutstandingTracker, iter_chunks, link_key
+from pyagw3.server import AGWPEServer
+
+from .test_server import wait_for
+
+
+def test_iter_chunks_sources():
+    data = bytes(range(256)) * 3
+    assert list(iter_chunks(data, 300)) == [data[:300], data[300:600], data[600:]]
+    assert list(iter_chunks(io.BytesIO(data), 500)) == [data[:500], data[500:]]
+    assert list(iter_chunks([b'ab', b'cde', b'f'], 4)) == [b'abcd', b'ef']
+    with pytest.raises(ValueError):
+        list(iter_chunks(b'x', 0))
+
+
+def test_tracker_updated_from_y_replies():
+    client = AGWPEClient(callsign="TEST")
+    client._decoder.feed(encode_frame(b'y', 1, b'TEST', b'N0CALL', b'\x03\x00\x00\x00')
+                         + encode_frame(b'Y', 2, b'', b'', b'\x07\x00\x00\x00'))
+    client._process_pending()
+    assert client.outstanding.get(link_key(1, b'TEST      ', b'N0CALL')) == 3
+    assert client.outstanding.get(2) == 7
+
+
+def test_tracker_wait_timeout_and_wakeup():
+    tracker = OutstandingTracker()
+    assert tracker.wait(1, tracker.seq(1), timeout=0.01) is None
+    threading.Timer(0.02, tracker.update, args=(1, 5)).start()
+    assert tracker.wait(1, 0, timeout=2) == 5
+
+
+@pytest.fixture
+def server():
+    with AGWPEServer() as srv:
+        srv.track_outstanding = True
+        yield srv
+
+
+def _drain(server, stop, seen):
+    while not stop.is_set():
+        with server._count_lock:
+            for link, count in server.link_outstanding.items():
+                seen.append(count)
+                server.link_outstanding[link] = max(0, count - 1)
+        time.sleep(0.002)
+
+
+def test_send_stream_respects_high_water(server):
+    client = AGWPEClient(port=server.port, callsign="TEST")
+    assert client.connect(max_retries=0)
+    received = bytearray()
+    client.on_connected_data = lambda port, call, data: received.extend(data)
+    stop, seen = threading.Event(), []
+    drainer = threading.Thread(target=_drain, args=(server, stop, seen))
+    drainer.start()
+    try:
+        client.send_connect(0, "N0CALL")
+        payload = bytes(range(256)) * 20
+        assert client.send_stream(0, "N0CALL", payload, paclen=100, high_water=3, poll_interval=0.05, timeout=10) == len(payload)
+        assert wait_for(lambda: len(received) == len(payload))
+        assert bytes(received) == payload
+        assert server.kinds_in[b'd'] == 52
+        assert b'y' in server.kinds_in
+        assert max(seen) <= 3
+    finally:
+        stop.set()
+        drainer.join()
+        client.close()
+
+
+def test_send_stream_times_out_when_tnc_full(server):
+    client = AGWPEClient(port=server.port, callsign="TEST")
+    assert client.connect(max_retries=0)
+    try:
+        server.link_outstanding[(0, b'TEST', b'N0CALL')] = 10
+        with pytest.raises(TimeoutError):
+            client.send_stream(0, "N0CALL", bytes(1000), paclen=100, high_water=2, poll_interval=0.02, timeout=0.2)
+        assert server.kinds_in[b'd'] == 2
+    finally:
+        client.close()
+
+
+def test_async_send_stream(server):
+    async def main():
+        async with AsyncAGWPEClient(port=server.port, callsign="TEST") as client:
+            stop, seen = threading.Event(), []
+            drainer = threading.Thread(target=_drain, args=(server, stop, seen))
+            drainer.start()
+
+            async def pieces():
+                for i in range(10):
+                    yield bytes([i]) * 50
+            try:
+                sent = await client.send_stream(0, "N0CALL", pieces(), paclen=64, high_water=2, poll_interval=0.05, timeout=10)
+            finally:
+                stop.set()
+                drainer.join()
+            return sent, seen
+
+    sent, seen = asyncio.run(main())
+    assert sent == 500
+    assert wait_for(lambda: server.kinds_in.get(b'd') == 8)
+    assert max(seen) <= 2
@@ -0,0 +1,57 @@
+import copy
+import pickle
+import sys
+import pytest
+
+from pyagw3.agwpe import AGWPEFrame
+from pyagw3.codec import encode_frame
+
+def test_frame_fields_decoded_from_raw():
+    frame = AGWPEFrame(encode_frame(b'K', 3, b'N0CALL-1', b'APRS', b'\x01\x02\x03'))
+    assert frame.port == 3
+    assert frame.data_kind == b'K'
+    assert frame.call_from == b'N0CALL-1'
+    assert frame.call_to == b'APRS'
+    assert frame.data_len == 3
+    assert frame.data == b'\x01\x02\x03'
+
+def test_default_frame_is_empty():
+    frame = AGWPEFrame()
+    assert frame.port == 0
+    assert frame.data_kind == b'\0'
+    assert frame.call_from == b''
+    assert frame.data == b''
+
+def test_build_matches_wire_frame():
+    frame = AGWPEFrame.build(b'D', 1, b'SRC', b'DST', b'hi')
+    assert frame.raw == encode_frame(b'D', 1, b'SRC', b'DST', b'hi')
+    assert frame == AGWPEFrame(frame.raw)
+    assert hash(frame) == hash(AGWPEFrame(frame.raw))
+
+def test_frame_is_immutable_and_slotted():
+    frame = AGWPEFrame.build(b'D')
+    with pytest.raises(AttributeError):
+        frame.port = 1
+    with pytest.raises(AttributeError):
+        frame.extra = 1
+    assert not hasattr(frame, '__dict__')
+
+def test_frame_pickle_and_copy_round_trip():
+    frame = AGWPEFrame.build(b'K', 2, b'N0CALL', b'APRS', b'\x00payload')
+    for clone in (pickle.loads(pickle.dumps(frame)), copy.copy(frame), copy.deepcopy(frame)):
+        assert type(clone) is AGWPEFrame
+        assert clone == frame and clone.raw == frame.raw
+
+def test_frame_copies_source_buffer():
+    buf = bytearray(encode_frame(b'D', data=b'abc'))
+    frame = AGWPEFrame(memoryview(buf))
+    buf[36:] = b'xyz'
+    assert frame.data == b'abc'
+
+def test_short_frame_rejected():
+    with pytest.raises(ValueError):
+        AGWPEFrame(b'\0' * 10)
+
+def test_frame_overhead_is_small():
+    frame = AGWPEFrame.build(b'D', data=b'x' * 64)
+    assert sys.getsizeof(frame) + sys.getsizeof(frame.raw) < 200
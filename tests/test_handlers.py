@@ -0,0 +1,69 @@
+import socket
+import pytest
+
+from pyagw3.agwpe import AGWPEClient
+from pyagw3.codec import encode_frame
+
+@pytest.fixture
+def wired_client():
+    a, b = socket.socketpair()
+    client = AGWPEClient(callsign="TEST")
+    client.sock = b
+    client.connected = True
+    yield client, a
+    client.close()
+    a.close()
+
+def test_register_handler_for_new_kind(wired_client):
+    client, peer = wired_client
+    seen = []
+    client.register_handler(b'G', lambda f: seen.append((f.data_kind, f.data)))
+    peer.sendall(encode_frame(b'G', data=b'2;Port1 VHF;Port2 HF;'))
+    client._receive_once()
+    assert seen == [(b'G', b'2;Port1 VHF;Port2 HF;')]
+
+def test_multiple_subscribers_in_order(wired_client):
+    client, peer = wired_client
+    order = []
+    client.register_handler('X', lambda f: order.append('first'))
+    client.register_handler(ord('X'), lambda f: order.append('second'))
+    peer.sendall(encode_frame(b'X', data=b'\x01'))
+    client._receive_once()
+    assert order == ['first', 'second']
+
+def test_subscriber_runs_alongside_builtin_callback(wired_client):
+    client, peer = wired_client
+    builtin, extra = [], []
+    client.on_frame = lambda f: builtin.append(f.data)
+    client.register_handler(b'D', lambda f: extra.append(f.call_from))
+    peer.sendall(encode_frame(b'D', 0, b'N0CALL', b'ID', b'hello'))
+    client._receive_once()
+    assert builtin == [b'hello']
+    assert extra == [b'N0CALL']
+
+def test_unregister_handler(wired_client):
+    client, peer = wired_client
+    seen = []
+    handler = seen.append
+    client.register_handler(b'S', handler)
+    client.unregister_handler(b'S', handler)
+    peer.sendall(encode_frame(b'S'))
+    client._receive_once()
+    assert seen == []
+    with pytest.raises(ValueError):
+        client.unregister_handler(b'S', handler)
+
+def test_outstanding_per_connection_kind(wired_client):
+    client, peer = wired_client
+    seen = []
+    client.on_outstanding = lambda port, count: seen.append((port, count))
+    peer.sendall(encode_frame(b'y', 1, b'TEST', b'PEER', (7).to_bytes(4, 'little')))
+    client._receive_once()
+    assert seen == [(1, 7)]
+
+def test_invalid_kind_rejected():
+    client = AGWPEClient()
+    with pytest.raises(ValueError):
+        client.register_handler(b'XY', print)
+    with pytest.raises(ValueError):
+        client.register_handler(300, print)
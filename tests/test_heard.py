@@ -0,0 +1,92 @@
+import struct
+
+from pyagw3.agwpe import AGWPEClient
+from pyagw3.ax25 import build_ui
+from pyagw3.codec import encode_frame
+from pyagw3.heard import HeardIndex, parse_heard_list
+from pyagw3.server import AGWPEServer
+
+from .test_server import wait_for
+
+
+def feed(client, frames):
+    client._decoder.feed(b''.join(encode_frame(*f) for f in frames))
+    client._process_pending()
+
+
+def test_indexes_monitored_frames():
+    client = AGWPEClient()
+    index = HeardIndex()
+    index.attach(client)
+    feed(client, [
+        (b'U', 0, b'N0CALL-1', b'CQ', b'1:Fm N0CALL-1 To CQ Via WIDE1-1,WIDE2-1 <UI pid=F0 Len=5 >\rhello'),
+        (b'K', 1, b'', b'', build_ui('APRS', 'W1AW', b'!pos', path=('RELAY*',))),
+        (b'U', 1, b'N0CALL-1', b'CQ', b'1:Fm N0CALL-1 To CQ <UI pid=F0 Len=5 >\rhello'),
+        (b'v', 0, b'', b'', b'version'),
+    ])
+    assert len(index) == 2
+    station = index.station('n0call-1')
+    assert station.frames == 2
+    assert set(station.ports) == {0, 1}
+    assert station.paths == {'WIDE1-1,WIDE2-1': 1, '': 1}
+    assert index.station('W1AW').paths == {'RELAY*': 1}
+    assert [h.callsign for h in index.heard()] == ['N0CALL-1', 'W1AW']
+    assert [h.callsign for h in index.heard(port=0)] == ['N0CALL-1']
+    index.detach(client)
+    assert client.heard_index is None and client._taps == ()
+
+
+def test_recent_queries_stop_at_cutoff():
+    index = HeardIndex()
+    for n in range(100):
+        index.record(1, f'STN{n}', 10, now=1000.0 + n)
+    index.record(2, 'STN5', 10, now=1200.0)
+    recent = index.heard(port=1, within=10, now=1099.0)
+    assert [h.callsign for h in recent] == [f'STN{n}' for n in range(99, 88, -1)]
+    # STN5 moved to the front overall but is old on port 1
+    assert [h.callsign for h in index.heard(within=1, now=1200.0)] == ['STN5']
+    assert 'STN5' not in [h.callsign for h in index.heard(port=1, within=100, now=1099.0)][:90]
+
+
+def test_heard_list_merge_keeps_order():
+    index = HeardIndex()
+    index.record(0, 'NEW', now=2000.0)
+    index.record_heard_list(0, [('OLD', 1000), ('NEW', 1500)])
+    assert index.station('NEW').last_heard == 2000.0
+    assert index.station('OLD').frames == 0
+    # An out-of-order 'H' entry never hides newer stations from time queries
+    assert [h.callsign for h in index.heard(within=100, now=2050.0)] == ['NEW']
+    assert {h.callsign for h in index.heard()} == {'NEW', 'OLD'}
+
+
+def test_activity_buckets_and_eviction():
+    index = HeardIndex(bucket_seconds=10, buckets=6, max_stations=2)
+    for t in (0, 1, 15, 59):
+        index.record(0, 'A', now=float(t))
+    assert [count for _, count in index.activity('A', now=59.0)] == [2, 1, 0, 0, 0, 1]
+    assert index.activity(port=0, now=59.0)[0] == (0.0, 2)
+    # Old buckets fall out of the ring
+    assert [count for _, count in index.activity('A', now=75.0)] == [0, 0, 0, 1, 0, 0]
+    index.record(0, 'B', now=60.0)
+    index.record(0, 'C', now=61.0)
+    assert index.station('A') is None and len(index) == 2
+
+
+def test_parse_heard_list_single_pass():
+    payload = struct.pack('<10sI', b'CALL1', 100) + struct.pack('<10sI', b'', 0) + struct.pack('<10sI', b'CALL2 ', 50)
+    assert parse_heard_list(payload + b'\x00\x01') == [('CALL1', 100), ('CALL2', 50)]
+
+
+def test_h_reply_feeds_index():
+    with AGWPEServer() as server:
+        server.heard[b'KE4AHR'] = 1_700_000_000
+        client = AGWPEClient(port=server.port)
+        index = HeardIndex()
+        index.attach(client)
+        try:
+            assert client.connect(max_retries=0)
+            client.request_heard_stations(0)
+            assert wait_for(lambda: index.station('KE4AHR') is not None)
+        finally:
+            client.close()
+    assert index.station('KE4AHR').last_heard == 1_700_000_000
@@ -0,0 +1,91 @@
+import urllib.request
+
+from pyagw3.agwpe import AGWPEClient
+from pyagw3.codec import HEADER_LEN, encode_frame
+from pyagw3.metrics import Histogram, prometheus_text, start_prometheus_server
+from pyagw3.server import AGWPEServer
+
+
+def _feed(client, data):
+    client._decoder.feed(data)
+    client._process_pending()
+
+
+def test_receive_counters_by_kind_and_port():
+    client = AGWPEClient()
+    _feed(client, encode_frame(b'D', 1, b'N0CALL', b'CQ', b'hello') + encode_frame(b'U', 2, b'N0CALL', b'CQ', b''))
+    stats = client.stats()
+    assert stats["frames_in"] == {"D": 1, "U": 1}
+    assert stats["bytes_in"] == {"D": HEADER_LEN + 5, "U": HEADER_LEN}
+    assert stats["port_frames_in"] == {1: 1, 2: 1}
+    assert stats["dispatch_latency"]["count"] == 2
+    assert stats["queues"]["rx_buffered_bytes"] == 0
+
+
+def test_decode_error_counted():
+    client = AGWPEClient()
+    client.connected = True
+
+    class Sock:
+        def recv_into(self, buf, n=0):
+            data = encode_frame(b'D', 0, b'A', b'B', b'x')
+            buf[:len(data)] = data
+            return len(data)
+
+    def boom(frame):
+        raise RuntimeError("bad")
+    client.sock = Sock()
+    client.on_frame = boom
+    assert not client._receive_once()
+    assert client.stats()["decode_errors"] == 1
+
+
+def test_send_counters_and_reconnects():
+    with AGWPEServer() as server:
+        client = AGWPEClient(port=server.port, callsign="TEST")
+        assert client.connect(max_retries=0)
+        client.send_ui(1, "CQ", "TEST", 0xF0, b"abc")
+        stats = client.stats()
+        assert stats["frames_out"] == {"D": 1, "R": 1}
+        assert stats["port_bytes_out"][1] == HEADER_LEN + 4
+        assert stats["send_lock_wait"]["count"] == 2
+        assert stats["connects"] == 1 and stats["reconnects"] == 0
+        client.close()
+        assert client.connect(max_retries=0)
+        assert client.stats()["reconnects"] == 1
+        client.close()
+
+
+def test_histogram_buckets():
+    hist = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        hist.observe(value)
+    assert hist.counts == [1, 1, 1]
+    assert hist.count == 3
+
+
+def test_prometheus_text():
+    client = AGWPEClient()
+    _feed(client, encode_frame(b'D', 1, b'N0CALL', b'CQ', b'hello'))
+    text = prometheus_text(client.stats(), labels={"client": "a"})
+    assert '# TYPE pyagw3_frames_received_total counter' in text
+    assert 'pyagw3_frames_received_total{client="a",kind="D"} 1' in text
+    assert 'pyagw3_port_frames_received_total{client="a",port="1"} 1' in text
+    assert 'pyagw3_dispatch_latency_seconds_count{client="a"} 1' in text
+    assert 'pyagw3_dispatch_latency_seconds_bucket{client="a",le="+Inf"} 1' in text
+    assert 'pyagw3_rx_buffered_bytes{client="a"} 0' in text
+
+
+def test_prometheus_http_exporter():
+    client = AGWPEClient()
+    _feed(client, encode_frame(b'K', 0, b'N0CALL', b'CQ', b'\x00'))
+    server = start_prometheus_server({"one": client, "two": AGWPEClient()}, port=0, host="127.0.0.1")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        body = urllib.request.urlopen(url, timeout=5).read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert 'pyagw3_frames_received_total{client="one",kind="K"} 1' in body
+    assert body.count('# TYPE pyagw3_connects_total counter') == 1
+    assert 'pyagw3_connects_total{client="two"} 0' in body
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+from pyagw3.pool import AGWPEPool
+from pyagw3.server import AGWPEServer
+
+from .test_server import wait_for
+
+
+@pytest.fixture
+def servers():
+    a, b = AGWPEServer(), AGWPEServer()
+    a.start()
+    b.start()
+    yield a, b
+    a.stop()
+    b.stop()
+
+
+def make_pool(a, b, **kwargs):
+    pool = AGWPEPool(reconnect_base_delay=0.05, **kwargs)
+    pool.add_server("a", port=a.port, callsign="POOL")
+    pool.add_server("b", port=b.port, callsign="POOL")
+    return pool
+
+
+def test_routes_logical_ports_and_merges_monitor_frames(servers):
+    a, b = servers
+    pool = make_pool(a, b)
+    pool.map_port(0, [("a", 0)])
+    pool.map_port(1, [("b", 1)])
+    with pool:
+        assert sorted(t.name for t in threading.enumerate() if t.name.startswith("agwpe-pool")) == \
+            ["agwpe-pool-health", "agwpe-pool-reader"]
+        assert pool.client("a").thread is None and pool.client("b").thread is None
+        frames = pool.frames(timeout=5)
+        pool.send_monitor()
+        assert wait_for(lambda: a.kinds_in.get(b'M') and b.kinds_in.get(b'M'))
+
+        pool.send_ui(0, "CQ", "POOL", 0xF0, b"via a")
+        pool.send_ui(1, "CQ", "POOL", 0xF0, b"via b")
+        assert wait_for(lambda: a.kinds_in.get(b'D') == 1 and b.kinds_in.get(b'D') == 1)
+
+        a.broadcast(b'U', 0, b'N0CALL-1', b'CQ', b'one')
+        first = next(frames)
+        b.broadcast(b'U', 1, b'N0CALL-2', b'CQ', b'two')
+        second = next(frames)
+    assert (first.server, first.port, first.frame.data) == ("a", 0, b'one')
+    assert (second.server, second.port, second.frame.data) == ("b", 1, b'two')
+    assert second.seq > first.seq and second.time >= first.time
+
+
+def test_failover_and_reconnect(servers):
+    a, b = servers
+    pool = make_pool(a, b)
+    pool.map_port(0, [("a", 0), ("b", 2)])
+    with pool:
+        assert wait_for(lambda: pool.healthy("a") and pool.healthy("b"))
+        assert pool.route(0)[0] is pool.client("a")
+        a_port = a.port
+        a.stop()
+        assert wait_for(lambda: not pool.healthy("a"))
+        client, agw_port = pool.route(0)
+        assert client is pool.client("b") and agw_port == 2
+        pool.send_ui(0, "CQ", "POOL", 0xF0, b"x")
+        assert wait_for(lambda: b.kinds_in.get(b'D') == 1)
+
+        restarted = AGWPEServer(port=a_port)
+        restarted.start()
+        try:
+            assert wait_for(lambda: pool.healthy("a"), timeout=5)
+            assert pool.route(0)[0] is pool.client("a")
+            assert wait_for(lambda: restarted.kinds_in.get(b'R') == 1)
+            assert pool.stats()["a"]["reconnects"] == 1
+        finally:
+            pool.close()
+            restarted.stop()
+
+
+def test_health_check_marks_silent_server_down(servers):
+    a, b = servers
+    pool = make_pool(a, b, health_interval=0.05, health_timeout=0.3)
+    pool.map_port(0, [("a", 0)])
+    a.muted = True
+    with pool:
+        assert wait_for(lambda: pool.healthy("b"))
+        assert wait_for(lambda: not pool.healthy("a"), timeout=5)
+        assert pool.healthy("b")
+
+
+def test_connected_calls_stay_on_link_server(servers):
+    a, b = servers
+    pool = make_pool(a, b)
+    pool.map_port(0, [("a", 0), ("b", 0)])
+    with pool:
+        assert wait_for(lambda: pool.healthy("a"))
+        pool.send_connect(0, "N0CALL")
+        pool.send_connected_data(0, "N0CALL", b"hello")
+        assert wait_for(lambda: a.kinds_in.get(b'd') == 1)
+        assert b'd' not in b.kinds_in
+        with pytest.raises(ConnectionError):
+            pool.send_connected_data(0, "NOBODY", b"x")
+        with pytest.raises(KeyError):
+            pool.route(7)
@@ -0,0 +1,177 @@
+import socket
+import time
+
+from pyagw3.agwpe import AGWPEClient
+from pyagw3.codec import encode_frame
+from pyagw3.proxy import AGWPEProxy
+from pyagw3.server import AGWPEServer
+
+from .test_server import wait_for
+
+
+class Rig:
+    """Emulator, upstream client and proxy, plus applications connected to the proxy."""
+    def __init__(self, **proxy_kw):
+        self.server = AGWPEServer()
+        self.server.start()
+        self.upstream = AGWPEClient(port=self.server.port, callsign="PROXY")
+        assert self.upstream.connect(max_retries=0)
+        self.proxy = AGWPEProxy(self.upstream, **proxy_kw)
+        self.proxy.start()
+        self.apps = []
+
+    def app(self, callsign):
+        client = AGWPEClient(port=self.proxy.port, callsign=callsign)
+        assert client.connect(max_retries=0)
+        self.apps.append(client)
+        return client
+
+    def close(self):
+        for client in self.apps:
+            client.close()
+        self.proxy.stop()
+        self.upstream.close()
+        self.server.stop()
+
+
+def test_monitor_fan_out_and_merged_registrations():
+    rig = Rig()
+    try:
+        apps = [rig.app("APP1"), rig.app("APP2")]
+        received = [[], []]
+        for app, frames in zip(apps, received):
+            app.register_handler('D', frames.append)
+            app.send_monitor(0)
+        sender = AGWPEClient(port=rig.server.port, callsign="N0CALL")
+        rig.apps.append(sender)
+        assert sender.connect(max_retries=0)
+        assert wait_for(lambda: sum(len(d.monitor_ports) for d in rig.proxy.downstreams) == 2)
+        sender.send_ui(0, "CQ", "N0CALL", 0xF0, b"hello")
+        assert wait_for(lambda: all(received))
+        assert received[0][0].data == received[1][0].data == b"\xf0hello"
+        # One upstream monitor request and one registration per callsign
+        assert rig.server.kinds_in[b'M'] == 1
+        assert rig.server.kinds_in[b'R'] == 4
+        assert sorted(s["callsigns"] for s in rig.proxy.stats()) == [["APP1"], ["APP2"]]
+    finally:
+        rig.close()
+
+
+def test_connected_frames_and_replies_go_to_owner():
+    rig = Rig()
+    try:
+        app1, app2 = rig.app("APP1"), rig.app("APP2")
+        other = []
+        link_replies = [[], []]
+        for app, replies in zip((app1, app2), link_replies):
+            app.register_handler('y', replies.append)
+        app2.register_handler('d', other.append)
+        app2.register_handler('C', other.append)
+        assert wait_for(lambda: len(rig.proxy.stats()) == 2 and all(s["callsigns"] for s in rig.proxy.stats()))
+        session = app1.open_session(0, "REMOTE", timeout=5)
+        session.write(b"ping")
+        assert session.read(4, timeout=5) == b"ping"
+        app1.request_link_outstanding(0, "REMOTE")
+        assert wait_for(lambda: link_replies[0])
+        time.sleep(0.1)
+        assert other == [] and link_replies[1] == []
+
+        refused = []
+        app2.register_handler('X', refused.append)
+        app2._send_frame(b'R', 0, b'APP1')
+        assert wait_for(lambda: refused)
+        assert refused[0].data == b'\x00'
+    finally:
+        rig.close()
+
+
+def test_released_registrations_and_queries():
+    rig = Rig()
+    try:
+        app = rig.app("APP1")
+        versions = []
+        app.on_extended_version = versions.append
+        app.request_extended_version()
+        assert wait_for(lambda: versions)
+        app.close()
+        assert wait_for(lambda: rig.server.kinds_in.get(b'x') == 1)
+        assert rig.proxy.downstreams == []
+    finally:
+        rig.close()
+
+
+def test_slow_application_does_not_stall_others():
+    rig = Rig(max_queue_bytes=256 * 1024)
+    slow = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        fast = rig.app("FAST")
+        got = []
+        fast.register_handler('D', lambda f: got.append(1))
+        fast.send_monitor(0)
+        slow.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+        slow.connect(("127.0.0.1", rig.proxy.port))
+        slow.sendall(encode_frame(b'M', 0))  # and never reads
+        assert wait_for(lambda: sum(len(d.monitor_ports) for d in rig.proxy.downstreams) == 2)
+        # 10 MB in bursts the fast application can keep up with
+        for burst in range(1, 51):
+            for _ in range(100):
+                rig.server.broadcast(b'D', 0, b'N0CALL', b'CQ', bytes(2000))
+            assert wait_for(lambda: len(got) == burst * 100, timeout=5)
+        fast_stats, slow_stats = sorted(rig.proxy.stats(), key=lambda s: not s["callsigns"])
+        assert fast_stats["dropped"] == 0
+        assert slow_stats["dropped"] > 0 and slow_stats["queued_bytes"] >= 256 * 1024
+    finally:
+        slow.close()
+        rig.close()
+
+
+def test_monitored_d_frames_fan_out_and_link_disconnects_route_to_owner():
+    rig = Rig()
+    try:
+        app1, app2 = rig.app("APP1"), rig.app("APP2")
+        seen = [[], []]
+        for app, frames in zip((app1, app2), seen):
+            app.register_handler('D', frames.append)
+            app.send_monitor(0)
+        assert wait_for(lambda: sum(len(d.monitor_ports) for d in rig.proxy.downstreams) == 2)
+        # Unproto addressed to APP1's callsign is monitored traffic, not APP1's alone
+        rig.server.broadcast(b'D', 0, b'N0CALL', b'APP1', b'\xf0to app1')
+        assert wait_for(lambda: seen[0] and seen[1])
+        session = app1.open_session(0, "REMOTE", timeout=5)
+        session.close()
+        assert wait_for(lambda: len(seen[0]) == 2)
+        time.sleep(0.1)
+        assert seen[0][1].data.startswith(b'*** DISCONNECTED') and len(seen[1]) == 1
+        assert rig.proxy._links == {}
+    finally:
+        rig.close()
+
+
+def test_query_replies_answer_every_waiter_once():
+    rig = Rig()
+    try:
+        apps = [rig.app("APP1"), rig.app("APP2")]
+        replies = [[], []]
+        for app, frames in zip(apps, replies):
+            app.register_handler('Y', frames.append)
+        # The upstream client's own poll and both applications' queries on one port
+        rig.upstream.request_outstanding(0)
+        for app in apps:
+            app.request_outstanding(0)
+        assert wait_for(lambda: rig.server.kinds_in.get(b'Y') == 3)
+        assert wait_for(lambda: all(replies))
+        time.sleep(0.2)
+        assert [len(r) for r in replies] == [1, 1]
+    finally:
+        rig.close()
+
+
+def test_disconnected_application_threads_are_pruned():
+    rig = Rig()
+    try:
+        app = rig.app("APP1")
+        assert wait_for(lambda: len(rig.proxy._threads) == 3)
+        app.close()
+        assert wait_for(lambda: len(rig.proxy._threads) == 1)
+    finally:
+        rig.close()
@@ -0,0 +1,118 @@
+import os
+import time
+
+import pytest
+
+from pyagw3.agwpe import AGWPEClient
+from pyagw3.capture import CaptureWriter, index_path, list_segments
+from pyagw3.codec import encode_frame
+from pyagw3.replay import CaptureReader, ReplayClient
+
+BASE = 1_700_000_000 * 10**9
+SECOND = 10**9
+
+
+def write_capture(directory, frames, **kwargs):
+    """Record (offset seconds, frame tuple) pairs with synthetic timestamps."""
+    writer = CaptureWriter(str(directory), index_interval=0, **kwargs)
+    for seconds, frame in frames:
+        writer.record(encode_frame(*frame), BASE + int(seconds * SECOND))
+        writer.flush(timeout=2)
+    writer.close()
+    return writer
+
+
+TRAFFIC = [
+    (0, (b'U', 0, b'N0CALL-1', b'CQ', b'one')),
+    (1, (b'U', 1, b'W1AW', b'BEACON', b'two')),
+    (2, (b'K', 1, b'N0CALL-2', b'KE4AHR', b'\x00three')),
+    (3, (b'U', 1, b'KE4AHR', b'N0CALL-1', b'four')),
+    (4, (b'U', 0, b'W1AW', b'CQ', b'five')),
+]
+
+
+def payloads(reader, **query):
+    return [bytes(raw[36:]).lstrip(b'\x00') for _, raw in reader.frames(**query)]
+
+
+def test_iterates_all_frames_as_memoryviews(tmp_path):
+    write_capture(tmp_path, TRAFFIC)
+    with CaptureReader(str(tmp_path)) as reader:
+        frames = list(reader.frames())
+        assert [ts for ts, _ in frames] == [BASE + i * SECOND for i in range(5)]
+        assert all(isinstance(raw, memoryview) for _, raw in frames)
+        assert [bytes(raw) for _, raw in frames] == [encode_frame(*f) for _, f in TRAFFIC]
+        del frames
+
+
+def test_queries_by_time_callsign_port_and_kind(tmp_path):
+    write_capture(tmp_path, TRAFFIC)
+    t0 = BASE / SECOND
+    with CaptureReader(str(tmp_path)) as reader:
+        assert payloads(reader, start=t0 + 1, end=t0 + 3) == [b'two', b'three', b'four']
+        assert payloads(reader, callsign="N0CALL") == [b'one', b'three', b'four']
+        assert payloads(reader, callsign="n0call-1", start=t0 + 1) == [b'four']
+        assert payloads(reader, callsign="W1AW", port=0) == [b'five']
+        assert payloads(reader, port=1, kinds=b'K') == [b'three']
+        assert payloads(reader, callsign="NOBODY") == []
+
+
+def test_unindexed_segment_is_scanned(tmp_path):
+    writer = write_capture(tmp_path, TRAFFIC)
+    for path in writer.segments:
+        os.remove(index_path(path))
+    with CaptureReader(str(tmp_path)) as reader:
+        assert reader.segments[0].index is None
+        assert payloads(reader, callsign="N0CALL", start=BASE / SECOND + 1) == [b'three', b'four']
+
+
+def test_queries_span_segments(tmp_path):
+    write_capture(tmp_path, TRAFFIC, segment_bytes=100)
+    assert len(list_segments(str(tmp_path))) > 1
+    with CaptureReader(str(tmp_path)) as reader:
+        assert payloads(reader) == [b'one', b'two', b'three', b'four', b'five']
+        assert payloads(reader, start=BASE / SECOND + 3) == [b'four', b'five']
+
+
+def test_replay_feeds_live_callbacks(tmp_path):
+    write_capture(tmp_path, TRAFFIC)
+    client = AGWPEClient()
+    seen = []
+    client.register_handler('U', lambda frame: seen.append((frame.port, frame.call_from, frame.data)))
+    taps = []
+    client.add_tap(lambda buffer, frames: taps.append(len(frames)))
+    with CaptureReader(str(tmp_path)) as reader:
+        assert reader.replay(client, port=1) == 3
+    assert seen == [(1, b'W1AW', b'two'), (1, b'KE4AHR', b'four')]
+    assert taps == [1, 1, 1]
+    assert client.metrics.frames_in[ord('K')] == 1
+
+
+def test_replay_speed(tmp_path):
+    write_capture(tmp_path, [(0, TRAFFIC[0][1]), (0.2, TRAFFIC[1][1])])
+    with CaptureReader(str(tmp_path)) as reader:
+        start = time.monotonic()
+        reader.replay(AGWPEClient(), speed=2.0)
+        assert 0.08 <= time.monotonic() - start < 1.0
+
+
+def test_replay_client_collects_replies(tmp_path):
+    write_capture(tmp_path, TRAFFIC)
+    with CaptureReader(str(tmp_path)) as reader:
+        client = ReplayClient(reader, callsign="KE4AHR")
+        assert client.connect()
+
+        def answer(frame):
+            if frame.call_from == b'W1AW':
+                client.send_ui(frame.port, 'W1AW', 'KE4AHR', 0xF0, b'ack')
+        client.register_handler('U', answer)
+        assert client.run() == 5
+    assert [(kind, port, to, data) for kind, port, _, to, data in client.sent] == [
+        (b'D', 1, b'W1AW', b'\xf0ack'), (b'D', 0, b'W1AW', b'\xf0ack')]
+
+
+def test_rejects_foreign_files(tmp_path):
+    path = tmp_path / "capture-000000.agwcap"
+    path.write_bytes(b'not a capture file at all')
+    with pytest.raises(ValueError):
+        CaptureReader(str(tmp_path))
@@ -0,0 +1,149 @@
+import pytest
+
+from pyagw3.agwpe import AGWPEClient
+from pyagw3.scheduler import PRIORITY_BEACON, TxScheduler, airtime
+from pyagw3.server import AGWPEServer
+
+from .test_server import wait_for
+
+
+def recording_client():
+    client = AGWPEClient(callsign="N0CALL")
+    sent = []
+    client._send_direct = lambda *frame: sent.append(frame)
+    return client, sent
+
+
+def test_interactive_frames_jump_queued_beacons():
+    client, sent = recording_client()
+    scheduler = TxScheduler(high_water=1, poll_interval=60)
+    scheduler.attach(client)
+    try:
+        client.outstanding.update(0, 1)
+        client.send_ui(0, "BEACON", "N0CALL", 0xF0, b"b", priority=PRIORITY_BEACON)
+        client.send_ui(0, "CQ", "N0CALL", 0xF0, b"traffic")
+        client.send_connected_data(0, "KE4AHR", b"hi")
+        client.send_monitor(0)  # not on air: bypasses the scheduler
+        assert wait_for(lambda: len(sent) == 2)
+        assert sorted(f[0] for f in sent) == [b'M', b'Y']
+        assert client.stats()["queues"]["tx_scheduled_frames"] == 3
+        scheduler.configure_port(0, high_water=10)
+        assert scheduler.flush(timeout=5)
+    finally:
+        assert scheduler.close() == 0
+    assert [f[4] for f in sent[2:]] == [b"hi", b"\xf0traffic", b"\xf0b"]
+    assert client.tx_scheduler is None
+    assert scheduler.stats()[0]["sent"] == {"interactive": 1, "traffic": 1, "beacon": 1}
+
+
+def test_queued_beacons_are_coalesced():
+    client, sent = recording_client()
+    scheduler = TxScheduler(high_water=1, poll_interval=60)
+    scheduler.attach(client)
+    try:
+        client.outstanding.update(0, 1)
+        for n in range(5):
+            client.send_raw_ui(0, "BEACON", "N0CALL", b"%d" % n, priority=PRIORITY_BEACON)
+        client.send_raw_ui(0, "BEACON", "N0CALL-1", b"other", priority=PRIORITY_BEACON)
+        assert scheduler.pending() == 2
+        scheduler.configure_port(0, high_water=10)
+        assert scheduler.flush(timeout=5)
+    finally:
+        scheduler.close()
+    beacons = [f[4] for f in sent if f[0] == b'K']
+    assert len(beacons) == 2 and beacons[0].endswith(b"4") and beacons[1].endswith(b"other")
+    assert scheduler.stats()[0]["coalesced"] == 4
+
+
+def test_airtime_budget_paces_frames():
+    client, sent = recording_client()
+    # 200 bytes at 9600 baud is ~0.2 s; a 50% budget allows one about every 0.4 s after the burst
+    scheduler = TxScheduler(baud=9600, budget=0.5, burst=0.2)
+    scheduler.attach(client)
+    try:
+        for _ in range(3):
+            client.send_ui(1, "CQ", "N0CALL", 0xF0, bytes(199))
+        assert wait_for(lambda: len(sent) == 1)
+        assert len(sent) == 1 and scheduler.pending() == 2
+        assert scheduler.flush(timeout=5)
+    finally:
+        scheduler.close()
+    stats = scheduler.stats()[1]
+    assert abs(stats["airtime_seconds"] - 3 * airtime(200, 9600)) < 1e-9
+    waits = stats["queue_wait"]["traffic"]
+    assert waits["count"] == 3 and waits["sum"] >= 0.5
+
+
+def test_outstanding_reports_gate_sending():
+    with AGWPEServer() as server:
+        server.outstanding[0] = 6
+        client = AGWPEClient(port=server.port, callsign="N0CALL")
+        scheduler = TxScheduler(high_water=4, poll_interval=0.05)
+        try:
+            assert client.connect(max_retries=0)
+            scheduler.attach(client)
+            for n in range(8):
+                client.send_ui(0, "CQ", "N0CALL", 0xF0, b"%d" % n)
+            # Nothing was known, so four go out before the 'Y' reply of 6 holds the rest
+            assert wait_for(lambda: client.outstanding.get(0) == 6)
+            assert server.kinds_in.get(b'D') == 4 and scheduler.pending() == 4
+            server.outstanding[0] = 0
+            assert scheduler.flush(timeout=5)
+            assert wait_for(lambda: server.kinds_in.get(b'D') == 8)
+        finally:
+            scheduler.close()
+            client.close()
+
+
+def test_unanswered_polls_fall_back_to_sending():
+    client, sent = recording_client()
+    scheduler = TxScheduler(high_water=1, poll_interval=0.05, poll_timeout=0.3)
+    scheduler.attach(client)
+    try:
+        client.outstanding.update(0, 5)
+        client.send_ui(0, "CQ", "N0CALL", 0xF0, b"held")
+        # Polls go out but the back end never answers them
+        assert wait_for(lambda: any(f[0] == b'D' for f in sent))
+        polls = [f for f in sent if f[0] == b'Y']
+        assert len(polls) >= 2
+        assert scheduler.stats()[0]["poll_timeouts"] == 1
+    finally:
+        scheduler.close()
+
+
+def test_connect_keeps_its_place_after_disconnect():
+    client, sent = recording_client()
+    scheduler = TxScheduler(high_water=1, poll_interval=60)
+    scheduler.attach(client)
+    try:
+        client.outstanding.update(0, 1)
+        client.send_connected_data(0, "KE4AHR", b"bye")
+        client.send_disconnect(0, "KE4AHR")
+        client.send_connect(0, "KE4AHR")
+        assert scheduler.pending() == 3
+        scheduler.configure_port(0, high_water=10)
+        assert scheduler.flush(timeout=5)
+    finally:
+        scheduler.close()
+    assert [f[0] for f in sent if f[0] != b'Y'] == [b'd', b'D', b'C']
+
+
+def test_offline_reject_policy_raises_at_submit():
+    client = AGWPEClient(callsign="N0CALL", offline_policy='reject')
+    scheduler = TxScheduler()
+    scheduler.attach(client)
+    try:
+        with pytest.raises(ConnectionError):
+            client.send_ui(0, "CQ", "N0CALL", 0xF0, b"offline")
+        assert scheduler.pending() == 0
+        # A frame already queued when the policy rejects its send doesn't stop the scheduler thread
+        with scheduler._cond:
+            client.offline_policy = 'drop'
+            client.send_ui(0, "CQ", "N0CALL", 0xF0, b"lost")
+            client.offline_policy = 'reject'
+        assert scheduler.flush(timeout=2)
+        assert wait_for(lambda: client.metrics.send_errors == 1)
+        client.send_raw_enable()
+        assert scheduler._thread.is_alive()
+    finally:
+        assert scheduler.close(timeout=2) == 0
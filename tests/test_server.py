@@ -0,0 +1,87 @@
+import time
+import pytest
+
+from pyagw3.agwpe import AGWPEClient
+from pyagw3.server import AGWPEServer
+
+def wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+@pytest.fixture
+def server():
+    with AGWPEServer() as srv:
+        yield srv
+
+@pytest.fixture
+def client(server):
+    c = AGWPEClient(port=server.port, callsign="TEST")
+    assert c.connect(max_retries=0)
+    yield c
+    c.close()
+
+def test_queries_over_loopback(server, client):
+    versions, memory, outstanding = [], [], []
+    client.on_extended_version = versions.append
+    client.on_memory_usage = memory.append
+    client.on_outstanding = lambda port, count: outstanding.append((port, count))
+    server.outstanding[1] = 3
+    client.request_extended_version()
+    client.request_memory_usage()
+    client.request_outstanding(1)
+    assert wait_for(lambda: versions and memory and outstanding)
+    assert versions == ["PyAGW3 AGWPE emulator"]
+    assert memory == [{"free_kb": 65536, "used_kb": 8192}]
+    assert outstanding == [(1, 3)]
+
+def test_parameters_and_login_recorded(server, client):
+    client.set_parameter(0, 2, 1200)
+    client.send_login("user", "secret")
+    assert wait_for(lambda: server.logins)
+    assert server.parameters == {(0, 2): 1200}
+    assert server.logins == [("user", "secret")]
+    assert server.kinds_in[b'R'] == 1
+
+def test_connect_echo_and_disconnect(server, client):
+    frames, data = [], []
+    client.on_frame = lambda f: frames.append((f.data_kind, f.call_from))
+    client.on_connected_data = lambda port, call, payload: data.append((call, payload))
+    client.send_connect(0, "PEER")
+    client.send_connected_data(0, "PEER", b"hello")
+    client.send_disconnect(0, "PEER")
+    assert wait_for(lambda: len(frames) == 2)
+    assert frames == [(b'C', b'PEER'), (b'D', b'PEER')]
+    assert data == [("PEER", b"hello")]
+
+def test_unproto_is_monitored_by_other_clients(server, client):
+    other = AGWPEClient(port=server.port, callsign="OTHER")
+    assert other.connect(max_retries=0)
+    try:
+        seen, heard = [], []
+        other.on_frame = lambda f: seen.append((f.call_from, f.data))
+        other.on_heard_stations = lambda port, lst: heard.extend(h["callsign"] for h in lst)
+        other.send_monitor(0)
+        assert wait_for(lambda: server.kinds_in.get(b'M'))
+        client.send_ui(0, "CQ", "TEST", 0xF0, b"hi")
+        assert wait_for(lambda: seen)
+        assert seen == [(b'TEST', b'\xf0hi')]
+        other.request_heard_stations(0)
+        assert wait_for(lambda: heard)
+        assert heard == ["TEST"]
+    finally:
+        other.close()
+
+def test_synthetic_traffic_rate(server, client):
+    count = [0]
+    client.on_frame = lambda f: count.__setitem__(0, count[0] + 1)
+    client.send_monitor(0)
+    assert wait_for(lambda: server.kinds_in.get(b'M'))
+    server.start_traffic(rate=2000, size_mix=[(0, 1), (64, 1)], ports=[0], seed=1)
+    time.sleep(0.5)
+    server.stop_traffic()
+    assert wait_for(lambda: count[0] == server.frames_out - 1)  # minus the 'X' registration reply
+    assert 500 <= count[0] <= 1500
@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from pyagw3.agwpe import AGWPEClient, FrameDispatcher
+from pyagw3.codec import encode_frame
+from pyagw3.aio import AsyncAGWPEClient
+from pyagw3.server import AGWPEServer
+from pyagw3.session import STATE_DISCONNECTED
+
+from .test_server import wait_for
+
+
+@pytest.fixture
+def server():
+    with AGWPEServer() as srv:
+        yield srv
+
+
+@pytest.fixture
+def client(server):
+    c = AGWPEClient(port=server.port, callsign="TEST")
+    assert c.connect(max_retries=0)
+    yield c
+    c.close()
+
+
+def test_session_read_write_and_close(client):
+    session = client.open_session(0, "N0CALL", timeout=5)
+    assert session.connected and session.key == (0, b'TEST', b'N0CALL')
+    assert session.write(b"hello\rworld\r") == 12
+    assert session.readline(timeout=5) == b"hello\r"
+    assert session.read(3, timeout=5) == b"wor"
+    assert session.readline(timeout=5) == b"ld\r"
+    with pytest.raises(TimeoutError):
+        session.read(timeout=0.05)
+    session.close(timeout=5)
+    assert session.state == STATE_DISCONNECTED
+    assert client.sessions == []
+    assert session.read() == b''
+
+
+def test_sessions_are_demultiplexed(client):
+    unmanaged = []
+    client.on_connected_data = lambda port, call, data: unmanaged.append(data)
+    a = client.open_session(0, "N0CALL-1", timeout=5)
+    b = client.open_session(1, "N0CALL-2", timeout=5)
+    a.write(b"to a")
+    b.write(b"to b")
+    assert a.read(timeout=5) == b"to a"
+    assert b.read(timeout=5) == b"to b"
+    assert unmanaged == []
+    assert len(client.sessions) == 2
+
+
+def test_inbound_session_and_remote_disconnect(server, client):
+    accepted = []
+    client.on_session = accepted.append
+    assert server.connect_in(1, "N0CALL", "TEST")
+    assert wait_for(lambda: accepted)
+    session = accepted[0]
+    assert session.connected and (session.port, session.local, session.remote) == (1, "TEST", "N0CALL")
+    session.write(b"welcome\r")
+    assert session.readline(timeout=5) == b"welcome\r"
+    assert server.disconnect_in(1, "N0CALL", "TEST")
+    assert session.read(timeout=5) == b''
+    assert session.state == STATE_DISCONNECTED
+
+
+def test_refused_connect(server, client):
+    server.unreachable.add(b'NOBODY')
+    with pytest.raises(ConnectionError):
+        client.open_session(0, "NOBODY", timeout=5)
+    assert client.sessions == []
+
+
+def test_sessions_dropped_when_connection_lost(server, client):
+    session = client.open_session(0, "N0CALL", timeout=5)
+    server.stop()
+    assert wait_for(lambda: session.state == STATE_DISCONNECTED)
+
+
+def test_async_stream_pair(server):
+    async def main():
+        async with AsyncAGWPEClient(port=server.port, callsign="TEST") as client:
+            reader, writer = await client.open_connection(0, "N0CALL", timeout=5)
+            assert writer.get_extra_info('peername') == (0, "N0CALL")
+            writer.write(b"line one\r" + bytes(1000) + b"\r")
+            await writer.drain()
+            first = await asyncio.wait_for(reader.readuntil(b'\r'), 5)
+            second = await asyncio.wait_for(reader.readuntil(b'\r'), 5)
+
+            inbound = asyncio.get_running_loop().create_future()
+
+            async def on_session(r, w):
+                w.write(b"hi\r")
+                inbound.set_result(await r.readuntil(b'\r'))
+            client.on_session = on_session
+            assert server.connect_in(1, "N0CALL-5", "TEST")
+            echoed = await asyncio.wait_for(inbound, 5)
+
+            writer.close()
+            await asyncio.wait_for(writer.wait_closed(), 5)
+            return first, second, echoed, await reader.read()
+
+    first, second, echoed, tail = asyncio.run(main())
+    assert first == b"line one\r"
+    assert second == bytes(1000) + b"\r"
+    assert echoed == b"hi\r"
+    assert tail == b''
+
+
+def test_plain_dispatcher_leaves_inbound_links_unmanaged():
+    dispatcher = FrameDispatcher()
+    accepted, frames = [], []
+    dispatcher.on_session = accepted.append
+    dispatcher.on_frame = frames.append
+    dispatcher._decoder.feed(encode_frame(b'C', 0, b'REMOTE', b'N0CALL', b'*** CONNECTED With REMOTE\r'))
+    dispatcher._process_pending()
+    assert accepted == [] and dispatcher.sessions == []
+    assert [f.data_kind for f in frames] == [b'C']
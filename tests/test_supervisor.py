@@ -0,0 +1,111 @@
+import pytest
+
+from pyagw3.agwpe import AGWPEClient
+from pyagw3.server import AGWPEServer
+from pyagw3.supervisor import SessionState
+
+from .test_server import wait_for
+
+
+def test_session_state_replay_order():
+    state = SessionState()
+    state.record(b'P', 1, b'', b'\x02\x05\x00\x00\x00')
+    state.record(b'M', 1, b'', b'')
+    state.record(b'R', 0, b'N0CALL', b'')
+    state.record(b'k', 0, b'', b'')
+    state.record(b'T', 0, b'', b'user\0pass\0')
+    state.record(b'M', 1, b'', b'')
+    state.record(b'P', 1, b'', b'\x02\x07\x00\x00\x00')
+    assert [f[0] for f in state.replay_frames()] == [b'T', b'R', b'M', b'k', b'P']
+    assert state.replay_frames()[-1][4] == b'\x02\x07\x00\x00\x00'
+    state.record(b'k', 0, b'', b'')
+    state.record(b'x', 0, b'N0CALL', b'')
+    assert [f[0] for f in state.replay_frames()] == [b'T', b'M', b'P']
+
+
+def test_reconnect_replays_session_and_buffered_frames():
+    server = AGWPEServer()
+    server.start()
+    address_port = server.port
+    client = AGWPEClient(port=address_port, callsign="TEST", auto_reconnect=True, offline_policy='buffer')
+    try:
+        assert client.connect(max_retries=0, base_delay=0.05)
+        client.send_monitor(1)
+        client.send_raw_enable()
+        client.send_login("user", "secret")
+        client.set_parameter(1, 2, 5)
+        assert wait_for(lambda: server.frames_in == 5)
+        server.stop()
+        assert wait_for(lambda: not client.connected)
+
+        client.send_ui(1, "CQ", "TEST", 0xF0, b"while offline")
+        server = AGWPEServer(port=address_port)
+        server.start()
+        assert wait_for(lambda: server.frames_in == 6, timeout=5)
+        assert list(server.kinds_in) == [b'T', b'R', b'M', b'k', b'P', b'D']
+        session = server.sessions[0]
+        assert session.callsigns == {b'TEST'}
+        assert session.monitor_ports == {1} and session.raw
+        assert server.logins == [("user", "secret")]
+        assert server.parameters == {(1, 2): 5}
+        assert client.stats()["reconnects"] == 1
+        client.close()
+        client.thread.join(2)
+        assert not client.thread.is_alive()
+    finally:
+        client.close()
+        server.stop()
+
+
+def test_offline_policies():
+    client = AGWPEClient(offline_policy='reject')
+    with pytest.raises(ConnectionError):
+        client.send_ui(0, "CQ", "TEST", 0xF0, b"x")
+    client.send_monitor(0)  # session frames are recorded, not rejected
+    assert (b'M', 0, b'', b'', b'') in client.session.replay_frames()
+
+    client = AGWPEClient(offline_policy='buffer', offline_buffer=2)
+    for i in range(3):
+        client.send_ui(0, "CQ", "TEST", 0xF0, bytes([i]))
+    assert [f[4] for f in client._offline] == [b'\xf0\x01', b'\xf0\x02']
+    assert client.offline_dropped == 1
+
+    with pytest.raises(ValueError):
+        AGWPEClient(offline_policy='queue')
+
+
+class _BrokenStream:
+    """Accepts the connection, then fails every write."""
+    closed = 0
+
+    def sendall(self, data):
+        raise BrokenPipeError("replay refused")
+
+    def close(self):
+        _BrokenStream.closed += 1
+
+
+class _BrokenTransport:
+    def open(self):
+        return _BrokenStream()
+
+
+def test_failed_replay_closes_each_attempt():
+    _BrokenStream.closed = 0
+    client = AGWPEClient(callsign="TEST", transport=_BrokenTransport())
+    assert not client.connect(max_retries=2, base_delay=0.01)
+    assert _BrokenStream.closed == 3
+    assert client.metrics.connect_failures == 3
+
+
+def test_close_is_not_logged_as_an_error(caplog):
+    server = AGWPEServer()
+    server.start()
+    client = AGWPEClient(port=server.port, callsign="TEST")
+    try:
+        assert client.connect(max_retries=0)
+        client.close()
+        client.thread.join(2)
+        assert not [r for r in caplog.records if r.levelname in ("ERROR", "WARNING")]
+    finally:
+        server.stop()
@@ -0,0 +1,145 @@
+import os
+import select
+import socket
+
+from pyagw3.agwpe import AGWPEClient
+from pyagw3.ax25 import build_ui, decode
+from pyagw3.server import AGWPEServer
+from pyagw3.transport import (KISSDecoder, KISSSerialTransport, KISSTCPTransport, MemoryTransport, UnixTransport,
+                              kiss_escape, kiss_frame, kiss_unescape)
+
+from .test_server import wait_for
+
+
+def read_kiss(fd, timeout=3.0):
+    decoder = KISSDecoder()
+    while True:
+        ready, _, _ = select.select([fd], [], [], timeout)
+        assert ready, "no KISS frame from the client"
+        frames = decoder.feed(os.read(fd, 4096))
+        if frames:
+            return frames[0]
+
+
+def test_memory_transport_round_trip():
+    server = AGWPEServer()
+    clients = []
+    try:
+        for call in ("N0CALL", "N1CALL"):
+            client = AGWPEClient(callsign=call, transport=MemoryTransport(server.serve_stream))
+            assert client.connect(max_retries=0)
+            clients.append(client)
+        monitored, versions = [], []
+        clients[1].register_handler('D', monitored.append)
+        clients[1].on_extended_version = versions.append
+        clients[1].send_monitor(0)
+        clients[1].request_extended_version()
+        assert wait_for(lambda: versions)
+        clients[0].send_ui(0, "CQ", "N0CALL", 0xF0, b"hello")
+        assert wait_for(lambda: monitored)
+        assert monitored[0].data == b"\xf0hello"
+        assert server.kinds_in[b'R'] == 2
+    finally:
+        for client in clients:
+            client.close()
+        server.stop()
+
+
+def test_unix_transport(tmp_path):
+    path = str(tmp_path / "agwpe.sock")
+    server = AGWPEServer(path=path)
+    server.start()
+    client = AGWPEClient(callsign="N0CALL", transport=UnixTransport(path))
+    try:
+        assert client.connect(max_retries=0)
+        versions = []
+        client.on_extended_version = versions.append
+        client.request_extended_version()
+        assert wait_for(lambda: versions)
+        assert server.kinds_in[b'R'] == 1
+    finally:
+        client.close()
+        server.stop()
+    assert not os.path.exists(path)
+
+
+def test_kiss_escaping():
+    data = bytes([0x00, 0xC0, 0x41, 0xDB, 0xDB, 0xDC, 0xC0])
+    assert kiss_escape(data) == b'\x00\xdb\xdc\x41\xdb\xdd\xdb\xdd\xdc\xdb\xdc'
+    assert kiss_unescape(kiss_escape(data)) == data
+    frame = kiss_frame(1, data[1:])
+    assert frame[:2] == b'\xc0\x10' and frame[-1:] == b'\xc0'
+    decoder = KISSDecoder()
+    # Split mid-escape, with leading FEND padding
+    assert decoder.feed(b'\xc0' + frame[:4]) == []
+    assert decoder.feed(frame[4:] + frame) == [b'\x10' + data[1:]] * 2
+
+
+def test_kiss_serial_transport():
+    master, slave = os.openpty()
+    client = AGWPEClient(callsign="N0CALL", transport=KISSSerialTransport(os.ttyname(slave)))
+    try:
+        assert client.connect(max_retries=0)
+        monitored, raw = [], []
+        client.register_handler('U', monitored.append)
+        client.register_handler('K', raw.append)
+        client.send_monitor(0)
+        client.send_raw_enable()
+        client.send_ui(0, "CQ", "N0CALL", 0xF0, b"\xc0out")
+        sent = read_kiss(master)
+        assert sent[0] == 0x00
+        frame = decode(sent)
+        assert (frame.dest, frame.src, frame.info) == ("CQ", "N0CALL", b"\xc0out")
+
+        heard = build_ui("APRS", "W1AW-9", b"!pos", path=("WIDE1-1*",))
+        os.write(master, kiss_frame(0, heard[1:]))
+        assert wait_for(lambda: monitored and raw)
+        assert monitored[0].call_from == b"W1AW-9"
+        assert monitored[0].data.startswith(b"1:Fm W1AW-9 To APRS Via WIDE1-1* <UI pid=F0 Len=4 >[")
+        assert monitored[0].data.endswith(b"]\r!pos")
+        assert raw[0].data == heard
+        # Frames for unmonitored ports aren't delivered
+        os.write(master, kiss_frame(1, heard[1:]))
+        os.write(master, kiss_frame(0, heard[1:]))
+        assert wait_for(lambda: len(monitored) == 2)
+        assert len(raw) == 2
+    finally:
+        client.close()
+        os.close(master)
+        os.close(slave)
+
+
+def test_kiss_tcp_transport_refuses_connect():
+    listener = socket.create_server(("127.0.0.1", 0))
+    client = AGWPEClient(callsign="N0CALL", transport=KISSTCPTransport(port=listener.getsockname()[1]))
+    try:
+        assert client.connect(max_retries=0)
+        tnc, _ = listener.accept()
+        disconnects = []
+        client.register_handler('D', disconnects.append)
+        client.send_connect(0, "REMOTE")
+        assert wait_for(lambda: disconnects)
+        assert b"RETRYOUT" in disconnects[0].data
+        client.send_raw_unproto(0, "APRS", "N0CALL", build_ui("APRS", "N0CALL", b"x"))
+        tnc.settimeout(3)
+        assert decode(KISSDecoder().feed(tnc.recv(4096))[0]).info == b"x"
+        tnc.close()
+    finally:
+        client.close()
+        listener.close()
+
+
+def test_server_prunes_finished_stream_threads():
+    server = AGWPEServer()
+    try:
+        for _ in range(5):
+            client = AGWPEClient(callsign="N0CALL", transport=MemoryTransport(server.serve_stream))
+            assert client.connect(max_retries=0)
+            client.close()
+            assert wait_for(lambda: not any(t.is_alive() for t in server._threads))
+        client = AGWPEClient(callsign="N1CALL", transport=MemoryTransport(server.serve_stream))
+        assert client.connect(max_retries=0)
+        assert len(server._threads) == 1
+        client.close()
+    finally:
+        server.stop()
@@ -0,0 +1,96 @@
+import socket
+import time
+import pytest
+from unittest.mock import Mock
+
+from pyagw3.agwpe import AGWPEClient
+from pyagw3.codec import encode_frame, decode_many
+
+def make_client(**kwargs):
+    a, b = socket.socketpair()
+    client = AGWPEClient(callsign="TEST", **kwargs)
+    client.sock = a
+    client.connected = True
+    return client, b
+
+def read_frames(sock, count, timeout=2.0):
+    sock.settimeout(timeout)
+    buf = b''
+    while True:
+        frames, _ = decode_many(buf)
+        if len(frames) >= count:
+            return [(bytes([f[0]]), bytes(f[5])) for f in frames]
+        buf += sock.recv(65536)
+
+def test_batch_coalesces_into_one_sendmsg():
+    client, peer = make_client()
+    client.sock = Mock(wraps=client.sock)
+    try:
+        with client.batch():
+            for i in range(100):
+                client.send_ui(0, "BEACON", "TEST", 0xF0, b"msg %d" % i)
+            client.sock.sendall.assert_not_called()
+            client.sock.sendmsg.assert_not_called()
+        assert client.sock.sendmsg.call_count == 1
+        frames = read_frames(peer, 100)
+        assert frames[0] == (b'D', b'\xf0msg 0')
+        assert frames[99] == (b'D', b'\xf0msg 99')
+    finally:
+        client.close()
+        peer.close()
+
+def test_nested_batch_flushes_on_outermost_exit():
+    client, peer = make_client()
+    client.sock = Mock(wraps=client.sock)
+    try:
+        with client.batch():
+            with client.batch():
+                client.request_memory_usage()
+            client.sock.sendmsg.assert_not_called()
+        client.sock.sendmsg.assert_called_once()
+        assert read_frames(peer, 1) == [(b'm', b'')]
+    finally:
+        client.close()
+        peer.close()
+
+def test_buffered_mode_flushes_at_size_threshold():
+    client, peer = make_client(tx_buffer_bytes=1000, tx_buffer_delay=60)
+    client.sock = Mock(wraps=client.sock)
+    try:
+        for _ in range(9):
+            client.send_connected_data(0, "PEER", b"x" * 64)
+        client.sock.sendmsg.assert_not_called()
+        client.send_connected_data(0, "PEER", b"x" * 64)
+        client.sock.sendmsg.assert_called_once()
+        assert len(read_frames(peer, 10)) == 10
+    finally:
+        client.close()
+        peer.close()
+
+def test_buffered_mode_flushes_after_delay():
+    client, peer = make_client(tx_buffer_bytes=65536, tx_buffer_delay=0.02)
+    try:
+        client.set_parameter(0, 1, 2)
+        start = time.monotonic()
+        assert read_frames(peer, 1) == [(b'P', b'\x01\x02\x00\x00\x00')]
+        assert time.monotonic() - start < 1.0
+    finally:
+        client.close()
+        peer.close()
+
+def test_explicit_flush_and_close_flush():
+    client, peer = make_client(tx_buffer_bytes=65536, tx_buffer_delay=60)
+    try:
+        client.request_outstanding(1)
+        client.flush()
+        assert read_frames(peer, 1) == [(b'Y', b'')]
+        client.request_extended_version()
+    finally:
+        client.close()
+    assert read_frames(peer, 1) == [(b'v', b'')]
+    peer.close()
+
+def test_unbuffered_mode_still_uses_sendall(agwpe_client, mock_socket):
+    agwpe_client.request_memory_usage()
+    mock_socket.sendall.assert_called_once_with(encode_frame(b'm'))
+    mock_socket.sendmsg.assert_not_called()